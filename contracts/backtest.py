@@ -0,0 +1,189 @@
+from lmsr import LMSRQuoteSolver
+import click
+import csv
+import json
+import random
+import logging
+logging.basicConfig(level=logging.INFO)
+
+
+class MarketSimulator(LMSRQuoteSolver):
+
+    # DefaultMarketFactory market traded with the LMSR market maker. Trades update shares and collected fees like the
+    # contract and raise ValueError where the contract throws. Outcome tokens held by every trader are tracked, so
+    # selling shares a trader doesn't hold is rejected like the token transfer of the contract.
+
+    def __init__(self, initial_funding, outcome_count, fee=0, base_fee=0):
+        LMSRQuoteSolver.__init__(self, initial_funding, [initial_funding] * outcome_count, fee, base_fee)
+        self.collected_fees = 0
+        self.base_fees = self.calc_base_fee_for_shares(initial_funding)
+        # Tokens paid by the investor to create the market
+        self.funding = initial_funding + self.base_fees
+        self.volume = 0
+        self.trade_count = 0
+        self.rejected_count = 0
+        # Trader => shares of every outcome
+        self.holdings = {}
+
+    def get_holdings(self, trader):
+        return self.holdings.setdefault(trader, [0] * len(self.market_state.share_distribution))
+
+    def add_trade(self, volume, fee, base_fee):
+        self.collected_fees += fee
+        self.base_fees += base_fee
+        self.volume += volume
+        self.trade_count += 1
+        # Cached costs of the quote solver belong to the previous share distribution
+        self.curves = {}
+
+    def buy_shares(self, outcome_index, share_count, max_spending=None, trader=0):
+        # Returns total costs like DefaultMarketFactory.buyShares
+        costs = self.market_state.calc_costs_buying(outcome_index, share_count)
+        fee = self.calc_market_fee(costs)
+        base_fee = self.calc_base_fee_for_shares(share_count)
+        if max_spending is not None and costs + fee + base_fee > max_spending:
+            raise ValueError("Shares are more expensive.")
+        self.market_state.buy_shares(outcome_index, share_count, costs)
+        self.add_trade(costs, fee, base_fee)
+        self.get_holdings(trader)[outcome_index] += share_count
+        return costs + fee + base_fee
+
+    def sell_shares(self, outcome_index, share_count, expected_earnings=0, trader=0):
+        # Returns net earnings like DefaultMarketFactory.sellShares
+        holdings = self.get_holdings(trader)
+        if holdings[outcome_index] < share_count:
+            raise ValueError("Shares are not held by trader.")
+        net_earnings = self.sell(outcome_index, share_count, expected_earnings)
+        holdings[outcome_index] -= share_count
+        return net_earnings
+
+    def sell(self, outcome_index, share_count, expected_earnings):
+        # Sells shares to the market maker and returns net earnings
+        earnings = self.market_state.calc_earnings_selling(outcome_index, share_count)
+        fee = self.calc_market_fee(earnings)
+        if earnings - fee < expected_earnings:
+            raise ValueError("Invalid sell order.")
+        self.market_state.sell_shares(outcome_index, share_count, earnings)
+        self.add_trade(earnings, fee, 0)
+        return earnings - fee
+
+    def short_sell_shares(self, outcome_index, share_count, expected_earnings=0, trader=0):
+        # Returns total costs like DefaultMarketFactory.shortSellShares. The trader receives shares of all other
+        # outcomes.
+        base_fee = self.calc_base_fee_for_shares(share_count)
+        net_earnings = self.sell(outcome_index, share_count, expected_earnings)
+        self.base_fees += base_fee
+        holdings = self.get_holdings(trader)
+        for i in range(len(holdings)):
+            if i != outcome_index:
+                holdings[i] += share_count
+        return share_count + base_fee - net_earnings
+
+    def calc_investor_profit(self, winning_outcome_index):
+        # Closing the market returns all shares to the investor, only shares of the winning outcome are redeemed
+        return self.market_state.share_distribution[winning_outcome_index] + self.collected_fees - self.funding
+
+    def get_report(self):
+        market_state = self.market_state
+        profits = [self.calc_investor_profit(outcome_index)
+                   for outcome_index in range(len(market_state.share_distribution))]
+        return {
+            "initial_funding": market_state.initial_funding,
+            "fee": self.fee,
+            "trades": self.trade_count,
+            "rejected_trades": self.rejected_count,
+            "volume": self.volume,
+            "collected_fees": self.collected_fees,
+            "base_fees": self.base_fees,
+            "share_distribution": market_state.share_distribution,
+            "investor_profits": profits,
+            # Profit weighted with current outcome prices
+            "expected_investor_profit": sum(profit * term for profit, term in zip(profits, market_state.terms))
+            // market_state.inner_sum
+        }
+
+
+class LMSRContractSampler:
+
+    # Compares market maker quotes of randomly sampled trades with an LMSRMarketMaker contract before the trade is
+    # simulated. The contract is called with the simulated share distribution, e.g. through a pyethereum tester
+    # ABIContract.
+
+    def __init__(self, lmsr, sample_rate=0.001, seed=None):
+        self.lmsr = lmsr
+        self.sample_rate = sample_rate
+        self.random = random.Random(seed)
+        self.sample_count = 0
+        self.mismatches = []
+
+    def sample(self, market, action, outcome_index, share_count):
+        if self.random.random() >= self.sample_rate:
+            return
+        market_state = market.market_state
+        quote = [market_state.initial_funding, market_state.share_distribution, outcome_index, share_count]
+        try:
+            if action == "buy":
+                expected = market_state.calc_costs_buying(outcome_index, share_count)
+                actual = self.lmsr.calcCostsBuying("\x00" * 32, *quote)
+            else:
+                expected = market_state.calc_earnings_selling(outcome_index, share_count)
+                actual = self.lmsr.calcEarningsSelling("\x00" * 32, *quote)
+        except Exception:
+            actual = None
+        self.sample_count += 1
+        if expected != actual:
+            logging.info('{} quote mismatch: {} expected, {} returned.'.format(action, expected, actual))
+            self.mismatches.append((action, market_state.initial_funding, list(market_state.share_distribution),
+                                    outcome_index, share_count, expected, actual))
+
+
+class Backtester:
+
+    ACTIONS = {"buy": "buy_shares", "sell": "sell_shares", "short_sell": "short_sell_shares"}
+
+    def __init__(self, create_market, sampler=None):
+        # create_market is called with the market id of a market traded for the first time and returns its
+        # MarketSimulator
+        self.create_market = create_market
+        self.sampler = sampler
+        self.markets = {}
+
+    def run(self, trades):
+        # Trades are tuples (market id, trader, action, outcome index, share count) with actions buy, sell and
+        # short_sell. Trades the contract would reject are counted and skipped.
+        for market_id, trader, action, outcome_index, share_count in trades:
+            if market_id not in self.markets:
+                self.markets[market_id] = self.create_market(market_id)
+            market = self.markets[market_id]
+            if self.sampler:
+                self.sampler.sample(market, action, outcome_index, share_count)
+            try:
+                getattr(market, self.ACTIONS[action])(outcome_index, share_count, trader=trader)
+            except ValueError:
+                market.rejected_count += 1
+        return self.get_report()
+
+    def get_report(self):
+        return dict((market_id, market.get_report()) for market_id, market in self.markets.iteritems())
+
+
+def read_trades(trades_file):
+    # Rows are market id, trader, action, outcome index, share count
+    for market_id, trader, action, outcome_index, share_count in csv.reader(trades_file):
+        yield market_id, trader, action, int(outcome_index), int(share_count)
+
+
+@click.command()
+@click.option('-f', help='CSV file with trades: market id, trader, action, outcome index, share count')
+@click.option('-outcome_count', default=2, help='Number of outcomes of all markets')
+@click.option('-initial_funding', default=10 * 10**18, help='Initial funding of all markets')
+@click.option('-fee', default=0, help='Market fee of all markets, 1000000 is 100%')
+@click.option('-base_fee', default=0, help='Base fee, 1000000 is 100%')
+def setup(f, outcome_count, initial_funding, fee, base_fee):
+    backtester = Backtester(lambda market_id: MarketSimulator(initial_funding, outcome_count, fee, base_fee))
+    with open(f) as trades_file:
+        report = backtester.run(read_trades(trades_file))
+    print json.dumps(report, indent=4, sort_keys=True)
+
+if __name__ == '__main__':
+    setup()
@@ -0,0 +1,204 @@
+from ethereum.abi import ContractTranslator
+from json_rpc import BatchJsonRpc
+from packed_decoder import LAYOUTS
+import threading
+import Queue
+import logging
+logging.basicConfig(level=logging.INFO)
+
+ABI = [
+    {"type": "function", "name": "getEvents", "constant": True,
+     "inputs": [{"name": "_eventHashes", "type": "bytes32[]"}, {"name": "oracle", "type": "address"},
+                {"name": "token", "type": "address"}],
+     "outputs": [{"name": "allEvents", "type": "uint256[]"}]},
+    {"type": "function", "name": "getMarkets", "constant": True,
+     "inputs": [{"name": "marketHashes", "type": "bytes32[]"}, {"name": "investor", "type": "address"}],
+     "outputs": [{"name": "allMarkets", "type": "uint256[]"}]},
+    {"type": "function", "name": "getShares", "constant": True,
+     "inputs": [{"name": "owner", "type": "address"}, {"name": "_eventHashes", "type": "bytes32[]"}],
+     "outputs": [{"name": "allShares", "type": "uint256[]"}]},
+    {"type": "function", "name": "getCampaigns", "constant": True,
+     "inputs": [{"name": "_campaignHashes", "type": "bytes32[]"}],
+     "outputs": [{"name": "allCampaigns", "type": "uint256[]"}]}
+]
+
+# Estimated execution gas per call, per hash and per outcome. getShares calls balanceOf of every outcome token up to
+# three times.
+GAS_COSTS = {
+    "getEvents": (30000, 6000, 600),
+    "getMarkets": (30000, 6000, 600),
+    "getShares": (30000, 2000, 8000),
+    "getCampaigns": (30000, 5000, 600)
+}
+
+
+def decode_value(value, _type):
+    if _type == "bytes32":
+        return "0x{:064x}".format(value)
+    if _type == "address":
+        return "0x{:040x}".format(value)
+    if _type == "bool":
+        return value == 1
+    if _type == "int256":
+        return value - 2**256 if value >= 2**255 else value
+    return value
+
+
+def decode_records(function_name, values):
+    # Splits an encoded uint[] into one dictionary per record. Items with one field are a list of values, items with
+    # several fields are a list of dictionaries in "items".
+    fields, item_fields = LAYOUTS[function_name]
+    records = []
+    position = 0
+    while position < len(values):
+        record = dict((name, decode_value(values[position + i], _type)) for i, (name, _type) in enumerate(fields))
+        count = values[position + len(fields)]
+        position += len(fields) + 1
+        items = [dict((name, decode_value(values[position + j * len(item_fields) + i], _type))
+                      for i, (name, _type) in enumerate(item_fields)) for j in range(count)]
+        if len(item_fields) == 1:
+            record[item_fields[0][0]] = [item[item_fields[0][0]] for item in items]
+        else:
+            record["items"] = items
+        position += count * len(item_fields)
+        records.append(record)
+    return records
+
+
+class JsonRpcClient:
+
+    def __init__(self, protocol="http", host="localhost", port=8545):
+        # Every worker keeps its own session, so its connection is reused for all chunks
+        self.batch_json_rpc = BatchJsonRpc(protocol, host, port)
+
+    def call(self, address, data, gas):
+        # Returns output of the call or None if the call failed
+        response = self.batch_json_rpc.batch([("eth_call", [{"to": address, "data": "0x" + data.encode('hex'),
+                                                             "gas": hex(gas)}, "latest"])])[0]
+        if "error" in response or response["result"] == "0x":
+            return None
+        return response["result"][2:].decode('hex')
+
+
+class TesterClient:
+
+    def __init__(self, state, sender):
+        self.state = state
+        self.sender = sender
+        self.lock = threading.Lock()
+
+    def call(self, address, data, gas):
+        # Calls are serialized, a tester state is not thread safe
+        with self.lock:
+            snapshot = self.state.snapshot()
+            try:
+                return self.state.send(self.sender, address[2:].decode('hex'), 0, data)
+            except Exception:
+                return None
+            finally:
+                self.state.revert(snapshot)
+
+
+class BulkReader:
+
+    def __init__(self, create_client, workers=4, gas_limit=4712388, outcome_count=2):
+        # create_client is called once per worker. Chunks are sized to stay below gas_limit for events with
+        # outcome_count outcomes. Failing chunks are split and retried.
+        self.create_client = create_client
+        self.workers = workers
+        self.gas_limit = gas_limit
+        self.outcome_count = outcome_count
+        self.translator = ContractTranslator(ABI)
+
+    def estimate_gas(self, function_name, hash_count):
+        call_gas, hash_gas, outcome_gas = GAS_COSTS[function_name]
+        # Input, result array and returned copy of the result are kept in memory
+        fields, item_fields = LAYOUTS[function_name]
+        words = hash_count * (3 + 2 * (len(fields) + len(item_fields) + self.outcome_count))
+        return call_gas + 21000 + hash_count * (68 * 32 + hash_gas + outcome_gas * self.outcome_count) + \
+            3 * words + words * words / 512
+
+    def get_chunk_size(self, function_name):
+        # Highest number of hashes with estimated gas below gas limit
+        lowest = 1
+        while self.estimate_gas(function_name, lowest * 2) <= self.gas_limit:
+            lowest *= 2
+        highest = lowest * 2
+        while highest - lowest > 1:
+            middle = (lowest + highest) / 2
+            if self.estimate_gas(function_name, middle) <= self.gas_limit:
+                lowest = middle
+            else:
+                highest = middle
+        return lowest
+
+    def read(self, function_name, address, hashes, encode_args):
+        # Yields decoded records chunk by chunk in the order chunks complete
+        chunk_size = self.get_chunk_size(function_name)
+        tasks = Queue.Queue()
+        results = Queue.Queue()
+        for i in range(0, len(hashes), chunk_size):
+            tasks.put(hashes[i:i + chunk_size])
+        pending = [tasks.qsize()]
+        pending_lock = threading.Lock()
+
+        def work():
+            client = self.create_client()
+            while True:
+                chunk = tasks.get()
+                if chunk is None:
+                    break
+                try:
+                    output = client.call(address, self.translator.encode(function_name, encode_args(chunk)),
+                                         self.gas_limit)
+                    if output is not None:
+                        results.put(decode_records(function_name,
+                                                   self.translator.decode(function_name, output)[0]))
+                    elif len(chunk) > 1:
+                        logging.info('{} of {} hashes failed, splitting chunk.'.format(function_name, len(chunk)))
+                        with pending_lock:
+                            pending[0] += 1
+                        tasks.put(chunk[:len(chunk) / 2])
+                        tasks.put(chunk[len(chunk) / 2:])
+                        continue
+                    else:
+                        results.put(Exception("{} failed for {}.".format(function_name, chunk[0].encode('hex'))))
+                except Exception as e:
+                    results.put(e)
+        threads = [threading.Thread(target=work) for _ in range(min(self.workers, pending[0]))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            while True:
+                with pending_lock:
+                    if pending[0] == 0:
+                        break
+                result = results.get()
+                with pending_lock:
+                    pending[0] -= 1
+                if isinstance(result, Exception):
+                    raise result
+                for record in result:
+                    yield record
+        finally:
+            # Remaining chunks are dropped if reading stopped early
+            while not tasks.empty():
+                try:
+                    tasks.get_nowait()
+                except Queue.Empty:
+                    break
+            for thread in threads:
+                tasks.put(None)
+
+    def get_events(self, address, event_hashes, oracle=0, token=0):
+        return self.read("getEvents", address, event_hashes, lambda chunk: [chunk, oracle, token])
+
+    def get_markets(self, address, market_hashes, investor=0):
+        return self.read("getMarkets", address, market_hashes, lambda chunk: [chunk, investor])
+
+    def get_shares(self, address, owner, event_hashes):
+        return self.read("getShares", address, event_hashes, lambda chunk: [owner, chunk])
+
+    def get_campaigns(self, address, campaign_hashes):
+        return self.read("getCampaigns", address, campaign_hashes, lambda chunk: [chunk])
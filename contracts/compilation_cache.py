@@ -0,0 +1,105 @@
+from ethereum import _solidity
+from ethereum.tester import languages
+import hashlib
+import json
+import os
+
+
+class CompilationCache:
+
+    DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "gnosis-contracts")
+    SOURCE_MAP_OUTPUTS = "bin-runtime,srcmap-runtime"
+
+    def __init__(self, cache_dir=None, max_entries=512):
+        self.cache_dir = cache_dir or os.environ.get("COMPILATION_CACHE_DIR", self.DEFAULT_CACHE_DIR)
+        self.max_entries = max_entries
+        self.compiler_versions = {}
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def get_compiler_version(self, language):
+        if language not in self.compiler_versions:
+            compiler = languages[language]
+            self.compiler_versions[language] = compiler.compiler_version() \
+                if hasattr(compiler, "compiler_version") else ""
+        return self.compiler_versions[language]
+
+    def get_key(self, code, language, options):
+        # Artifacts are addressed by the fully preprocessed source, the compiler version and the compiler options
+        return hashlib.sha256(json.dumps([code, language, self.get_compiler_version(language), options],
+                                         sort_keys=True)).hexdigest()
+
+    def load_or_compile(self, code, language, options, compile_code):
+        # Returns the cached artifact or the artifact returned by compile_code
+        path = os.path.join(self.cache_dir, self.get_key(code, language, options) + ".json")
+        if os.path.isfile(path):
+            # Update modification time, entries are evicted in least recently used order
+            os.utime(path, None)
+            with open(path) as artifact_file:
+                return json.load(artifact_file)
+        artifact = compile_code()
+        # Write to temporary file first, so parallel readers never see partial artifacts
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "w") as artifact_file:
+            json.dump(artifact, artifact_file)
+        os.rename(tmp_path, path)
+        self.evict()
+        return artifact
+
+    def combined(self, code, language="solidity", **options):
+        # Returns [(contract name, {"bin_hex": ..., "abi": ...}), ...] like the combined output of the compiler
+        return [(name, contract) for name, contract in self.load_or_compile(code, language, options, lambda: [
+            (name, {"bin_hex": contract["bin_hex"], "abi": contract["abi"]})
+            for name, contract in languages[language].combined(code, **options)])]
+
+    def source_maps(self, code):
+        # Returns {contract name: runtime source map} of Solidity code. Code is compiled with the default optimizer
+        # setting of the compiler wrapper, like contracts compiled by combined.
+        return self.load_or_compile(code, "solidity", {"combined": self.SOURCE_MAP_OUTPUTS}, lambda: dict(
+            (name.split(":")[-1], contract["srcmap-runtime"])
+            for name, contract in _solidity.compile_code(code, combined=self.SOURCE_MAP_OUTPUTS).iteritems()))
+
+    def compile(self, code, language="solidity", contract_name=None, **options):
+        # Returns bytecode and abi of the named contract or of the last contract in code
+        combined = self.combined(code, language, **options)
+        contracts = [contract for name, contract in combined if name == contract_name] or [combined[-1][1]]
+        return contracts[0]["bin_hex"], contracts[0]["abi"]
+
+    def evict(self):
+        paths = [os.path.join(self.cache_dir, file_name) for file_name in os.listdir(self.cache_dir)
+                 if file_name.endswith(".json")]
+        if len(paths) <= self.max_entries:
+            return
+        entries = []
+        for path in paths:
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                # Entry was evicted by another process
+                pass
+        for modified_at, path in sorted(entries)[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def link_libraries(bytecode, addresses):
+        if addresses:
+            for library_name, library_address in addresses.iteritems():
+                if library_address.startswith("0x"):
+                    library_address = library_address[2:]
+                bytecode = bytecode.replace("__{}{}".format(library_name, "_" * (38 - len(library_name))),
+                                            library_address)
+        return bytecode
+
+    @staticmethod
+    def link_addresses(bytecode, sentinels, addresses):
+        for placeholder, sentinel in sentinels.iteritems():
+            if not addresses or placeholder not in addresses:
+                raise ValueError("Address for placeholder {} is missing.".format(placeholder))
+            address = addresses[placeholder]
+            if address.startswith("0x"):
+                address = address[2:]
+            bytecode = bytecode.replace(sentinel, address.lower().zfill(40))
+        return bytecode
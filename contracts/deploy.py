@@ -1,10 +1,11 @@
 from ethjsonrpc import EthJsonRpc
-from ethereum.tester import languages
 from ethereum import tester as t
 from ethereum.abi import ContractTranslator
 from ethereum.transactions import Transaction
 from ethereum.utils import privtoaddr
 from preprocessor import PreProcessor
+from json_rpc import BatchJsonRpc
+from compilation_cache import CompilationCache
 import click
 import time
 import json
@@ -13,74 +14,207 @@ import logging
 logging.basicConfig(level=logging.INFO)
 
 
+class NonceManager:
+
+    def __init__(self, json_rpc, address):
+        self.json_rpc = json_rpc
+        self.address = address
+        self.next_nonce = None
+        # Nonces of rejected or dropped transactions, which have to be used again
+        self.gaps = []
+
+    def get_transaction_count(self):
+        return int(self.json_rpc.eth_getTransactionCount(self.address, 'pending')["result"][2:], 16)
+
+    def sync(self):
+        transaction_count = self.get_transaction_count()
+        # Nonces below the transaction count were used by mined or pending transactions
+        self.gaps = [nonce for nonce in self.gaps if nonce >= transaction_count]
+        if self.next_nonce is None or self.next_nonce < transaction_count:
+            self.next_nonce = transaction_count
+            self.gaps = []
+
+    def allocate(self):
+        if self.next_nonce is None:
+            self.sync()
+        # Fill gaps first, transactions with higher nonces are not mined until all gaps are closed
+        if self.gaps:
+            return self.gaps.pop(0)
+        nonce = self.next_nonce
+        self.next_nonce += 1
+        return nonce
+
+    def release(self, nonce):
+        self.gaps = sorted(set(self.gaps + [nonce]))
+        while self.gaps and self.gaps[-1] == self.next_nonce - 1:
+            self.next_nonce = self.gaps.pop()
+
+
+class ReceiptTracker:
+
+    def __init__(self, batch_json_rpc, min_interval=0.1, max_interval=5):
+        self.batch_json_rpc = batch_json_rpc
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def get_block_number(self):
+        return int(self.batch_json_rpc.batch([("eth_blockNumber", [])])[0]["result"], 16)
+
+    def as_completed(self, transaction_hashes, resend=None):
+        # Yields (transaction hash, receipt) as soon as a receipt lands. Receipts of all outstanding transactions are
+        # requested in one batch whenever a new block was mined. Polling backs off while no block is mined.
+        # Dropped transactions are replaced by the transaction hash returned by resend.
+        outstanding = dict([(transaction_hash, transaction_hash) for transaction_hash in transaction_hashes])
+        block_number = None
+        interval = self.min_interval
+        while outstanding:
+            current_block_number = self.get_block_number()
+            if current_block_number == block_number:
+                interval = min(interval * 2, self.max_interval)
+            else:
+                block_number = current_block_number
+                interval = self.min_interval
+                transaction_hashes = outstanding.keys()
+                calls = [("eth_getTransactionReceipt", [transaction_hash]) for transaction_hash in transaction_hashes]
+                if resend:
+                    calls += [("eth_getTransactionByHash", [transaction_hash])
+                              for transaction_hash in transaction_hashes]
+                responses = self.batch_json_rpc.batch(calls)
+                for i, transaction_hash in enumerate(transaction_hashes):
+                    if responses[i]["result"] is not None:
+                        yield outstanding.pop(transaction_hash), responses[i]["result"]
+                    elif resend and responses[len(transaction_hashes) + i]["result"] is None:
+                        outstanding[resend(transaction_hash)] = outstanding.pop(transaction_hash)
+                if not outstanding:
+                    break
+            logging.info('Waiting for {} transaction receipts in block {}'.format(len(outstanding), block_number))
+            time.sleep(interval)
+
+
 class Deploy:
 
-    def __init__(self, protocol, host, port, add_dev_code, verify_code, contract_dir, gas, gas_price, private_key):
+    def __init__(self, protocol, host, port, add_dev_code, verify_code, contract_dir, gas, gas_price, private_key,
+                 link_addresses='true'):
         self.pp = PreProcessor()
+        self.compilation_cache = CompilationCache()
         self.s = t.state()
         self.s.block.number = 1150000  # Homestead
         t.gas_limit = int(gas)
         self.json_rpc = EthJsonRpc(protocol=protocol, host=host, port=port)
+        self.batch_json_rpc = BatchJsonRpc(protocol=protocol, host=host, port=port)
+        self.receipt_tracker = ReceiptTracker(self.batch_json_rpc)
         if private_key:
             self.user_address = '0x' + privtoaddr(private_key.decode('hex')).encode('hex')
         else:
             self.user_address = self.json_rpc.eth_coinbase()["result"]
         self.add_dev_code = add_dev_code == 'true'
         self.verify_code = verify_code == 'true'
+        self.link_addresses = link_addresses == 'true'
         self.contract_dir = contract_dir
         self.gas = int(gas)
         self.gas_price = int(gas_price)
         self.private_key = private_key
+        self.nonce_manager = NonceManager(self.json_rpc, self.user_address) if private_key else None
+        # transaction hash => (raw transaction, data, contract address, nonce) of signed transactions
+        self.signed_transactions = {}
         self.contract_addresses = {}
         self.contract_abis = {}
 
+    def wait_for_transaction_receipts(self, transaction_hashes):
+        resend = self.resend_raw_transaction if self.private_key else None
+        for transaction_hash, receipt in self.receipt_tracker.as_completed(transaction_hashes, resend):
+            self.signed_transactions.pop(receipt["transactionHash"], None)
+            yield transaction_hash, receipt
+
     def wait_for_transaction_receipt(self, transaction_hash):
-        while self.json_rpc.eth_getTransactionReceipt(transaction_hash)['result'] is None:
-            logging.info('Waiting for transaction receipt {}'.format(transaction_hash))
-            time.sleep(5)
+        for transaction_hash, receipt in self.wait_for_transaction_receipts([transaction_hash]):
+            return receipt
 
     def replace_address(self, a):
         return self.contract_addresses[a] if isinstance(a, basestring) and a in self.contract_addresses else a
 
-    def get_nonce(self):
-        return int(self.json_rpc.eth_getTransactionCount(self.user_address)["result"][2:], 16)
-
-    def get_raw_transaction(self, data, contract_address=''):
-        nonce = self.get_nonce()
+    def get_raw_transaction(self, data, contract_address, nonce):
         tx = Transaction(nonce, self.gas_price, self.gas, contract_address, 0, data.decode('hex'))
         tx.sign(self.private_key.decode('hex'))
         return rlp.encode(tx).encode('hex')
 
+    def send_raw_transaction(self, data, contract_address=''):
+        # Nonces are assigned locally, a burst of transactions is signed and sent without waiting for the node
+        nonce = self.nonce_manager.allocate()
+        raw_tx = self.get_raw_transaction(data, contract_address, nonce)
+        tx_response = self.json_rpc.eth_sendRawTransaction("0x" + raw_tx)
+        while 'error' in tx_response:
+            logging.info('Transaction failed with error {}. Retry!'.format(tx_response['error']))
+            # The rejected transaction leaves a gap, which is filled by the retry
+            self.nonce_manager.release(nonce)
+            time.sleep(5)
+            self.nonce_manager.sync()
+            nonce = self.nonce_manager.allocate()
+            raw_tx = self.get_raw_transaction(data, contract_address, nonce)
+            tx_response = self.json_rpc.eth_sendRawTransaction("0x" + raw_tx)
+        self.signed_transactions[tx_response['result']] = (raw_tx, data, contract_address, nonce)
+        return tx_response['result']
+
+    def resend_raw_transaction(self, transaction_hash):
+        raw_tx, data, contract_address, nonce = self.signed_transactions.pop(transaction_hash)
+        logging.info('Transaction {} was dropped. Resend!'.format(transaction_hash))
+        tx_response = self.json_rpc.eth_sendRawTransaction("0x" + raw_tx)
+        if 'error' in tx_response:
+            if self.json_rpc.eth_getTransactionByHash(transaction_hash)['result'] is not None:
+                # Transaction is known to the node again
+                self.signed_transactions[transaction_hash] = (raw_tx, data, contract_address, nonce)
+                return transaction_hash
+            # Nonce was used by another transaction in the meantime
+            self.nonce_manager.sync()
+            return self.send_raw_transaction(data, contract_address)
+        self.signed_transactions[tx_response['result']] = (raw_tx, data, contract_address, nonce)
+        return tx_response['result']
+
     def code_is_valid(self, contract_address, compiled_code):
         deployed_code = self.json_rpc.eth_getCode(contract_address)["result"]
         locally_deployed_code_address = self.s.evm(compiled_code.decode("hex")).encode("hex")
         locally_deployed_code = self.s.block.get_code(locally_deployed_code_address).encode("hex")
         return deployed_code == "0x" + locally_deployed_code
 
-    @staticmethod
-    def compile_code(code, language):
-        combined = languages[language].combined(code)
-        compiled_code = combined[-1][1]["bin_hex"]
-        abi = combined[-1][1]["abi"]
-        return compiled_code, abi
+    def compile_code(self, code, language):
+        return self.compilation_cache.compile(code, language)
 
     @staticmethod
     def replace_library_placeholders(bytecode, addresses):
-        if addresses:
-            for library_name, library_address in addresses.iteritems():
-                bytecode = bytecode.replace("__{}{}".format(library_name, "_" * (38 - len(library_name))), library_address[2:])
-        return bytecode
+        return CompilationCache.link_libraries(bytecode, addresses)
 
-    def deploy_code(self, file_path, params, addresses):
+    @staticmethod
+    def get_contract_name(file_path):
+        return file_path.split("/")[-1].split(".")[0]
+
+    def send_data(self, data, contract_address=''):
+        if self.private_key:
+            return self.send_raw_transaction(data, contract_address)
+        to_address = contract_address or None
+        tx_response = self.json_rpc.eth_sendTransaction(self.user_address, to_address=to_address, data=data,
+                                                        gas=self.gas, gas_price=self.gas_price)
+        while 'error' in tx_response:
+            logging.info('Transaction failed with error {}. Retry!'.format(tx_response['error']))
+            time.sleep(5)
+            tx_response = self.json_rpc.eth_sendTransaction(self.user_address, to_address=to_address, data=data,
+                                                            gas=self.gas, gas_price=self.gas_price)
+        return tx_response['result']
+
+    def send_deployment(self, file_path, params, addresses):
         if addresses:
             addresses = dict([(k, self.replace_address(v)) for k, v in addresses.iteritems()])
         language = "solidity" if file_path.endswith(".sol") else "serpent"
         code = self.pp.process(file_path,
                                add_dev_code=self.add_dev_code,
                                contract_dir=self.contract_dir,
-                               addresses=addresses)
+                               addresses=None if self.link_addresses else addresses)
+        sentinels = {}
+        if self.link_addresses:
+            # compile code independent of contract addresses and link addresses in bytecode
+            code, sentinels = self.pp.insert_sentinel_addresses(code)
         # compile code
         bytecode, abi = self.compile_code(code, language)
+        bytecode = CompilationCache.link_addresses(bytecode, sentinels, addresses)
         # replace library placeholders
         bytecode = self.replace_library_placeholders(bytecode, addresses)
         if params:
@@ -90,97 +224,158 @@ class Deploy:
             bytecode += translator.encode_constructor_arguments(params).encode("hex")
         logging.info('Try to create contract with length {} based on code in file: {}'.format(len(bytecode),
                                                                                               file_path))
-        if self.private_key:
-            raw_tx = self.get_raw_transaction(bytecode)
-            tx_response = self.json_rpc.eth_sendRawTransaction("0x" + raw_tx)
-            while "error" in tx_response:
-                logging.info('Deploy failed with error {}. Retry!'.format(tx_response['error']))
-                time.sleep(5)
-                tx_response = self.json_rpc.eth_sendRawTransaction("0x" + raw_tx)
-        else:
-            tx_response = self.json_rpc.eth_sendTransaction(self.user_address, data=bytecode, gas=self.gas,
-                                                            gas_price=self.gas_price)
-            while "error" in tx_response:
-                logging.info('Deploy failed with error {}. Retry!'.format(tx_response['error']))
-                time.sleep(5)
-                tx_response = self.json_rpc.eth_sendTransaction(self.user_address, data=bytecode, gas=self.gas,
-                                                                gas_price=self.gas_price)
-        transaction_hash = tx_response['result']
-        self.wait_for_transaction_receipt(transaction_hash)
-        contract_address = self.json_rpc.eth_getTransactionReceipt(transaction_hash)["result"]["contractAddress"]
+        transaction_hash = self.send_data(bytecode)
+        return transaction_hash, bytecode, abi
+
+    def register_deployment(self, file_path, params, addresses, receipt, bytecode, abi):
+        contract_address = receipt["contractAddress"]
         # Verify deployed code with locally deployed code
         if self.verify_code and not self.code_is_valid(contract_address, bytecode):
             logging.info('Deploy of {} failed. Retry!'.format(file_path))
             self.deploy_code(file_path, params, addresses)
-        contract_name = file_path.split("/")[-1].split(".")[0]
+            return
+        contract_name = self.get_contract_name(file_path)
         self.contract_addresses[contract_name] = contract_address
         self.contract_abis[contract_name] = abi
         logging.info('Contract {} was created at address {}.'.format(file_path, contract_address))
 
-    def send_transaction(self, contract, name, params):
+    def deploy_code(self, file_path, params, addresses):
+        transaction_hash, bytecode, abi = self.send_deployment(file_path, params, addresses)
+        receipt = self.wait_for_transaction_receipt(transaction_hash)
+        self.register_deployment(file_path, params, addresses, receipt, bytecode, abi)
+
+    def send_function_transaction(self, contract, name, params):
         contract_address = self.replace_address(contract)
         contract_abi = self.contract_abis[contract]
         translator = ContractTranslator(contract_abi)
         data = translator.encode(name, [self.replace_address(p) for p in params]).encode("hex")
         logging.info('Try to send {} transaction to contract {}.'.format(name, contract))
-        if self.private_key:
-            raw_tx = self.get_raw_transaction(data, contract_address)
-            tx_response = self.json_rpc.eth_sendRawTransaction("0x" + raw_tx)
-            while 'error' in tx_response:
-                logging.info('Transaction failed with error {}. Retry!'.format(tx_response['error']))
-                time.sleep(5)
-                tx_response = self.json_rpc.eth_sendRawTransaction("0x" + raw_tx)
-        else:
-            tx_response = self.json_rpc.eth_sendTransaction(self.user_address, to_address=contract_address, data=data,
-                                                            gas=self.gas, gas_price=self.gas_price)
-            while 'error' in tx_response:
-                logging.info('Transaction failed with error {}. Retry!'.format(tx_response['error']))
-                time.sleep(5)
-                tx_response = self.json_rpc.eth_sendTransaction(self.user_address, to_address=contract_address,
-                                                                data=data, gas=self.gas, gas_price=self.gas_price)
-        transaction_hash = tx_response['result']
+        return self.send_data(data, contract_address)
+
+    def send_transaction(self, contract, name, params):
+        transaction_hash = self.send_function_transaction(contract, name, params)
         self.wait_for_transaction_receipt(transaction_hash)
         logging.info('Transaction {} for contract {} completed.'.format(name, contract))
 
+    def assert_calls(self, assertions):
+        # Executes all assertions and the balance request in one batch and reports all failed assertions together
+        calls = [("eth_getBalance", [self.user_address, "latest"])]
+        translators = []
+        for assertion in assertions:
+            contract_address = self.replace_address(assertion["contract"])
+            translator = ContractTranslator(self.contract_abis[assertion["contract"]])
+            params = [self.replace_address(p) for p in assertion["params"]] if "params" in assertion else []
+            data = translator.encode(assertion["name"], params).encode("hex")
+            logging.info('Try to assert return value of {} in contract {}.'.format(assertion["name"],
+                                                                                 assertion["contract"]))
+            calls.append(("eth_call", [{"to": contract_address, "data": "0x" + data}, "latest"]))
+            translators.append(translator)
+        responses = self.batch_json_rpc.batch(calls)
+        logging.info('Your balance: {} Wei'.format(int(responses[0]['result'], 16)))
+        failed_assertions = []
+        for assertion, translator, response in zip(assertions, translators, responses[1:]):
+            return_value = self.replace_address(assertion["return"])
+            if "error" in response:
+                failed_assertions.append('Call of {} in contract {} failed with error {}.'.format(
+                    assertion["name"], assertion["contract"], response["error"]))
+                continue
+            result_decoded = translator.decode(assertion["name"], response["result"][2:].decode("hex"))
+            result_decoded = result_decoded if len(result_decoded) > 1 else result_decoded[0]
+            if result_decoded != return_value:
+                failed_assertions.append('Return value of {} in contract {} is {} instead of {}.'.format(
+                    assertion["name"], assertion["contract"], result_decoded, return_value))
+            else:
+                logging.info('Assertion successful for return value of {} in contract {}.'.format(
+                    assertion["name"], assertion["contract"]))
+        if failed_assertions:
+            raise AssertionError("\n".join(failed_assertions))
+
     def assert_call(self, contract, name, params, return_value):
-        contract_address = self.replace_address(contract)
-        return_value = self.replace_address(return_value)
-        contract_abi = self.contract_abis[contract]
-        translator = ContractTranslator(contract_abi)
-        data = translator.encode(name, [self.replace_address(p) for p in params]).encode("hex")
-        logging.info('Try to assert return value of {} in contract {}.'.format(name, contract))
-        bc_return_val = self.json_rpc.eth_call(to_address=contract_address, data=data)["result"]
-        result_decoded = translator.decode(name, bc_return_val[2:].decode("hex"))
-        result_decoded = result_decoded if len(result_decoded) > 1 else result_decoded[0]
-        assert result_decoded == return_value
-        logging.info('Assertion successful for return value of {} in contract {}.'.format(name, contract))
+        self.assert_calls([{"contract": contract, "name": name, "params": params, "return": return_value}])
+
+    @classmethod
+    def get_dependencies(cls, instruction):
+        # Returns contract names written and read by an instruction. Names are resolved like replace_address does.
+        references = [p for p in instruction.get("params", []) if isinstance(p, basestring)]
+        if instruction["type"] == "deployment":
+            references += [a for a in (instruction.get("addresses") or {}).values() if isinstance(a, basestring)]
+            return [cls.get_contract_name(instruction["file"])], references
+        elif instruction["type"] == "transaction":
+            return [instruction["contract"]], references
+        if isinstance(instruction.get("return"), basestring):
+            references.append(instruction["return"])
+        return [], [instruction["contract"]] + references
+
+    @classmethod
+    def schedule(cls, instructions):
+        # Groups instructions into waves. All instructions of a wave only depend on instructions of earlier waves.
+        deployed = set()
+        last_write = {}
+        last_access = {}
+        waves = []
+        for instruction in instructions:
+            writes, reads = cls.get_dependencies(instruction)
+            # Only names of contracts deployed by an earlier instruction are replaced
+            writes = [name for name in writes if name in deployed or instruction["type"] == "deployment"]
+            reads = [name for name in reads if name in deployed]
+            wave = max([last_write.get(name, -1) + 1 for name in reads] +
+                       [last_access.get(name, -1) + 1 for name in writes] + [0])
+            for name in writes:
+                last_write[name] = wave
+                last_access[name] = wave
+            for name in reads:
+                last_access[name] = max(last_access.get(name, -1), wave)
+            if instruction["type"] == "deployment":
+                deployed.add(cls.get_contract_name(instruction["file"]))
+            if wave == len(waves):
+                waves.append([])
+            waves[wave].append(instruction)
+        return waves
+
+    def process_wave(self, wave):
+        # Broadcast all transactions of the wave before waiting for any receipt
+        pending = {}
+        for instruction in wave:
+            if instruction["type"] == "deployment":
+                transaction_hash, bytecode, abi = self.send_deployment(
+                    instruction["file"],
+                    instruction["params"] if "params" in instruction else None,
+                    instruction["addresses"] if "addresses" in instruction else None,
+                )
+                pending[transaction_hash] = (instruction, bytecode, abi)
+            elif instruction["type"] == "transaction":
+                transaction_hash = self.send_function_transaction(
+                    instruction["contract"],
+                    instruction["name"],
+                    instruction["params"] if "params" in instruction else [],
+                )
+                pending[transaction_hash] = (instruction, None, None)
+        # Assertions of the wave only read state of earlier waves
+        self.assert_calls([instruction for instruction in wave if instruction["type"] == "assertion"])
+        # Complete instructions in the order their receipts land
+        for transaction_hash, receipt in self.wait_for_transaction_receipts(pending.keys()):
+            instruction, bytecode, abi = pending[transaction_hash]
+            if instruction["type"] == "deployment":
+                self.register_deployment(
+                    instruction["file"],
+                    instruction["params"] if "params" in instruction else None,
+                    instruction["addresses"] if "addresses" in instruction else None,
+                    receipt,
+                    bytecode,
+                    abi
+                )
+            else:
+                logging.info('Transaction {} for contract {} completed.'.format(instruction["name"],
+                                                                               instruction["contract"]))
 
     def process(self, f):
         with open(f) as data_file:
             instructions = json.load(data_file)
             logging.info('Your address: {}'.format(self.user_address))
-            for instruction in instructions:
-                logging.info('Your balance: {} Wei'.format(
-                    int(self.json_rpc.eth_getBalance(self.user_address)['result'], 16)))
-                if instruction["type"] == "deployment":
-                    self.deploy_code(
-                        instruction["file"],
-                        instruction["params"] if "params" in instruction else None,
-                        instruction["addresses"] if "addresses" in instruction else None,
-                    )
-                elif instruction["type"] == "transaction":
-                    self.send_transaction(
-                        instruction["contract"],
-                        instruction["name"],
-                        instruction["params"] if "params" in instruction else [],
-                    )
-                elif instruction["type"] == "assertion":
-                    self.assert_call(
-                        instruction["contract"],
-                        instruction["name"],
-                        instruction["params"] if "params" in instruction else [],
-                        instruction["return"]
-                    )
+            waves = self.schedule(instructions)
+            for i, wave in enumerate(waves):
+                logging.info('Processing wave {} of {} with {} instructions.'.format(i + 1, len(waves), len(wave)))
+                self.process_wave(wave)
             for contract_name, contract_address in self.contract_addresses.iteritems():
                 logging.info('Contract {} was created at address {}.'.format(contract_name, contract_address))
 
@@ -196,8 +391,11 @@ class Deploy:
 @click.option('-gas', default='4712388', help='Transaction gas')
 @click.option('-gas_price', default='50000000000', help='Transaction gas price')
 @click.option('-private_key', help='Private key as hex to sign transactions')
-def setup(f, protocol, host, port, add_dev_code, verify_code, contract_dir, gas, gas_price, private_key):
-    deploy = Deploy(protocol, host, port, add_dev_code, verify_code, contract_dir, gas, gas_price, private_key)
+@click.option('-link_addresses', default='true', help='Link contract addresses in bytecode instead of source code')
+def setup(f, protocol, host, port, add_dev_code, verify_code, contract_dir, gas, gas_price, private_key,
+          link_addresses):
+    deploy = Deploy(protocol, host, port, add_dev_code, verify_code, contract_dir, gas, gas_price, private_key,
+                    link_addresses)
     deploy.process(f)
 
 if __name__ == '__main__':
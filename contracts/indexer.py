@@ -0,0 +1,343 @@
+from ethereum.abi import ContractTranslator
+from ethereum.utils import sha3
+from json_rpc import BatchJsonRpc
+import click
+import sqlite3
+import logging
+logging.basicConfig(level=logging.INFO)
+
+
+def event_topic(signature):
+    return "0x" + sha3(signature).encode('hex')
+
+
+def address_from_topic(topic):
+    return "0x" + topic[-40:]
+
+
+EVENT_CREATION = event_topic("EventCreation(address,bytes32)")
+MARKET_CREATION = event_topic("MarketCreation(address,bytes32)")
+MARKET_CLOSING = event_topic("MarketClosing(address,bytes32)")
+CAMPAIGN_CREATION = event_topic("CampaignCreation(address,bytes32)")
+FUNDING = event_topic("Funding(address,uint256,bytes32)")
+TRANSFER = event_topic("Transfer(address,address,uint256)")
+
+# Read functions used to complete logged hashes
+ABI = [
+    {"type": "function", "name": "getEvent", "constant": True,
+     "inputs": [{"name": "eventHash", "type": "bytes32"}],
+     "outputs": [{"name": "descriptionHash", "type": "bytes32"}, {"name": "isRanged", "type": "bool"},
+                 {"name": "lowerBound", "type": "int256"}, {"name": "upperBound", "type": "int256"},
+                 {"name": "outcomeCount", "type": "uint256"}, {"name": "token", "type": "address"},
+                 {"name": "oracle", "type": "address"}, {"name": "oracleEventIdentifier", "type": "bytes32"},
+                 {"name": "isWinningOutcomeSet", "type": "bool"}, {"name": "winningOutcome", "type": "int256"}]},
+    {"type": "function", "name": "getOutcomeToken", "constant": True,
+     "inputs": [{"name": "eventHash", "type": "bytes32"}, {"name": "outcomeIndex", "type": "uint256"}],
+     "outputs": [{"name": "outcomeToken", "type": "address"}]},
+    {"type": "function", "name": "getMarket", "constant": True,
+     "inputs": [{"name": "marketHash", "type": "bytes32"}],
+     "outputs": [{"name": "eventHash", "type": "bytes32"}, {"name": "fee", "type": "uint256"},
+                 {"name": "collectedFees", "type": "uint256"}, {"name": "initialFunding", "type": "uint256"},
+                 {"name": "investor", "type": "address"}, {"name": "marketMaker", "type": "address"},
+                 {"name": "createdAtBlock", "type": "uint256"}]},
+    {"type": "function", "name": "getCampaigns", "constant": True,
+     "inputs": [{"name": "campaignHashes", "type": "bytes32[]"}],
+     "outputs": [{"name": "allCampaigns", "type": "uint256[]"}]}
+]
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS checkpoints (name TEXT PRIMARY KEY, block_number INTEGER);
+    CREATE TABLE IF NOT EXISTS events (
+        event_hash TEXT PRIMARY KEY, event_factory TEXT, creator TEXT, description_hash TEXT, is_ranged INTEGER,
+        lower_bound TEXT, upper_bound TEXT, outcome_count INTEGER, token TEXT, oracle TEXT,
+        oracle_event_identifier TEXT, block_number INTEGER);
+    CREATE INDEX IF NOT EXISTS events_oracle ON events (oracle);
+    CREATE INDEX IF NOT EXISTS events_creator ON events (creator);
+    CREATE INDEX IF NOT EXISTS events_description_hash ON events (description_hash);
+    CREATE TABLE IF NOT EXISTS outcome_tokens (address TEXT PRIMARY KEY, event_hash TEXT, outcome_index INTEGER);
+    CREATE INDEX IF NOT EXISTS outcome_tokens_event_hash ON outcome_tokens (event_hash);
+    CREATE TABLE IF NOT EXISTS markets (
+        market_hash TEXT PRIMARY KEY, market_factory TEXT, event_hash TEXT, investor TEXT, market_maker TEXT,
+        fee TEXT, initial_funding TEXT, block_number INTEGER, closed_at_block INTEGER);
+    CREATE INDEX IF NOT EXISTS markets_event_hash ON markets (event_hash);
+    CREATE INDEX IF NOT EXISTS markets_investor ON markets (investor);
+    CREATE TABLE IF NOT EXISTS campaigns (
+        campaign_hash TEXT PRIMARY KEY, crowdfunding TEXT, creator TEXT, market_factory TEXT, token TEXT,
+        market_maker TEXT, event_hash TEXT, fee TEXT, initial_funding TEXT, total_funding TEXT,
+        closing_at_timestamp INTEGER, block_number INTEGER);
+    CREATE INDEX IF NOT EXISTS campaigns_event_hash ON campaigns (event_hash);
+    CREATE TABLE IF NOT EXISTS fundings (
+        block_number INTEGER, log_index INTEGER, campaign_hash TEXT, investor TEXT, investment TEXT,
+        PRIMARY KEY (block_number, log_index));
+    CREATE INDEX IF NOT EXISTS fundings_campaign_hash ON fundings (campaign_hash);
+    CREATE TABLE IF NOT EXISTS transfers (
+        block_number INTEGER, log_index INTEGER, token TEXT, sender TEXT, receiver TEXT, value TEXT,
+        PRIMARY KEY (block_number, log_index));
+    CREATE INDEX IF NOT EXISTS transfers_token ON transfers (token);
+    CREATE INDEX IF NOT EXISTS transfers_sender ON transfers (sender);
+    CREATE INDEX IF NOT EXISTS transfers_receiver ON transfers (receiver);
+"""
+
+
+class JsonRpcLogSource:
+
+    def __init__(self, batch_json_rpc):
+        self.batch_json_rpc = batch_json_rpc
+
+    def get_block_number(self):
+        return int(self.batch_json_rpc.batch([("eth_blockNumber", [])])[0]["result"], 16)
+
+    def get_logs(self, from_block, to_block, addresses, topics):
+        log_filter = {"fromBlock": hex(from_block), "toBlock": hex(to_block), "address": addresses,
+                      "topics": [topics]}
+        response = self.batch_json_rpc.batch([("eth_getLogs", [log_filter])])[0]
+        if "error" in response:
+            raise Exception("Logs could not be loaded: {}".format(response["error"]))
+        return [{
+            "address": log["address"].lower(),
+            "topics": [topic.lower() for topic in log["topics"]],
+            "data": log["data"],
+            "block_number": int(log["blockNumber"], 16),
+            "log_index": int(log["logIndex"], 16)
+        } for log in response["result"]]
+
+    def call(self, calls):
+        # Sends all (address, data, block number) calls in one batch and returns the output of each call. Calls are
+        # executed on the state of their block, so data deleted in later blocks can be read.
+        responses = self.batch_json_rpc.batch([("eth_call", [{"to": address, "data": "0x" + data.encode('hex')},
+                                                             hex(block_number)])
+                                               for address, data, block_number in calls])
+        return [response["result"][2:].decode('hex') for response in responses]
+
+
+class TesterLogSource:
+
+    def __init__(self, state, sender):
+        # Logs are read from mined blocks of a tester state
+        self.state = state
+        self.sender = sender
+
+    def get_block_number(self):
+        return self.state.block.number - 1
+
+    def get_logs(self, from_block, to_block, addresses, topics):
+        logs = []
+        for block in self.state.blocks:
+            if block.number < from_block or block.number > to_block or block.number == self.state.block.number:
+                continue
+            log_index = 0
+            for receipt in block.get_receipts():
+                for log in receipt.logs:
+                    address = "0x" + log.address.encode('hex')
+                    topic_hashes = ["0x{:064x}".format(topic) for topic in log.topics]
+                    if address in addresses and topic_hashes and topic_hashes[0] in topics:
+                        logs.append({
+                            "address": address,
+                            "topics": topic_hashes,
+                            "data": "0x" + log.data.encode('hex'),
+                            "block_number": block.number,
+                            "log_index": log_index
+                        })
+                    log_index += 1
+        return logs
+
+    def call(self, calls):
+        # The tester has no calls without transaction, calls are sent as transactions on the block of each call and
+        # reverted afterwards
+        outputs = []
+        current_block = self.state.block
+        try:
+            for address, data, block_number in calls:
+                self.state.block = [block for block in self.state.blocks if block.number == block_number][0]
+                snapshot = self.state.block.snapshot()
+                try:
+                    outputs.append(self.state.send(self.sender, address[2:].decode('hex'), 0, data))
+                finally:
+                    self.state.block.revert(snapshot)
+        finally:
+            self.state.block = current_block
+        return outputs
+
+
+class Indexer:
+
+    CHECKPOINT = "last_block"
+
+    def __init__(self, source, database_path, event_factories, market_factories=(), crowdfundings=(), start_block=0,
+                 block_range=1000, confirmations=0, address_chunk_size=500):
+        self.source = source
+        self.database = sqlite3.connect(database_path)
+        self.database.row_factory = sqlite3.Row
+        self.database.executescript(SCHEMA)
+        self.event_factories = [address.lower() for address in event_factories]
+        self.market_factories = [address.lower() for address in market_factories]
+        self.crowdfundings = [address.lower() for address in crowdfundings]
+        self.start_block = start_block
+        self.block_range = block_range
+        self.confirmations = confirmations
+        self.address_chunk_size = address_chunk_size
+        self.translator = ContractTranslator(ABI)
+
+    def get_checkpoint(self):
+        row = self.database.execute("SELECT block_number FROM checkpoints WHERE name = ?",
+                                    (self.CHECKPOINT,)).fetchone()
+        return row["block_number"] if row else self.start_block - 1
+
+    def sync(self):
+        # Indexes all blocks with enough confirmations in ranges of block_range blocks. Returns last indexed block.
+        last_block = self.source.get_block_number() - self.confirmations
+        from_block = self.get_checkpoint() + 1
+        while from_block <= last_block:
+            to_block = min(from_block + self.block_range - 1, last_block)
+            self.index_range(from_block, to_block)
+            from_block = to_block + 1
+        return self.get_checkpoint()
+
+    def index_range(self, from_block, to_block):
+        # Logs and checkpoint of a range are committed in one transaction
+        with self.database:
+            logs = self.source.get_logs(from_block, to_block,
+                                        self.event_factories + self.market_factories + self.crowdfundings,
+                                        [EVENT_CREATION, MARKET_CREATION, MARKET_CLOSING, CAMPAIGN_CREATION,
+                                         FUNDING])
+            logs.sort(key=lambda log: (log["block_number"], log["log_index"]))
+            self.index_events([log for log in logs if log["topics"][0] == EVENT_CREATION
+                               and log["address"] in self.event_factories])
+            self.index_markets([log for log in logs if log["topics"][0] in [MARKET_CREATION, MARKET_CLOSING]
+                                and log["address"] in self.market_factories])
+            self.index_campaigns([log for log in logs if log["topics"][0] in [CAMPAIGN_CREATION, FUNDING]
+                                  and log["address"] in self.crowdfundings])
+            # Outcome tokens of events created in this range are known now. Transfers are loaded with address
+            # filters of at most address_chunk_size tokens, nodes reject filters and results above their limits.
+            outcome_tokens = [row["address"] for row in self.database.execute(
+                "SELECT address FROM outcome_tokens ORDER BY address")]
+            for i in range(0, len(outcome_tokens), self.address_chunk_size):
+                self.index_transfers(self.source.get_logs(from_block, to_block,
+                                                          outcome_tokens[i:i + self.address_chunk_size], [TRANSFER]))
+            self.database.execute("INSERT OR REPLACE INTO checkpoints (name, block_number) VALUES (?, ?)",
+                                  (self.CHECKPOINT, to_block))
+        logging.info('Indexed blocks {} to {}: {} logs.'.format(from_block, to_block, len(logs)))
+
+    def call(self, function_name, calls):
+        # Calls are (address, arguments, block number)
+        outputs = self.source.call([(address, self.translator.encode(function_name, args), block_number)
+                                    for address, args, block_number in calls])
+        return [self.translator.decode(function_name, output) for output in outputs]
+
+    def index_events(self, logs):
+        if not logs:
+            return
+        events = self.call("getEvent", [(log["address"], [log["topics"][2][2:].decode('hex')], log["block_number"])
+                                        for log in logs])
+        outcome_token_calls = []
+        for log, event in zip(logs, events):
+            event_hash = log["topics"][2]
+            outcome_token_calls += [(log["address"], [event_hash[2:].decode('hex'), outcome_index],
+                                     log["block_number"]) for outcome_index in range(event[4])]
+            self.database.execute("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                event_hash, log["address"], address_from_topic(log["topics"][1]), "0x" + event[0].encode('hex'),
+                int(event[1]), str(event[2]), str(event[3]), event[4], "0x" + event[5], "0x" + event[6],
+                "0x" + event[7].encode('hex'), log["block_number"]))
+        outcome_tokens = self.call("getOutcomeToken", outcome_token_calls)
+        for (address, (event_hash, outcome_index), block_number), outcome_token in zip(outcome_token_calls,
+                                                                                        outcome_tokens):
+            self.database.execute("INSERT OR REPLACE INTO outcome_tokens VALUES (?, ?, ?)",
+                                  ("0x" + outcome_token[0], "0x" + event_hash.encode('hex'), outcome_index))
+
+    def index_markets(self, logs):
+        creations = [log for log in logs if log["topics"][0] == MARKET_CREATION]
+        # Closed markets are deleted, markets are read at the block of their creation
+        markets = self.call("getMarket", [(log["address"], [log["topics"][2][2:].decode('hex')], log["block_number"])
+                                          for log in creations]) if creations else []
+        for log, market in zip(creations, markets):
+            self.database.execute("INSERT OR REPLACE INTO markets VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)", (
+                log["topics"][2], log["address"], "0x" + market[0].encode('hex'),
+                address_from_topic(log["topics"][1]), "0x" + market[5], str(market[1]), str(market[3]),
+                log["block_number"]))
+        for log in logs:
+            if log["topics"][0] == MARKET_CLOSING:
+                self.database.execute("UPDATE markets SET closed_at_block = ? WHERE market_hash = ?",
+                                      (log["block_number"], log["topics"][2]))
+
+    def index_campaigns(self, logs):
+        creations = [log for log in logs if log["topics"][0] == CAMPAIGN_CREATION]
+        campaigns = self.call("getCampaigns", [(log["address"], [[log["topics"][2][2:].decode('hex')]],
+                                                log["block_number"]) for log in creations]) if creations else []
+        for log, campaign in zip(creations, campaigns):
+            # Encoded campaign: hash, market factory, token, market maker, event hash, market hash, fee,
+            # initial funding, total funding, raised amount, closing timestamp, collected fees, initial shares
+            campaign = campaign[0]
+            self.database.execute("INSERT OR REPLACE INTO campaigns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                log["topics"][2], log["address"], address_from_topic(log["topics"][1]),
+                "0x{:040x}".format(campaign[1]), "0x{:040x}".format(campaign[2]), "0x{:040x}".format(campaign[3]),
+                "0x{:064x}".format(campaign[4]), str(campaign[6]), str(campaign[7]), str(campaign[8]),
+                campaign[10], log["block_number"]))
+        for log in logs:
+            if log["topics"][0] == FUNDING:
+                self.database.execute("INSERT OR IGNORE INTO fundings VALUES (?, ?, ?, ?, ?)", (
+                    log["block_number"], log["log_index"], log["topics"][2], address_from_topic(log["topics"][1]),
+                    str(int(log["data"][2:66], 16))))
+
+    def index_transfers(self, logs):
+        for log in logs:
+            self.database.execute("INSERT OR IGNORE INTO transfers VALUES (?, ?, ?, ?, ?, ?)", (
+                log["block_number"], log["log_index"], log["address"], address_from_topic(log["topics"][1]),
+                address_from_topic(log["topics"][2]), str(int(log["data"][2:66], 16))))
+
+    def query(self, table, **conditions):
+        # Returns rows of table matching all conditions as dictionaries
+        conditions = [(column, value.lower() if isinstance(value, basestring) else value)
+                      for column, value in sorted(conditions.iteritems()) if value is not None]
+        sql = "SELECT * FROM {}".format(table)
+        if conditions:
+            sql += " WHERE " + " AND ".join("{} = ?".format(column) for column, value in conditions)
+        return [dict(row) for row in self.database.execute(sql + " ORDER BY block_number",
+                                                           [value for column, value in conditions])]
+
+    def get_events(self, oracle=None, creator=None, description_hash=None):
+        return self.query("events", oracle=oracle, creator=creator, description_hash=description_hash)
+
+    def get_markets(self, event_hash=None, investor=None):
+        return self.query("markets", event_hash=event_hash, investor=investor)
+
+    def get_campaigns(self, event_hash=None):
+        return self.query("campaigns", event_hash=event_hash)
+
+    def get_fundings(self, campaign_hash):
+        return self.query("fundings", campaign_hash=campaign_hash)
+
+    def get_outcome_tokens(self, event_hash):
+        return [dict(row) for row in self.database.execute(
+            "SELECT * FROM outcome_tokens WHERE event_hash = ? ORDER BY outcome_index", (event_hash.lower(),))]
+
+    def get_transfers(self, address):
+        # Returns outcome token transfers from or to address with event hash and outcome index of each token.
+        # Issued and revoked outcome tokens are not logged.
+        return [dict(row) for row in self.database.execute(
+            "SELECT transfers.*, outcome_tokens.event_hash, outcome_tokens.outcome_index "
+            "FROM transfers JOIN outcome_tokens ON transfers.token = outcome_tokens.address "
+            "WHERE transfers.sender = ? OR transfers.receiver = ? "
+            "ORDER BY transfers.block_number, transfers.log_index", (address.lower(), address.lower()))]
+
+
+@click.command()
+@click.option('-database', default='index.db', help='SQLite database file')
+@click.option('-protocol', default="http", help='Ethereum server protocol')
+@click.option('-host', default="localhost", help='Ethereum server host')
+@click.option('-port', default='8545', help='Ethereum server port')
+@click.option('-event_factory', multiple=True, help='Event factory address')
+@click.option('-market_factory', multiple=True, help='Market factory address')
+@click.option('-crowdfunding', multiple=True, help='Market crowdfunding address')
+@click.option('-start_block', default=0, help='First block to index')
+@click.option('-block_range', default=1000, help='Number of blocks indexed at once')
+@click.option('-confirmations', default=12, help='Number of confirmations before a block is indexed')
+@click.option('-address_chunk_size', default=500, help='Number of outcome tokens per transfer log request')
+def setup(database, protocol, host, port, event_factory, market_factory, crowdfunding, start_block, block_range,
+          confirmations, address_chunk_size):
+    source = JsonRpcLogSource(BatchJsonRpc(protocol, host, port))
+    indexer = Indexer(source, database, event_factory, market_factory, crowdfunding, start_block, block_range,
+                      confirmations, address_chunk_size)
+    indexer.sync()
+
+if __name__ == '__main__':
+    setup()
@@ -0,0 +1,22 @@
+import requests
+import json
+
+
+class BatchJsonRpc:
+
+    def __init__(self, protocol="http", host="localhost", port=8545):
+        self.url = "{}://{}:{}".format(protocol, host, port)
+        self.session = requests.Session()
+        self.request_id = 0
+
+    def batch(self, calls):
+        # Sends all (method, params) calls in one request. Returns responses in the order of the calls.
+        if not calls:
+            return []
+        payload = []
+        for method, params in calls:
+            self.request_id += 1
+            payload.append({"jsonrpc": "2.0", "method": method, "params": params, "id": self.request_id})
+        response = self.session.post(self.url, data=json.dumps(payload), headers={"Content-Type": "application/json"})
+        responses = dict([(r["id"], r) for r in response.json()])
+        return [responses[p["id"]] for p in payload]
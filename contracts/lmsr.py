@@ -0,0 +1,472 @@
+import math
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+UINT256 = 2 ** 256
+
+
+class MathLibrary:
+
+    # Python version of contracts/solidity/Utils/MathLibrary.sol. All operations are truncated to uint256 like in the
+    # EVM, results are identical to the results of the contract.
+
+    ONE = 0x10000000000000000
+    LN2 = 0xb17217f7d1cf79ac
+    LOG2E = 0x171547652b82fe177
+    E_EXP_COEFFICIENTS = [0xb172182739bc0e46, 0x3d7f78a624cfb9b5, 0xe359bcfeb6e4531, 0x27601df2fc048dc,
+                          0x5808a728816ee8, 0x95dedef350bc9]
+    E_EXP_CONSTANT = 0x16aee6e8ef
+    # Coefficients are alternately subtracted and added
+    LN_COEFFICIENTS = [0x443b9c5adb08cc45f, 0xf0a52590f17c71a3f, 0x2478f22e787502b023, 0x48c6de1480526b8d4c,
+                       0x70c18cae824656408c, 0x883c81ec0ce7abebb2, 0x81814da94fe52ca9f5, 0x616361924625d1acf5,
+                       0x39f9a16fb9292a608d, 0x1b3049a5740b21d65f, 0x9ee1408bd5ad96f3e, 0x2c465c91703b7a7f4,
+                       0x918d2d5f045a4d63, 0x14ca095145f44f78, 0x1d806fc412c1b99, 0x13950b4e1e89cc]
+    LN_CONSTANT = ONE * 10
+    FLOOR_LOG2_MAX = 190
+    # The fraction z of eExp is below ONE, so all powers of z and all terms are below their coefficient. If the sum of
+    # all coefficients is below ONE, the polynomial can be evaluated with unsigned 64 bit integers.
+    E_EXP_UINT64_SAFE = sum(E_EXP_COEFFICIENTS) + E_EXP_CONSTANT < ONE
+    BATCH_SIZE = 100000
+
+    @classmethod
+    def e_exp(cls, x):
+        y = x * cls.ONE % UINT256 // cls.LN2
+        # 2**(y / ONE) overflows to 0 in the EVM
+        exponent = y // cls.ONE
+        shift = 2 ** exponent if exponent < 256 else 0
+        z = y % cls.ONE
+        zpow = z
+        result = cls.ONE
+        for i, coefficient in enumerate(cls.E_EXP_COEFFICIENTS):
+            if i:
+                zpow = zpow * z // cls.ONE
+            result += coefficient * zpow // cls.ONE
+        result += cls.E_EXP_CONSTANT
+        return shift * result % UINT256
+
+    @classmethod
+    def ln(cls, x):
+        ilog2 = cls.floor_log2(x)
+        z = x // 2 ** ilog2
+        zpow = cls.ONE
+        result = cls.LN_CONSTANT
+        for i, coefficient in enumerate(cls.LN_COEFFICIENTS):
+            if i:
+                zpow = zpow * z % UINT256 // cls.ONE
+            if i % 2:
+                result = (result + coefficient * zpow % UINT256 // cls.ONE) % UINT256
+            else:
+                result = (result - coefficient * zpow % UINT256 // cls.ONE) % UINT256
+        return (ilog2 * cls.ONE + result - cls.LN_CONSTANT) % UINT256 * cls.ONE % UINT256 // cls.LOG2E
+
+    @classmethod
+    def floor_log2(cls, x):
+        # Same result as the binary search of the contract: the highest bit of x / ONE, limited to [0, 190]
+        return min(max((x // cls.ONE).bit_length() - 1, 0), cls.FLOOR_LOG2_MAX)
+
+    @classmethod
+    def e_exp_batch(cls, xs, batch_size=None):
+        exps = []
+        for chunk in cls.chunks(xs, batch_size or cls.BATCH_SIZE):
+            if numpy is None or not cls.E_EXP_UINT64_SAFE:
+                exps.extend(cls.e_exp(x) for x in chunk)
+                continue
+            ys = [x * cls.ONE % UINT256 // cls.LN2 for x in chunk]
+            z = numpy.array([y % cls.ONE for y in ys], dtype=numpy.uint64)
+            zpow = z
+            # Result without ONE
+            result = numpy.zeros(len(chunk), dtype=numpy.uint64)
+            for i, coefficient in enumerate(cls.E_EXP_COEFFICIENTS):
+                if i:
+                    zpow = cls.multiply_uint64(zpow, z)
+                result += cls.multiply_uint64(numpy.uint64(coefficient), zpow)
+            result += numpy.uint64(cls.E_EXP_CONSTANT)
+            exps.extend(((cls.ONE + fraction) << y // cls.ONE) % UINT256 if y // cls.ONE < 256 else 0
+                        for y, fraction in zip(ys, result.tolist()))
+        return exps
+
+    @classmethod
+    def ln_batch(cls, xs, batch_size=None):
+        # Powers of z grow beyond 64 bits in ln, so there is no fast path
+        logs = []
+        for chunk in cls.chunks(xs, batch_size or cls.BATCH_SIZE):
+            logs.extend(cls.ln(x) for x in chunk)
+        return logs
+
+    @staticmethod
+    def multiply_uint64(a, b):
+        # Returns a * b / ONE for unsigned 64 bit integers, multiplying 32 bit halves to avoid overflows
+        mask = numpy.uint64(0xffffffff)
+        bits = numpy.uint64(32)
+        a_low, a_high = a & mask, a >> bits
+        b_low, b_high = b & mask, b >> bits
+        high_low = a_high * b_low
+        middle = (a_low * b_low >> bits) + (high_low & mask) + a_low * b_high
+        return a_high * b_high + (high_low >> bits) + (middle >> bits)
+
+    @staticmethod
+    def chunks(values, size):
+        chunk = []
+        for value in values:
+            chunk.append(value)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class LMSRMarketMaker:
+
+    # Python version of contracts/solidity/MarketMakers/LMSRMarketMaker.sol returning the same quotes as the contract
+    # without EVM calls.
+
+    ONE = MathLibrary.ONE
+    FEE_RANGE = 100000
+    SPREAD = 2
+
+    @classmethod
+    def calc_inv_b(cls, outcome_count):
+        return MathLibrary.ln(outcome_count * cls.ONE) // 10000
+
+    @classmethod
+    def calc_costs_buying(cls, initial_funding, share_distribution, outcome_index, share_count, inv_b=None, c1=None):
+        # inv_b and c1 only depend on the market and can be passed if they are known already
+        if inv_b is None:
+            inv_b = cls.calc_inv_b(len(share_distribution))
+        share_range = cls.get_share_range(share_distribution)
+        if c1 is None:
+            c1 = cls.calc_costs(inv_b, share_range, share_distribution, initial_funding)
+        share_distribution = list(share_distribution)
+        share_distribution[outcome_index] = (share_distribution[outcome_index] - share_count) % UINT256
+        c2 = cls.calc_costs(inv_b, share_range, share_distribution, initial_funding)
+        return cls.calc_buying_costs(c1, c2, initial_funding, share_count)
+
+    @classmethod
+    def calc_earnings_selling(cls, initial_funding, share_distribution, outcome_index, share_count, inv_b=None):
+        if inv_b is None:
+            inv_b = cls.calc_inv_b(len(share_distribution))
+        share_range = cls.get_share_range(share_distribution)
+        share_range[1] = (share_range[1] + share_count) % UINT256
+        c1 = cls.calc_costs(inv_b, share_range, share_distribution, initial_funding)
+        share_distribution = list(share_distribution)
+        share_distribution[outcome_index] = (share_distribution[outcome_index] + share_count) % UINT256
+        c2 = cls.calc_costs(inv_b, share_range, share_distribution, initial_funding)
+        return cls.calc_selling_earnings(c1, c2, initial_funding)
+
+    @classmethod
+    def calc_buying_costs(cls, c1, c2, initial_funding, share_count):
+        costs = (c2 - c1) % UINT256 * (initial_funding // 10000) % UINT256 * (cls.FEE_RANGE + cls.SPREAD) \
+            % UINT256 // cls.FEE_RANGE // cls.ONE
+        # Make sure costs are not bigger than 1 per share
+        return min(costs, share_count)
+
+    @classmethod
+    def calc_selling_earnings(cls, c1, c2, initial_funding):
+        return (c1 - c2) % UINT256 * (initial_funding // 10000) % UINT256 * (cls.FEE_RANGE - cls.SPREAD) \
+            % UINT256 // cls.FEE_RANGE // cls.ONE
+
+    @staticmethod
+    def get_initial_funding_divisor(initial_funding):
+        # The contract divides by initialFunding / 10000, which is zero for smaller funding
+        if initial_funding < 10000:
+            raise ValueError("Initial funding is below 10000.")
+        return initial_funding // 10000
+
+    @classmethod
+    def calc_costs(cls, inv_b, share_range, share_distribution, initial_funding):
+        initial_funding_divisor = cls.get_initial_funding_divisor(initial_funding)
+        inner_sum = sum(cls.calc_term(inv_b, share_range[1], shares, initial_funding_divisor)
+                        for shares in share_distribution)
+        return cls.calc_costs_from_sum(inv_b, inner_sum)
+
+    @staticmethod
+    def calc_term(inv_b, highest_shares, shares, initial_funding_divisor):
+        # shareRange[1] - shareRange[0] - (shares - shareRange[0]) is shareRange[1] - shares modulo 2**256
+        return MathLibrary.e_exp((highest_shares - shares) % UINT256 // initial_funding_divisor * inv_b % UINT256)
+
+    @classmethod
+    def calc_costs_from_sum(cls, inv_b, inner_sum):
+        return MathLibrary.ln(inner_sum % UINT256) * cls.ONE % UINT256 // inv_b
+
+    @staticmethod
+    def get_share_range(share_distribution):
+        return [min(share_distribution), max(share_distribution)]
+
+    @classmethod
+    def calc_costs_buying_batch(cls, quotes):
+        # Quotes are tuples (initial funding, share distribution, outcome index, share count). Costs of the current
+        # share distribution are calculated once per market.
+        inv_bs = {}
+        market_costs = {}
+        costs = []
+        for initial_funding, share_distribution, outcome_index, share_count in quotes:
+            outcome_count = len(share_distribution)
+            if outcome_count not in inv_bs:
+                inv_bs[outcome_count] = cls.calc_inv_b(outcome_count)
+            market = (initial_funding, tuple(share_distribution))
+            if market not in market_costs:
+                market_costs[market] = cls.calc_costs(inv_bs[outcome_count], cls.get_share_range(share_distribution),
+                                                      share_distribution, initial_funding)
+            costs.append(cls.calc_costs_buying(initial_funding, share_distribution, outcome_index, share_count,
+                                               inv_bs[outcome_count], market_costs[market]))
+        return costs
+
+    @classmethod
+    def calc_earnings_selling_batch(cls, quotes):
+        inv_bs = {}
+        earnings = []
+        for initial_funding, share_distribution, outcome_index, share_count in quotes:
+            outcome_count = len(share_distribution)
+            if outcome_count not in inv_bs:
+                inv_bs[outcome_count] = cls.calc_inv_b(outcome_count)
+            earnings.append(cls.calc_earnings_selling(initial_funding, share_distribution, outcome_index, share_count,
+                                                      inv_bs[outcome_count]))
+        return earnings
+
+
+class LMSRMarketState:
+
+    # Share distribution of one market with cached exponential terms of all outcomes. Buying quotes and trades
+    # changing one outcome update one term, all terms are only calculated again if the highest share count changes.
+
+    def __init__(self, initial_funding, share_distribution):
+        self.initial_funding = initial_funding
+        self.initial_funding_divisor = LMSRMarketMaker.get_initial_funding_divisor(initial_funding)
+        self.share_distribution = list(share_distribution)
+        self.inv_b = LMSRMarketMaker.calc_inv_b(len(share_distribution))
+        self.share_range = None
+        self.terms = None
+        self.inner_sum = None
+        self.costs = None
+        self.recompute()
+
+    def recompute(self):
+        self.share_range = LMSRMarketMaker.get_share_range(self.share_distribution)
+        self.terms = [self.calc_term(shares) for shares in self.share_distribution]
+        self.inner_sum = sum(self.terms)
+        self.costs = LMSRMarketMaker.calc_costs_from_sum(self.inv_b, self.inner_sum)
+
+    def calc_term(self, shares):
+        return LMSRMarketMaker.calc_term(self.inv_b, self.share_range[1], shares, self.initial_funding_divisor)
+
+    def calc_costs_buying(self, outcome_index, share_count):
+        shares = (self.share_distribution[outcome_index] - share_count) % UINT256
+        inner_sum = self.inner_sum - self.terms[outcome_index] + self.calc_term(shares)
+        return LMSRMarketMaker.calc_buying_costs(self.costs,
+                                                 LMSRMarketMaker.calc_costs_from_sum(self.inv_b, inner_sum),
+                                                 self.initial_funding,
+                                                 share_count)
+
+    def calc_earnings_selling(self, outcome_index, share_count):
+        # Selling increases the highest share count used by the contract, so all terms change
+        return LMSRMarketMaker.calc_earnings_selling(self.initial_funding, self.share_distribution, outcome_index,
+                                                     share_count, self.inv_b)
+
+    def set_shares(self, outcome_index, shares):
+        previous_shares = self.share_distribution[outcome_index]
+        self.share_distribution[outcome_index] = shares
+        if shares > self.share_range[1] or previous_shares == self.share_range[1] and shares < previous_shares:
+            # Highest share count changed
+            self.recompute()
+            return
+        if shares < self.share_range[0]:
+            self.share_range[0] = shares
+        elif previous_shares == self.share_range[0] and shares > previous_shares:
+            self.share_range[0] = min(self.share_distribution)
+        term = self.calc_term(shares)
+        self.inner_sum += term - self.terms[outcome_index]
+        self.terms[outcome_index] = term
+        self.costs = LMSRMarketMaker.calc_costs_from_sum(self.inv_b, self.inner_sum)
+
+    def add_to_all_shares(self, share_count):
+        # Differences to the highest share count don't change, terms stay the same
+        if self.share_range[0] + share_count < 0 or self.share_range[1] + share_count >= UINT256:
+            raise ValueError("Market maker out of funds.")
+        self.share_distribution = [shares + share_count for shares in self.share_distribution]
+        self.share_range = [self.share_range[0] + share_count, self.share_range[1] + share_count]
+
+    def buy_shares(self, outcome_index, share_count, costs=None):
+        # Updates shares like DefaultMarketFactory.buyShares and returns costs without fees
+        if costs is None:
+            costs = self.calc_costs_buying(outcome_index, share_count)
+        if costs == 0:
+            raise ValueError("Amount of shares too low.")
+        if share_count > self.share_distribution[outcome_index] + costs:
+            raise ValueError("Market maker out of funds.")
+        self.add_to_all_shares(costs)
+        self.set_shares(outcome_index, self.share_distribution[outcome_index] - share_count)
+        return costs
+
+    def sell_shares(self, outcome_index, share_count, earnings=None):
+        # Updates shares like DefaultMarketFactory.sellShares and shortSellShares and returns earnings without fees
+        if earnings is None:
+            earnings = self.calc_earnings_selling(outcome_index, share_count)
+        if earnings == 0:
+            raise ValueError("Amount of shares too low.")
+        previous_shares = self.share_distribution[outcome_index]
+        self.set_shares(outcome_index, previous_shares + share_count)
+        if self.share_range[0] < earnings:
+            self.set_shares(outcome_index, previous_shares)
+            raise ValueError("Market maker out of funds.")
+        self.add_to_all_shares(-earnings)
+        return earnings
+
+
+class LMSRQuoteSolver:
+
+    # Finds the highest share count a budget can buy or short sell in a DefaultMarketFactory market. Total costs
+    # include the market fee and the base fee for shares. Results are bracketed within ranges where costs grow with
+    # the share count and narrowed down with interpolation steps on exact costs of cached market state.
+
+    FEE_RANGE = 1000000
+    BASE_FEE_RANGE = 1000000
+
+    def __init__(self, initial_funding, share_distribution, fee=0, base_fee=0):
+        self.market_state = LMSRMarketState(initial_funding, share_distribution)
+        self.fee = fee
+        self.base_fee = base_fee
+        self.curves = {}
+
+    def calc_market_fee(self, token_count):
+        return token_count * self.fee // self.FEE_RANGE
+
+    def calc_base_fee_for_shares(self, share_count):
+        return share_count * self.BASE_FEE_RANGE // (self.BASE_FEE_RANGE - self.base_fee) - share_count
+
+    def calc_buying_costs(self, outcome_index, share_count, costs=None):
+        # Returns total costs of DefaultMarketFactory.buyShares or None if the market is out of funds
+        if costs is None:
+            costs = self.market_state.calc_costs_buying(outcome_index, share_count)
+        if share_count > self.market_state.share_distribution[outcome_index] + costs:
+            return None
+        return costs + self.calc_market_fee(costs) + self.calc_base_fee_for_shares(share_count)
+
+    def calc_short_selling_costs(self, outcome_index, share_count):
+        # Returns total costs of DefaultMarketFactory.shortSellShares or None if the market is out of funds
+        earnings = self.market_state.calc_earnings_selling(outcome_index, share_count)
+        share_distribution = list(self.market_state.share_distribution)
+        share_distribution[outcome_index] += share_count
+        if min(share_distribution) < earnings:
+            return None
+        return share_count + self.calc_base_fee_for_shares(share_count) - (earnings - self.calc_market_fee(earnings))
+
+    def get_costs(self, cost_function, outcome_index, share_count):
+        curve = self.curves.setdefault((cost_function.__name__, outcome_index), {})
+        if share_count not in curve:
+            curve[share_count] = cost_function(outcome_index, share_count)
+        return curve[share_count]
+
+    def max_shares_buying(self, outcome_index, budget):
+        # Returns share count and max spending for buyShares. The contract divides the shares of the bought outcome
+        # by initialFunding / 10000 before calling eExp, so costs without fees only change every divisor shares.
+        # The highest affordable block of shares is searched first, then the share count within the block.
+        divisor = self.market_state.initial_funding_divisor
+        offset = self.market_state.share_range[1] - self.market_state.share_distribution[outcome_index]
+
+        def first_share_count(block):
+            return max(block * divisor - offset, 0)
+
+        def block_costs(block):
+            return self.get_costs(self.calc_buying_costs, outcome_index, first_share_count(block))
+        block = self.search(block_costs, budget,
+                            (offset + self.estimate_shares_buying(outcome_index, budget)) // divisor,
+                            offset // divisor)
+        last_share_count = (block + 1) * divisor - offset - 1
+        costs = self.market_state.calc_costs_buying(outcome_index, last_share_count)
+        share_count = self.search(lambda share_count: self.calc_buying_costs(outcome_index, share_count,
+                                                                             min(costs, share_count)),
+                                  budget, last_share_count, first_share_count(block), last_share_count)
+        if share_count == 0 or min(costs, share_count) == 0:
+            return 0, 0
+        return share_count, self.calc_buying_costs(outcome_index, share_count, min(costs, share_count))
+
+    def max_shares_short_selling(self, outcome_index, budget):
+        # Returns share count and total costs for shortSellShares. Selling raises the highest share count, so the
+        # contract divides the distance of every outcome to it by initialFunding / 10000 and earnings change at one
+        # share count per outcome in every block of divisor shares. Costs grow between these steps and drop at them,
+        # but grow from block to block at the same step. The highest affordable block is searched for every step,
+        # then the share count up to the next step.
+        divisor = self.market_state.initial_funding_divisor
+        highest_shares = self.market_state.share_range[1]
+        steps = sorted(set([0] + [(shares - highest_shares) % divisor
+                                  for shares in self.market_state.share_distribution]))
+        estimate = self.estimate_shares_short_selling(outcome_index, budget)
+
+        def costs(share_count):
+            return self.get_costs(self.calc_short_selling_costs, outcome_index, share_count)
+        share_count = 0
+        for i, step in enumerate(steps):
+            if costs(step) is None or costs(step) > budget:
+                continue
+            block = self.search(lambda block: costs(block * divisor + step), budget, (estimate - step) // divisor)
+            next_step = block * divisor + (steps[i + 1] if i + 1 < len(steps) else divisor)
+            share_count = max(share_count, self.search(costs, budget, next_step - 1, block * divisor + step,
+                                                       next_step - 1))
+        if share_count == 0 or self.market_state.calc_earnings_selling(outcome_index, share_count) == 0:
+            return 0, 0
+        return share_count, costs(share_count)
+
+    def estimate_shares_buying(self, outcome_index, budget):
+        # Continuous LMSR inverse on the cached terms, only used as a starting point
+        one = float(LMSRMarketMaker.ONE)
+        b = self.market_state.initial_funding / (self.market_state.inv_b / one * 10000)
+        costs = budget / (1 + float(self.fee) / self.FEE_RANGE) / (1 + float(LMSRMarketMaker.SPREAD) /
+                                                                   LMSRMarketMaker.FEE_RANGE)
+        term = self.market_state.terms[outcome_index] / one
+        inner_sum = self.market_state.inner_sum / one
+        try:
+            return int(b * math.log((inner_sum * (math.exp(costs / b) - 1) + term) / term))
+        except (OverflowError, ValueError, ZeroDivisionError):
+            return budget
+
+    def estimate_shares_short_selling(self, outcome_index, budget):
+        # Short selling one share costs about one minus the price of the outcome
+        price = float(self.market_state.terms[outcome_index]) / self.market_state.inner_sum
+        return int(budget / max(1 - price * (1 - float(self.fee) / self.FEE_RANGE), 1e-9))
+
+    @staticmethod
+    def search(cost_function, budget, estimate, lowest_value=0, highest_value=None):
+        # Returns the highest value in [lowest_value, highest_value] with costs within budget. Costs of
+        # lowest_value are expected to be within budget, None means costs are too high.
+        def is_affordable(value):
+            if highest_value is not None and value > highest_value:
+                return False
+            costs = cost_function(value)
+            return costs is not None and costs <= budget
+        estimate = max(estimate, lowest_value)
+        if highest_value is not None:
+            estimate = min(estimate, highest_value)
+        # Bracket the result: lowest is affordable, highest is not
+        step = max((estimate - lowest_value) >> 20, 1)
+        if is_affordable(estimate):
+            lowest, highest = estimate, estimate + step
+            while is_affordable(highest):
+                lowest, step = highest, step * 2
+                highest = lowest + step
+        else:
+            highest = estimate
+            lowest = max(estimate - step, lowest_value)
+            while lowest > lowest_value and not is_affordable(lowest):
+                highest, step = lowest, step * 2
+                lowest = max(highest - step, lowest_value)
+        # Interpolate between costs of the bracket and bisect if interpolation doesn't halve the bracket
+        bisect = False
+        while highest - lowest > 1:
+            highest_costs = cost_function(highest) if highest_value is None or highest <= highest_value else None
+            if bisect or highest_costs is None:
+                value = (lowest + highest) // 2
+            else:
+                lowest_costs = cost_function(lowest)
+                value = lowest + (budget - lowest_costs) * (highest - lowest) // max(highest_costs - lowest_costs, 1)
+                value = min(max(value, lowest + 1), highest - 1)
+            width = highest - lowest
+            if is_affordable(value):
+                lowest = value
+            else:
+                highest = value
+            bisect = not bisect and highest - lowest > width // 2
+        return lowest
@@ -0,0 +1,65 @@
+from ethereum.abi import ContractTranslator
+
+ABI = [
+    {"type": "function", "name": "aggregate", "constant": True,
+     "inputs": [{"name": "targets", "type": "address[]"}, {"name": "data", "type": "bytes"},
+                {"name": "dataLengths", "type": "uint256[]"}, {"name": "resultLengths", "type": "uint256[]"},
+                {"name": "callGasLimit", "type": "uint256"}],
+     "outputs": [{"name": "results", "type": "uint256[]"}]}
+]
+
+
+def is_dynamic(_type):
+    return _type.endswith("]") or _type in ["bytes", "string"]
+
+
+class Multicall:
+
+    def __init__(self, client, address, gas_limit=4712388, call_gas_limit=500000):
+        # client calls the Multicall contract at address like the clients of the bulk reader. Every call gets at most
+        # call_gas_limit gas, so a failing call doesn't use the gas of the following calls.
+        self.client = client
+        self.address = address
+        self.gas_limit = gas_limit
+        self.call_gas_limit = call_gas_limit
+        self.translator = ContractTranslator(ABI)
+        self.calls = []
+
+    def add(self, translator, target, function_name, args, result_length=None):
+        # Adds call to the batch and returns its index. Results of functions with dynamic return types are cut to
+        # result_length words including the offset and length words of the ABI encoding.
+        if result_length is None:
+            decode_types = translator.function_data[function_name]["decode_types"]
+            if any(is_dynamic(_type) for _type in decode_types):
+                raise ValueError("Result length of {} is required.".format(function_name))
+            result_length = len(decode_types)
+        self.calls.append((translator, target, function_name, translator.encode(function_name, args),
+                           result_length))
+        return len(self.calls) - 1
+
+    def execute(self):
+        # Executes all added calls in one call. Returns decoded results, None for failed calls.
+        calls, self.calls = self.calls, []
+        if not calls:
+            return []
+        output = self.client.call(self.address, self.translator.encode("aggregate", [
+            [target for translator, target, function_name, data, result_length in calls],
+            "".join(data for translator, target, function_name, data, result_length in calls),
+            [len(data) for translator, target, function_name, data, result_length in calls],
+            [result_length for translator, target, function_name, data, result_length in calls],
+            self.call_gas_limit
+        ]), self.gas_limit)
+        if output is None:
+            raise Exception("Multicall failed.")
+        words = self.translator.decode("aggregate", output)[0]
+        results = []
+        position = 0
+        for translator, target, function_name, data, result_length in calls:
+            if words[position]:
+                result = translator.decode(function_name, "".join(
+                    "{:064x}".format(word).decode('hex') for word in words[position + 1:position + 1 + result_length]))
+                results.append(result[0] if len(result) == 1 else result)
+            else:
+                results.append(None)
+            position += 1 + result_length
+        return results
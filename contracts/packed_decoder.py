@@ -0,0 +1,163 @@
+import binascii
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Each record of a packed uint[] consists of fixed fields, the item count and count items. Field types define the
+# column types: bytes32 and address columns hold raw bytes, uint256 and int256 columns hold Python integers. NumPy
+# columns of bytes32 and address values are void arrays keeping all bytes, values are read with tobytes().
+LAYOUTS = {
+    "getEventHashes": ([("description_hash", "bytes32")], [("event_hash", "bytes32")]),
+    "getMarketHashes": ([("event_hash", "bytes32")], [("market_hash", "bytes32")]),
+    "getEvents": ([("event_hash", "bytes32"), ("description_hash", "bytes32"), ("is_ranged", "bool"),
+                   ("lower_bound", "int256"), ("upper_bound", "int256"), ("token", "address"),
+                   ("oracle", "address"), ("oracle_event_identifier", "bytes32"),
+                   ("is_winning_outcome_set", "bool"), ("winning_outcome", "int256")],
+                  [("outcome_tokens", "address")]),
+    "getMarkets": ([("market_hash", "bytes32"), ("event_hash", "bytes32"), ("fee", "uint256"),
+                    ("collected_fees", "uint256"), ("initial_funding", "uint256"), ("investor", "address"),
+                    ("market_maker", "address"), ("created_at_block", "uint64")],
+                   [("shares", "uint256")]),
+    "getShares": ([("event_hash", "bytes32")], [("shares", "uint256")]),
+    "getCampaigns": ([("campaign_hash", "bytes32"), ("market_factory", "address"), ("token", "address"),
+                      ("market_maker", "address"), ("event_hash", "bytes32"), ("market_hash", "bytes32"),
+                      ("fee", "uint256"), ("initial_funding", "uint256"), ("total_funding", "uint256"),
+                      ("raised_amount", "uint256"), ("closing_at_timestamp", "uint64"),
+                      ("collected_fees", "uint256")],
+                     [("initial_shares", "uint256")]),
+    "getOracleOutcomes": ([("description_hash", "bytes32")],
+                          [("oracle", "address"), ("submission_at_timestamp", "uint64"), ("outcome", "int256"),
+                           ("challenged", "bool")])
+}
+
+DTYPES = {"bytes32": "V32", "address": "V20", "bool": "?", "uint64": "u8", "uint256": "O", "int256": "O"}
+
+
+class PackedColumns:
+
+    def __init__(self, records, items, offsets):
+        # Columns of fixed fields and items. Items of record i are items[offsets[i]:offsets[i + 1]].
+        self.records = records
+        self.items = items
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def get_items(self, index):
+        if numpy is not None and isinstance(self.items, numpy.ndarray):
+            return self.items[self.offsets[index]:self.offsets[index + 1]]
+        return dict((name, column[self.offsets[index]:self.offsets[index + 1]])
+                    for name, column in self.items.iteritems())
+
+
+class PackedDecoder:
+
+    WORD = 32
+
+    @classmethod
+    def get_words(cls, data):
+        # Returns memoryview of the array words in the ABI encoded return value of a function returning uint[]
+        data = memoryview(data)
+        offset = cls.read_int(data, 0)
+        length = cls.read_int(data, offset)
+        return data[offset + cls.WORD:offset + cls.WORD + length * cls.WORD]
+
+    @classmethod
+    def read_int(cls, words, position):
+        return int(binascii.hexlify(words[position:position + cls.WORD].tobytes()), 16)
+
+    @classmethod
+    def get_record_starts(cls, words, fixed_count, item_width):
+        # Returns word positions and item counts of all records
+        starts = []
+        counts = []
+        word_count = len(words) // cls.WORD
+        position = 0
+        while position < word_count:
+            count = cls.read_int(words, (position + fixed_count) * cls.WORD)
+            starts.append(position)
+            counts.append(count)
+            position += fixed_count + 1 + count * item_width
+        if position != word_count:
+            raise ValueError("Array ends within a record.")
+        return starts, counts
+
+    @classmethod
+    def decode(cls, function_name, data):
+        # Decodes the ABI encoded return value of a packed getter into columns
+        fields, item_fields = LAYOUTS[function_name]
+        words = cls.get_words(data)
+        starts, counts = cls.get_record_starts(words, len(fields), len(item_fields))
+        if numpy is None:
+            return cls.decode_lists(words, fields, item_fields, starts, counts)
+        return cls.decode_arrays(words, fields, item_fields, starts, counts)
+
+    @staticmethod
+    def to_int(value, _type):
+        value = int(binascii.hexlify(value), 16)
+        if _type == "int256" and value >= 2**255:
+            value -= 2**256
+        return value
+
+    @classmethod
+    def convert_words(cls, rows, _type):
+        # Converts rows of a uint8 array with shape (n, 32) to a column
+        if _type == "bytes32":
+            return numpy.ascontiguousarray(rows).view("V32").ravel()
+        if _type == "address":
+            return numpy.ascontiguousarray(rows[:, 12:]).view("V20").ravel()
+        if _type == "bool":
+            return rows[:, 31] != 0
+        if _type == "uint64":
+            return numpy.ascontiguousarray(rows[:, 24:]).view(">u8").ravel().astype(numpy.uint64)
+        column = numpy.empty(len(rows), dtype=object)
+        column[:] = [cls.to_int(row.tobytes(), _type) for row in rows]
+        return column
+
+    @classmethod
+    def decode_arrays(cls, words, fields, item_fields, starts, counts):
+        # Words are viewed in place, only the selected fields are gathered into columns
+        rows = numpy.frombuffer(words, dtype=numpy.uint8).reshape(-1, cls.WORD)
+        starts = numpy.array(starts, dtype=numpy.int64)
+        counts = numpy.array(counts, dtype=numpy.int64)
+        offsets = numpy.zeros(len(starts) + 1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=offsets[1:])
+        records = numpy.empty(len(starts), dtype=[(name, DTYPES[_type]) for name, _type in fields])
+        for i, (name, _type) in enumerate(fields):
+            records[name] = cls.convert_words(rows[starts + i], _type)
+        # Position of the first word of every item
+        item_starts = numpy.repeat(starts + len(fields) + 1, counts) + \
+            (numpy.arange(offsets[-1]) - numpy.repeat(offsets[:-1], counts)) * len(item_fields)
+        items = numpy.empty(len(item_starts), dtype=[(name, DTYPES[_type]) for name, _type in item_fields])
+        for i, (name, _type) in enumerate(item_fields):
+            items[name] = cls.convert_words(rows[item_starts + i], _type)
+        return PackedColumns(records, items, offsets)
+
+    @classmethod
+    def convert_word(cls, word, _type):
+        if _type == "bytes32":
+            return word
+        if _type == "address":
+            return word[12:]
+        if _type == "bool":
+            return word[31:] != "\x00"
+        return cls.to_int(word, _type)
+
+    @classmethod
+    def decode_lists(cls, words, fields, item_fields, starts, counts):
+        def word(position):
+            return words[position * cls.WORD:(position + 1) * cls.WORD].tobytes()
+        records = dict((name, [cls.convert_word(word(start + i), _type) for start in starts])
+                       for i, (name, _type) in enumerate(fields))
+        items = dict((name, []) for name, _type in item_fields)
+        offsets = [0]
+        for start, count in zip(starts, counts):
+            for j in range(count):
+                for i, (name, _type) in enumerate(item_fields):
+                    items[name].append(cls.convert_word(word(start + len(fields) + 1 + j * len(item_fields) + i),
+                                                        _type))
+            offsets.append(offsets[-1] + count)
+        return PackedColumns(records, items, offsets)
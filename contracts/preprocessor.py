@@ -1,7 +1,16 @@
+from ethereum.utils import sha3
+import os
 import re
 
 
 class PreProcessor:
+
+    IMPORT_PATTERN = re.compile(r'import "(\S*)";')
+    MACRO_PATTERN = re.compile(r'macro:(.*?);|[{}]')
+
+    # path => ((modification time, size), code, code segments, declared names)
+    file_cache = {}
+
     def __init__(self):
         self.dev_code = """
     event Log(uint);
@@ -16,47 +25,87 @@ class PreProcessor:
     """
 
     @staticmethod
-    def find_macro(code):
-        return re.search(r'macro:(.*?);', code)
-
-    @staticmethod
-    def find_scope_end(code, start_pos):
-        brackets_counter = 0
-        index = 0
-        for index, char in enumerate(code[start_pos:]):
-            if char == "{":
-                brackets_counter += 1
-            elif char == "}":
-                brackets_counter -= 1
-            if brackets_counter < 0:
-                break
-        return start_pos + index
+    def apply_macros(code, macros):
+        for token, solidity_code in macros:
+            code = code.replace(token, solidity_code)
+        return code
 
     def resolve_macros(self, code):
-        # replace macros
-        macro = self.find_macro(code)
-        while macro:
-            token, solidity_code = [x.strip() for x in macro.group()[6:-1].split("=")]
-            scope_end = self.find_scope_end(code, macro.end())
-            new_code = code[macro.end():scope_end].replace(token, solidity_code)
-            code = code[:macro.start()] + new_code + code[scope_end:]
-            macro = self.find_macro(code)
-        return code
+        # Expands all macros in one pass. A macro replaces its token from its definition until the end of the
+        # enclosing scope. Macros are applied in definition order, so macros can use previously defined macros.
+        expanded_code = []
+        macros = []
+        # Number of macros defined in each open scope
+        scope_macro_counts = [0]
+        position = 0
+        for match in self.MACRO_PATTERN.finditer(code):
+            expanded_code.append(self.apply_macros(code[position:match.start()], macros))
+            position = match.end()
+            if match.group(1) is not None:
+                token, solidity_code = [x.strip() for x in self.apply_macros(match.group(1), macros).split("=", 1)]
+                macros.append((token, solidity_code))
+                scope_macro_counts[-1] += 1
+            elif match.group() == "{":
+                expanded_code.append("{")
+                scope_macro_counts.append(0)
+            else:
+                expanded_code.append("}")
+                if len(scope_macro_counts) > 1:
+                    # Scope ends, remove its macros
+                    del macros[len(macros) - scope_macro_counts.pop():]
+        expanded_code.append(self.apply_macros(code[position:], macros))
+        return "".join(expanded_code)
+
+    @classmethod
+    def read_file(cls, path):
+        # Returns code, code split into segments and import paths [code, import path, code, ..., code] and names of
+        # declared contracts. Files are parsed once and cached by path, modification time and size.
+        stat = os.stat(path)
+        if path not in cls.file_cache or cls.file_cache[path][0] != (stat.st_mtime, stat.st_size):
+            with open(path) as f:
+                code = f.read()
+            cls.file_cache[path] = ((stat.st_mtime, stat.st_size), code, cls.IMPORT_PATTERN.split(code),
+                                    cls.declared_names(code))
+        return cls.file_cache[path][1:]
+
     @staticmethod
-    def resolve_imports(code, file_dir, contract_dir):
-        def get_file_name(_file_dir):
-            return _file_dir.split("/")[-1]
-        imported_codes = [get_file_name(file_dir)]
-        while len(re.findall(r'import "(\S*)";', code)):
-            for file_dir in re.findall(r'import "(\S*)";', code):
-                file_name = get_file_name(file_dir)
-                if file_name not in imported_codes and (not file_name.startswith("Abstract") or file_name.startswith("Abstract") and file_name[8:] not in imported_codes):
-                    imported_code = open(contract_dir + file_dir).read()
-                    imported_codes.append(file_name)
-                else:
-                    imported_code = ""
-                code = code.replace('import "{}";'.format(file_dir), imported_code, 1)
-        return code
+    def declared_names(code):
+        return set(re.findall(r'^(?:contract|library) (\w+)', code, re.MULTILINE))
+
+    @classmethod
+    def resolve_imports(cls, code, file_dir, contract_dir, line_origins=None):
+        # Walks the import graph depth first and replaces every import with the code of the imported file.
+        # Imported files are only inlined once. Files declaring only contracts declared by an already inlined file,
+        # like abstract contracts of implemented contracts, are skipped. If line_origins is a list, the file path and
+        # line number of every line of the flattened code are appended.
+        imported_files = set([file_dir])
+        declared_names = cls.declared_names(code)
+        flattened_code = []
+        # Segments, index of next segment, file path, line number of next segment
+        stack = [(cls.IMPORT_PATTERN.split(code), 0, file_dir, 1)]
+        while stack:
+            segments, index, path, line = stack.pop()
+            if index == len(segments):
+                continue
+            if index % 2 == 0:
+                stack.append((segments, index + 1, path, line + segments[index].count("\n")))
+                flattened_code.append(segments[index])
+                if line_origins is not None:
+                    if not line_origins:
+                        line_origins.append((path, line))
+                    line_origins.extend((path, line + i) for i in range(1, segments[index].count("\n") + 1))
+                continue
+            stack.append((segments, index + 1, path, line))
+            import_path = segments[index]
+            if import_path in imported_files:
+                continue
+            imported_files.add(import_path)
+            imported_code, imported_segments, imported_names = cls.read_file(contract_dir + import_path)
+            if imported_names and imported_names <= declared_names:
+                continue
+            declared_names |= imported_names
+            stack.append((imported_segments, 0, import_path, 1))
+        return "".join(flattened_code)
 
     @staticmethod
     def insert_addresses(code, replace_dict):
@@ -64,26 +113,56 @@ class PreProcessor:
             code = code.replace("{{%s}}" % placeholder, address)
         return code
 
+    @staticmethod
+    def sentinel_address(placeholder):
+        # Deterministic address without leading zero bytes, so the compiler always pushes all 20 bytes
+        nonce = 0
+        address = sha3("placeholder:{}".format(placeholder))[:20].encode('hex')
+        while address.startswith("00"):
+            nonce += 1
+            address = sha3("placeholder:{}:{}".format(placeholder, nonce))[:20].encode('hex')
+        return address
+
+    @staticmethod
+    def checksum_address(address):
+        address_hash = sha3(address).encode('hex')
+        return "0x" + "".join([c.upper() if int(address_hash[i], 16) >= 8 else c for i, c in enumerate(address)])
+
+    def insert_sentinel_addresses(self, code):
+        # Replaces placeholders with sentinel addresses, which are linked after compilation
+        sentinels = {}
+        for placeholder in set(re.findall(r'\{\{(\S*?)\}\}', code)):
+            sentinels[placeholder] = self.sentinel_address(placeholder)
+            code = code.replace("{{%s}}" % placeholder, self.checksum_address(sentinels[placeholder]))
+        return code, sentinels
+
     @staticmethod
     def contract_names(code):
         return [m.end() for m in re.finditer(r'^(contract|library) [^\{]*{', code, re.MULTILINE)]
 
-    def insert_dev_code(self, code):
+    def insert_dev_code(self, code, line_origins=None):
         added_code_len = 0
         for pos in self.contract_names(code):
+            if line_origins is not None:
+                # Inserted lines have no origin
+                line_index = code.count("\n", 0, pos + added_code_len) + 1
+                line_origins[line_index:line_index] = [(None, 0)] * self.dev_code.count("\n")
             code = code[:pos + added_code_len] + self.dev_code + code[pos + added_code_len:]
             added_code_len += len(self.dev_code)
         return code
 
-    def process(self, file_name, add_dev_code=False, contract_dir="", addresses=None, replace_unknown_addresses=False):
-        code = open(contract_dir + file_name).read()
+    def process(self, file_name, add_dev_code=False, contract_dir="", addresses=None, replace_unknown_addresses=False,
+                line_origins=None):
+        # If line_origins is a list, the file path and line number of every line of the processed code are appended.
+        # Macros and addresses don't change lines.
+        code = self.read_file(contract_dir + file_name)[0]
         # resolve imports
-        code = self.resolve_imports(code, file_name, contract_dir)
+        code = self.resolve_imports(code, file_name, contract_dir, line_origins)
         # resolve macros
         code = self.resolve_macros(code)
         # insert admin code
         if add_dev_code:
-            code = self.insert_dev_code(code)
+            code = self.insert_dev_code(code, line_origins)
         if addresses:
             code = self.insert_addresses(code, addresses)
         if replace_unknown_addresses:
@@ -21,4 +21,8 @@ contract MarketFactory {
 
     event MarketCreation(address indexed investor, bytes32 indexed marketHash);
     event MarketClosing(address indexed investor, bytes32 indexed marketHash);
+    event SharesPurchase(address indexed buyer, bytes32 indexed marketHash, uint8 indexed outcomeIndex, uint shareCount, uint costs, uint fee);
+    // Short sales sell shares with the market factory as seller, the sale is logged as SharesSale before ShortSale
+    event SharesSale(address indexed seller, bytes32 indexed marketHash, uint8 indexed outcomeIndex, uint shareCount, uint earnings, uint fee);
+    event ShortSale(address indexed buyer, bytes32 indexed marketHash, uint8 indexed outcomeIndex, uint shareCount, uint totalCosts);
 }
@@ -190,6 +190,7 @@ contract DefaultMarketFactory is MarketFactory {
         // Transfer shares to buyer
         markets[marketHash].shares[outcomeIndex] -= shareCount;
         Token(eventFactory.getOutcomeToken(markets[marketHash].eventHash, outcomeIndex)).transfer(msg.sender, shareCount);
+        SharesPurchase(msg.sender, marketHash, outcomeIndex, shareCount, costs, fee);
     }
 
     /// @dev Sells shares of defined market and outcome. Returns earnings minus fee.
@@ -242,6 +243,7 @@ contract DefaultMarketFactory is MarketFactory {
             // Tokens could ot be transferred
             throw;
         }
+        SharesSale(msg.sender, marketHash, outcomeIndex, shareCount, earnings, fee);
     }
 
     /// @dev Short sells outcome by buying all outcomes and selling selected outcome shares. Returns invested tokens.
@@ -288,6 +290,7 @@ contract DefaultMarketFactory is MarketFactory {
             throw;
         }
         totalCosts = buyAllOutcomesCosts - earnings;
+        ShortSale(msg.sender, marketHash, outcomeIndex, shareCount, totalCosts);
     }
 
     /*
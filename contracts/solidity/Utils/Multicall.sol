@@ -0,0 +1,71 @@
+pragma solidity ^0.4.0;
+
+
+/// @title Multicall contract - Executes multiple constant calls in one call.
+contract Multicall {
+
+    /*
+     *  Constants
+     */
+    // Gas kept to continue with the next calls if a call uses all its gas
+    uint constant GAS_RESERVE = 10000;
+
+    /*
+     *  Read functions
+     */
+    /// @dev Executes calls and returns success flag and result of each call. Results are cut to the given length.
+    /// @param targets Array of called contract addresses.
+    /// @param data Concatenated call data of all calls.
+    /// @param dataLengths Array of call data lengths in bytes.
+    /// @param resultLengths Array of result lengths in words.
+    /// @param callGasLimit Maximum gas forwarded to each call.
+    /// @return results Returns encoded results.
+    function aggregate(address[] targets, bytes data, uint[] dataLengths, uint[] resultLengths, uint callGasLimit)
+        constant
+        public
+        returns (uint[] results)
+    {
+        // Calculate array size
+        uint arrPos = 0;
+        uint dataPos = 0;
+        for (uint i=0; i<targets.length; i++) {
+            arrPos += 1 + resultLengths[i];
+            dataPos += dataLengths[i];
+        }
+        if (dataPos != data.length) {
+            // Call data lengths don't match data
+            throw;
+        }
+        // Fill array
+        results = new uint[](arrPos);
+        arrPos = 0;
+        dataPos = 0;
+        for (i=0; i<targets.length; i++) {
+            if (executeCall(targets[i], data, dataPos, dataLengths[i], results, arrPos + 1, resultLengths[i],
+                            callGasLimit)) {
+                results[arrPos] = 1;
+            }
+            arrPos += 1 + resultLengths[i];
+            dataPos += dataLengths[i];
+        }
+    }
+
+    /// @dev Calls target with a slice of data and writes result into results. Returns success.
+    function executeCall(address target, bytes data, uint dataPos, uint dataLength, uint[] results,
+                         uint resultPos, uint resultLength, uint callGasLimit)
+        private
+        returns (bool success)
+    {
+        uint callGas = callGasLimit;
+        if (msg.gas < GAS_RESERVE) {
+            return false;
+        }
+        if (callGas > msg.gas - GAS_RESERVE) {
+            callGas = msg.gas - GAS_RESERVE;
+        }
+        assembly {
+            success := call(callGas, target, 0, add(add(data, 32), dataPos), dataLength,
+                            add(add(results, 32), mul(resultPos, 32)), mul(resultLength, 32))
+        }
+    }
+}
@@ -2,11 +2,15 @@
 from ethereum import tester as t
 from ethereum.tester import keys, accounts, TransactionFailed
 from ethereum.utils import sha3
+from ethereum.abi import ContractTranslator
 from contracts.preprocessor import PreProcessor
+from contracts.compilation_cache import CompilationCache
+from contracts.tests.transaction_profiler import TransactionProfiler, get_contract_name
 # signing
 from bitcoin import ecdsa_raw_sign
 # standard libraries
 from unittest import TestCase
+import time
 
 
 class AbstractTestContract(TestCase):
@@ -21,6 +25,14 @@ class AbstractTestContract(TestCase):
     BASE_FEE_RANGE = 1000000
     HOMESTEAD_BLOCK = 1150000
 
+    compilation_cache = CompilationCache()
+    # Deployed contracts are shared between all tests deploying the same contracts. Each test starts from a snapshot
+    # taken after deployment, set to False to deploy all contracts again for every test.
+    share_fixtures = True
+    fixtures = {}
+    # Gas and wall time of all transactions are recorded if PROFILE_TRANSACTIONS is set
+    transaction_profiler = TransactionProfiler.from_environment()
+
     EVENT_MANAGER_DIR = 'EventFactory/'
     DAO_DIR = 'DAO/'
     UTILS_DIR = 'Utils/'
@@ -54,6 +66,8 @@ class AbstractTestContract(TestCase):
         self.market_factory_name = self.MARKET_MANAGERS_DIR + 'DefaultMarketFactory.sol'
         self.lmsr_name = self.MARKET_MAKERS_DIR + 'LMSRMarketMaker.sol'
         self.math_library_name = self.UTILS_DIR + 'MathLibrary.sol'
+        self.low_gas_math_library_name = self.UTILS_DIR + 'LowGasMathLibrary.sol'
+        self.multicall_name = self.UTILS_DIR + 'Multicall.sol'
         self.crowdfunding_name = self.MARKET_CROWDFUNDING_DIR + 'MarketCrowdfunding.sol'
         self.difficulty_oracle_name = self.ORACLES_DIR + 'DifficultyOracle.sol'
         self.fallback_oracle_name = self.ORACLES_DIR + 'DefaultFallbackOracle.sol'
@@ -63,122 +77,181 @@ class AbstractTestContract(TestCase):
         self.oraclize_oracle_name = self.ORACLES_DIR + 'OraclizeOracle.sol'
 
     def setUp(self):
+        if not self.share_fixtures:
+            self.deploy_fixtures()
+            return
+        fixture_key = (self.contract_dir, tuple(sorted(self.deploy_contracts)))
+        if fixture_key not in self.fixtures:
+            attribute_names = set(self.__dict__)
+            self.deploy_fixtures()
+            contracts = dict((name, value) for name, value in self.__dict__.iteritems()
+                             if name not in attribute_names and isinstance(value, t.ABIContract))
+            AbstractTestContract.fixtures[fixture_key] = (self.s, self.s.snapshot(), len(self.s.blocks), contracts)
+        self.s, snapshot, block_count, contracts = self.fixtures[fixture_key]
+        # Blocks mined by previous tests are removed
+        del self.s.blocks[block_count:]
+        self.s.revert(snapshot)
+        self.s.blocks[-1] = self.s.block
+        self.__dict__.update(contracts)
+
+    def deploy_fixtures(self):
         if self.dao_name in self.deploy_contracts:
-            self.dao = self.s.abi_contract(self.pp.process(self.dao_name,
-                                                           add_dev_code=True,
-                                                           contract_dir=self.contract_dir), language='solidity')
+            self.dao = self.create_contract(self.pp.process(self.dao_name,
+                                                            add_dev_code=True,
+                                                            contract_dir=self.contract_dir), language='solidity')
         if self.dao_auction_name in self.deploy_contracts:
-            self.dao_auction = self.s.abi_contract(self.pp.process(self.dao_auction_name,
-                                                                   add_dev_code=True,
-                                                                   contract_dir=self.contract_dir), language='solidity')
+            self.dao_auction = self.create_contract(self.pp.process(self.dao_auction_name,
+                                                                    add_dev_code=True,
+                                                                    contract_dir=self.contract_dir), language='solidity')
         if self.dao_token_name in self.deploy_contracts:
-            self.dao_token = self.s.abi_contract(self.pp.process(self.dao_token_name,
-                                                                 add_dev_code=True,
-                                                                 contract_dir=self.contract_dir),
-                                                 language='solidity',
-                                                 constructor_parameters=[self.dao_auction.address])
+            self.dao_token = self.create_contract(self.pp.process(self.dao_token_name,
+                                                                  add_dev_code=True,
+                                                                  contract_dir=self.contract_dir),
+                                                  language='solidity',
+                                                  constructor_parameters=[self.dao_auction.address])
         if self.outcome_token_library_name in self.deploy_contracts:
-            self.outcome_token_library = self.s.abi_contract(self.pp.process(self.outcome_token_library_name,
+            self.outcome_token_library = self.create_contract(self.pp.process(self.outcome_token_library_name,
+                                                                              add_dev_code=True,
+                                                                              contract_dir=self.contract_dir),
+                                                              language='solidity')
+        if self.event_factory_name in self.deploy_contracts:
+            self.event_factory = self.create_contract(self.pp.process(self.event_factory_name,
+                                                                      add_dev_code=True,
+                                                                      contract_dir=self.contract_dir),
+                                                      language='solidity',
+                                                      libraries={
+                                                         'OutcomeTokenLibrary': self.a2h(self.outcome_token_library)
+                                                      },
+                                                      addresses={
+                                                          'DAO': self.a2h(self.dao)
+                                                      })
+        if self.outcome_token_name in self.deploy_contracts:
+            self.event_token_c = self.create_contract(self.pp.process(self.outcome_token_name,
+                                                                      add_dev_code=True,
+                                                                      contract_dir=self.contract_dir),
+                                                      language='solidity',
+                                                      libraries={
+                                                          'OutcomeTokenLibrary': self.outcome_token_library.address.encode(
+                                                              'hex')
+                                                      })
+        if self.ether_token_name in self.deploy_contracts:
+            self.ether_token = self.create_contract(self.pp.process(self.ether_token_name,
+                                                                    add_dev_code=True,
+                                                                    contract_dir=self.contract_dir), language='solidity')
+        if self.math_library_name in self.deploy_contracts:
+            self.math_library = self.create_contract(self.pp.process(self.math_library_name,
+                                                                     add_dev_code=True,
+                                                                     contract_dir=self.contract_dir),
+                                                     language='solidity')
+        if self.low_gas_math_library_name in self.deploy_contracts:
+            self.low_gas_math_library = self.create_contract(self.pp.process(self.low_gas_math_library_name,
                                                                              add_dev_code=True,
                                                                              contract_dir=self.contract_dir),
                                                              language='solidity')
-        if self.event_factory_name in self.deploy_contracts:
-            self.event_factory = self.s.abi_contract(self.pp.process(self.event_factory_name,
-                                                                     add_dev_code=True,
-                                                                     contract_dir=self.contract_dir,
-                                                                     addresses={
-                                                                            'DAO': self.a2h(self.dao)
-                                                                        }),
-                                                     language='solidity',
-                                                     libraries={
-                                                        'OutcomeTokenLibrary': self.a2h(self.outcome_token_library)
-                                                     })
-        if self.outcome_token_name in self.deploy_contracts:
-            self.event_token_c = self.s.abi_contract(self.pp.process(self.outcome_token_name,
+        if self.multicall_name in self.deploy_contracts:
+            self.multicall = self.create_contract(self.pp.process(self.multicall_name,
+                                                                  add_dev_code=True,
+                                                                  contract_dir=self.contract_dir),
+                                                  language='solidity')
+        if self.market_factory_name in self.deploy_contracts:
+            self.market_factory = self.create_contract(self.pp.process(self.market_factory_name,
+                                                                       add_dev_code=True,
+                                                                       contract_dir=self.contract_dir),
+                                                       language='solidity',
+                                                       addresses={
+                                                           'EventFactory': self.a2h(self.event_factory)
+                                                       })
+        if self.crowdfunding_name in self.deploy_contracts:
+            self.crowdfunding = self.create_contract(self.pp.process(self.crowdfunding_name,
                                                                      add_dev_code=True,
                                                                      contract_dir=self.contract_dir),
                                                      language='solidity',
-                                                     libraries={
-                                                         'OutcomeTokenLibrary': self.outcome_token_library.address.encode(
-                                                             'hex')
+                                                     addresses={
+                                                         'EventFactory': self.a2h(self.event_factory)
                                                      })
-        if self.ether_token_name in self.deploy_contracts:
-            self.ether_token = self.s.abi_contract(self.pp.process(self.ether_token_name,
-                                                                   add_dev_code=True,
-                                                                   contract_dir=self.contract_dir), language='solidity')
-        if self.math_library_name in self.deploy_contracts:
-            self.math_library = self.s.abi_contract(self.pp.process(self.math_library_name,
-                                                                    add_dev_code=True,
-                                                                    contract_dir=self.contract_dir),
-                                                    language='solidity')
-        if self.market_factory_name in self.deploy_contracts:
-            self.market_factory = self.s.abi_contract(self.pp.process(self.market_factory_name,
-                                                                      add_dev_code=True,
-                                                                      contract_dir=self.contract_dir,
-                                                                      addresses={
-                                                                          'EventFactory': self.a2h(self.event_factory)
-                                                                      }), language='solidity')
-        if self.crowdfunding_name in self.deploy_contracts:
-            self.crowdfunding = self.s.abi_contract(self.pp.process(self.crowdfunding_name,
-                                                                    add_dev_code=True,
-                                                                    contract_dir=self.contract_dir,
-                                                                    addresses={
-                                                                        'EventFactory': self.a2h(self.event_factory)
-                                                                    }), language='solidity')
         if self.lmsr_name in self.deploy_contracts:
-            self.lmsr = self.s.abi_contract(self.pp.process(self.lmsr_name,
-                                                            add_dev_code=True,
-                                                            contract_dir=self.contract_dir),
-                                            language='solidity',
-                                            libraries={
-                                                'MathLibrary': self.math_library.address.encode('hex')
-                                            })
+            self.lmsr = self.create_contract(self.pp.process(self.lmsr_name,
+                                                             add_dev_code=True,
+                                                             contract_dir=self.contract_dir),
+                                             language='solidity',
+                                             libraries={
+                                                 'MathLibrary': self.math_library.address.encode('hex')
+                                             })
         if self.difficulty_oracle_name in self.deploy_contracts:
-            self.difficulty_oracle = self.s.abi_contract(self.pp.process(self.difficulty_oracle_name,
-                                                                         add_dev_code=True,
-                                                                         contract_dir=self.contract_dir),
-                                                         language='solidity')
+            self.difficulty_oracle = self.create_contract(self.pp.process(self.difficulty_oracle_name,
+                                                                          add_dev_code=True,
+                                                                          contract_dir=self.contract_dir),
+                                                          language='solidity')
         if self.fallback_oracle_name in self.deploy_contracts:
-            self.fallback_oracle = self.s.abi_contract(self.pp.process(self.fallback_oracle_name,
-                                                                       add_dev_code=True,
-                                                                       contract_dir=self.contract_dir),
-                                                       language='solidity')
+            self.fallback_oracle = self.create_contract(self.pp.process(self.fallback_oracle_name,
+                                                                        add_dev_code=True,
+                                                                        contract_dir=self.contract_dir),
+                                                        language='solidity')
         if self.ultimate_oracle_name in self.deploy_contracts:
-            self.ultimate_oracle = self.s.abi_contract(self.pp.process(self.ultimate_oracle_name,
-                                                                       add_dev_code=True,
-                                                                       contract_dir=self.contract_dir,
-                                                                       addresses={
-                                                                           'EtherToken': self.a2h(self.ether_token)
-                                                                       }), language='solidity')
+            self.ultimate_oracle = self.create_contract(self.pp.process(self.ultimate_oracle_name,
+                                                                        add_dev_code=True,
+                                                                        contract_dir=self.contract_dir),
+                                                        language='solidity',
+                                                        addresses={
+                                                            'EtherToken': self.a2h(self.ether_token)
+                                                        })
         if self.hunchgame_token_name in self.deploy_contracts:
-            self.hunchgame_token = self.s.abi_contract(
+            self.hunchgame_token = self.create_contract(
                 self.pp.process(self.hunchgame_token_name, add_dev_code=True, contract_dir=self.contract_dir),
                 language='solidity')
         if self.hunchgame_name in self.deploy_contracts:
-            self.hunchgame = self.s.abi_contract(
-                self.pp.process(self.hunchgame_name, add_dev_code=True, contract_dir=self.contract_dir, addresses={
+            self.hunchgame = self.create_contract(
+                self.pp.process(self.hunchgame_name, add_dev_code=True, contract_dir=self.contract_dir),
+                language='solidity',
+                addresses={
                     'EventFactory': self.a2h(self.event_factory),
                     'HunchGameToken': self.a2h(self.hunchgame_token)
-                }), language='solidity')
+                })
         if self.futarchy_oracle_name in self.deploy_contracts:
-            self.futarchy_oracle = self.s.abi_contract(
-                self.pp.process(self.futarchy_oracle_name, add_dev_code=True, contract_dir=self.contract_dir,
-                                addresses={
-                                    'EventFactory': self.a2h(self.event_factory),
-                                    'DefaultMarketFactory': self.a2h(self.market_factory),
-                                    'LMSRMarketMaker': self.a2h(self.lmsr),
-                                    'EtherToken': self.a2h(self.ether_token)
-                                }), language='solidity')
+            self.futarchy_oracle = self.create_contract(
+                self.pp.process(self.futarchy_oracle_name, add_dev_code=True, contract_dir=self.contract_dir),
+                language='solidity',
+                addresses={
+                    'EventFactory': self.a2h(self.event_factory),
+                    'DefaultMarketFactory': self.a2h(self.market_factory),
+                    'LMSRMarketMaker': self.a2h(self.lmsr),
+                    'EtherToken': self.a2h(self.ether_token)
+                })
         if self.oraclize_name in self.deploy_contracts:
-            self.oraclize = self.s.abi_contract(
+            self.oraclize = self.create_contract(
                 self.pp.process(self.oraclize_name, add_dev_code=True, contract_dir=self.contract_dir,
                                 replace_unknown_addresses=True), language='solidity')
         if self.oraclize_oracle_name in self.deploy_contracts:
-            self.oraclize_oracle = self.s.abi_contract(
-                self.pp.process(self.oraclize_oracle_name, add_dev_code=True, contract_dir=self.contract_dir,
-                                addresses={
-                                    'Oraclize': self.a2h(self.oraclize)
-                                }), language='solidity')
+            self.oraclize_oracle = self.create_contract(
+                self.pp.process(self.oraclize_oracle_name, add_dev_code=True, contract_dir=self.contract_dir),
+                language='solidity',
+                addresses={
+                    'Oraclize': self.a2h(self.oraclize)
+                })
+
+    def create_contract(self, code, language='solidity', libraries=None, constructor_parameters=None,
+                        contract_name=None, addresses=None):
+        # Compiled code is shared between all tests using the compilation cache. Addresses of external contracts are
+        # linked in the bytecode, so the same compiled code is used independent of deployed contract addresses.
+        start = time.time()
+        code, sentinels = self.pp.insert_sentinel_addresses(code)
+        bytecode, abi = self.compilation_cache.compile(code, language, contract_name)
+        translator = ContractTranslator(abi)
+        bytecode = self.compilation_cache.link_addresses(bytecode, sentinels, addresses)
+        bytecode = self.compilation_cache.link_libraries(bytecode, libraries)
+        if constructor_parameters is not None:
+            bytecode += translator.encode_constructor_arguments(constructor_parameters).encode('hex')
+        compiled = time.time()
+        gas_used = self.s.block.gas_used
+        address = self.s.evm(bytecode.decode('hex'))
+        assert len(self.s.block.get_code(address)), "Contract code empty"
+        contract = t.ABIContract(self.s, translator, address)
+        if self.transaction_profiler:
+            name = get_contract_name(code, contract_name)
+            self.transaction_profiler.add_deployment(name, compiled - start, time.time() - compiled,
+                                                     self.s.block.gas_used - gas_used)
+            self.transaction_profiler.instrument(self.s, contract, name)
+        return contract
 
     @staticmethod
     def a2h(contract):
@@ -286,7 +359,8 @@ class AbstractTestContract(TestCase):
                      oracle_address=None,
                      data=None,
                      oracle_token_address=None,
-                     sender=None):
+                     sender=None,
+                     profiling=False):
         oracle_id = 0
         if not oracle_address:
             oracle_address = self.ultimate_oracle.address
@@ -309,7 +383,8 @@ class AbstractTestContract(TestCase):
                                               token_address,
                                               oracle_address,
                                               data,
-                                              sender=sender)
+                                              sender=sender,
+                                              profiling=profiling)
 
     def create_market(self,
                       event_hash,
@@ -318,7 +393,8 @@ class AbstractTestContract(TestCase):
                       market_maker_contract=None,
                       token_contract=None,
                       markets_contract=None,
-                      user=0):
+                      user=0,
+                      profiling=False):
         if not markets_contract:
             markets_contract = self.market_factory
         if not market_maker_contract:
@@ -338,7 +414,8 @@ class AbstractTestContract(TestCase):
                                              fee,
                                              initial_funding,
                                              market_maker_contract.address,
-                                             sender=keys[user])
+                                             sender=keys[user],
+                                             profiling=profiling)
 
     def buy_shares(self,
                    market_hash,
@@ -0,0 +1,74 @@
+import json
+import os
+
+
+def format_table(title, columns, rows):
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [max([len(column)] + [len(row[i]) for row in rows]) for i, column in enumerate(columns)]
+    lines = [title, " | ".join(column.ljust(widths[i]) for i, column in enumerate(columns)),
+             "-+-".join("-" * width for width in widths)]
+    lines += [" | ".join(value.rjust(widths[i]) for i, value in enumerate(row)) for row in rows]
+    return "\n".join(lines)
+
+
+def histogram(values, bin_size):
+    # Returns [(lowest value of bin, count), ...] for all bins between lowest and highest value
+    counts = {}
+    for value in values:
+        counts[value // bin_size * bin_size] = counts.get(value // bin_size * bin_size, 0) + 1
+    return [(lowest, counts.get(lowest, 0))
+            for lowest in range(min(counts), max(counts) + bin_size, bin_size)] if counts else []
+
+
+def format_histogram(title, values, bin_size, width=50):
+    bins = histogram(values, bin_size)
+    highest_count = max(count for lowest, count in bins) if bins else 0
+    lines = [title]
+    for lowest, count in bins:
+        lines.append("{:>8} - {:<8} {:>6} {}".format(lowest, lowest + bin_size - 1, count,
+                                                     "#" * (count * width // highest_count)))
+    return "\n".join(lines)
+
+
+def write_report(name, report):
+    # Reports are written as JSON to BENCHMARK_REPORT_DIR if set
+    report_dir = os.environ.get("BENCHMARK_REPORT_DIR")
+    if not report_dir:
+        return None
+    if not os.path.isdir(report_dir):
+        os.makedirs(report_dir)
+    path = os.path.join(report_dir, name + ".json")
+    with open(path, "w") as report_file:
+        json.dump(report, report_file, indent=4, sort_keys=True)
+    return path
+
+
+def load_baseline(path):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare_with_baseline(values, baseline, thresholds):
+    # Returns rows [key, baseline value, value, relative change, regression] for all keys. Keys are prefixed with the
+    # threshold name, e.g. buyShares/2/categorical. Values above the baseline by more than the threshold and values
+    # without baseline regress.
+    rows = []
+    for key in sorted(values):
+        if key not in baseline:
+            rows.append([key, None, values[key], None, True])
+            continue
+        change = float(values[key] - baseline[key]) / baseline[key]
+        rows.append([key, baseline[key], values[key], change, change > thresholds[key.split("/")[0]]])
+    return rows
+
+
+def update_baseline(path, values):
+    # Baseline values are only updated if UPDATE_BENCHMARK_BASELINE is set
+    if not os.environ.get("UPDATE_BENCHMARK_BASELINE"):
+        return False
+    baseline = load_baseline(path)
+    baseline["values"].update(values)
+    with open(path, "w") as baseline_file:
+        json.dump(baseline, baseline_file, indent=4, sort_keys=True)
+        baseline_file.write("\n")
+    return True
@@ -27,7 +27,7 @@ class TestContract(AbstractTestContract):
             required_accounts,
             daily_limit
         )
-        self.mist_wallet = self.s.abi_contract(
+        self.mist_wallet = self.create_contract(
             self.pp.process(self.WALLETS_DIR + 'MistWallet.sol', add_dev_code=True, contract_dir=self.contract_dir),
             language='solidity',
             constructor_parameters=constructor_parameters
@@ -37,7 +37,7 @@ class TestContract(AbstractTestContract):
             [accounts[wa_1]],
             required_accounts
         )
-        self.multisig_wallet = self.s.abi_contract(
+        self.multisig_wallet = self.create_contract(
             self.pp.process('Wallets/MultiSigWallet.sol', add_dev_code=True, contract_dir=self.contract_dir),
             language='solidity',
             constructor_parameters=constructor_parameters
@@ -113,8 +113,8 @@ class TestContract(AbstractTestContract):
         # Now we want to change the DAO contract.
         self.assertEqual(self.event_factory.getDAO(), self.dao.address.encode('hex'))
         # We deploy a new DAO.
-        dao_2 = self.s.abi_contract(self.pp.process(self.dao_name, add_dev_code=True, contract_dir=self.contract_dir),
-                                    language='solidity')
+        dao_2 = self.create_contract(self.pp.process(self.dao_name, add_dev_code=True, contract_dir=self.contract_dir),
+                                     language='solidity')
         dao_2.setup(self.event_factory.address, self.mist_wallet.address)
         dao_abi = self.dao.translator
         tx_data = dao_abi.encode("changeDAO", [dao_2.address])
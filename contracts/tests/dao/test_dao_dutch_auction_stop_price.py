@@ -25,7 +25,7 @@ class TestContract(AbstractTestContract):
             required_accounts,
             daily_limit
         )
-        self.mist_wallet = self.s.abi_contract(
+        self.mist_wallet = self.create_contract(
             self.pp.process(self.WALLETS_DIR + 'MistWallet.sol', add_dev_code=True, contract_dir=self.contract_dir),
             language='solidity',
             constructor_parameters=constructor_parameters
@@ -35,7 +35,7 @@ class TestContract(AbstractTestContract):
             [accounts[wa_1]],
             required_accounts
         )
-        self.multisig_wallet = self.s.abi_contract(
+        self.multisig_wallet = self.create_contract(
             self.pp.process('Wallets/MultiSigWallet.sol', add_dev_code=True, contract_dir=self.contract_dir),
             language='solidity',
             constructor_parameters=constructor_parameters
@@ -0,0 +1,252 @@
+from ethereum import vm
+from contracts.preprocessor import PreProcessor
+from .abstract_test import AbstractTestContract
+from .benchmark import format_table
+from .transaction_profiler import get_contract_name
+import bisect
+import logging
+import re
+
+TRACE = 5
+SCOPE_PATTERN = re.compile(r'\b(contract|library)\s+(\w+)|\b(function|modifier)\s*(\w*)\s*\(')
+STRIP_PATTERN = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\])*"', re.DOTALL)
+
+
+def strip_comments(code):
+    # Replaces comments and strings with spaces, offsets and lines stay the same
+    return STRIP_PATTERN.sub(lambda match: re.sub(r'[^\n]', ' ', match.group()), code)
+
+
+def get_scopes(code):
+    # Returns (start offset, end offset, contract name, function name) of all contracts, functions and modifiers
+    code = strip_comments(code)
+    scopes = []
+    contract_name = None
+    for match in SCOPE_PATTERN.finditer(code):
+        start = match.start()
+        if match.group(1):
+            contract_name = match.group(2)
+        body_start = min(code.find(c, match.end()) % (len(code) + 1) for c in "{;")
+        if body_start == len(code) or code[body_start] == ";":
+            # Declaration without body
+            continue
+        depth = 0
+        for end in range(body_start, len(code)):
+            if code[end] == "{":
+                depth += 1
+            elif code[end] == "}":
+                depth -= 1
+                if not depth:
+                    break
+        scopes.append((start, end + 1, contract_name, match.group(4) or "fallback" if match.group(3) else None))
+    return scopes
+
+
+def get_instruction_offsets(code):
+    # Returns program counters of all instructions of EVM code
+    offsets = []
+    pc = 0
+    while pc < len(code):
+        offsets.append(pc)
+        opcode = ord(code[pc])
+        # PUSH1 to PUSH32 are followed by their data
+        pc += 1 + (opcode - 0x5f if 0x60 <= opcode <= 0x7f else 0)
+    return offsets
+
+
+def parse_source_map(source_map):
+    # Returns [(start offset, length, file index, jump type), ...] of the compressed source map. Empty fields repeat
+    # the field of the previous instruction.
+    entries = []
+    entry = ["", "", "", ""]
+    for item in source_map.split(";"):
+        for i, field in enumerate(item.split(":")):
+            if field:
+                entry[i] = field
+        entries.append((int(entry[0]), int(entry[1]), int(entry[2]), entry[3]))
+    return entries
+
+
+class ContractSource:
+
+    def __init__(self, name, code, line_origins, runtime_code, source_map):
+        self.name = name
+        entries = parse_source_map(source_map)
+        offsets = get_instruction_offsets(runtime_code)
+        if len(entries) != len(offsets):
+            raise ValueError("Source map of {} does not match deployed code.".format(name))
+        line_starts = [0] + [match.end() for match in re.finditer(r'\n', code)]
+        scopes = get_scopes(code)
+        # Program counter => (file path, line number, function, jump type)
+        self.locations = {}
+        for pc, (start, length, file_index, jump) in zip(offsets, entries):
+            if file_index < 0:
+                # Code generated by the compiler, like the function dispatcher
+                self.locations[pc] = (None, 0, name, jump)
+                continue
+            path, line = line_origins[bisect.bisect_right(line_starts, start) - 1]
+            # Innermost scope containing the instruction
+            contract_name, function_name = name, None
+            for scope_start, scope_end, scope_contract_name, scope_function_name in scopes:
+                if scope_start <= start < scope_end:
+                    contract_name, function_name = scope_contract_name, scope_function_name
+            function = "{}.{}".format(contract_name, function_name) if function_name else contract_name
+            self.locations[pc] = (path, line, function, jump)
+
+
+class Frame:
+
+    def __init__(self, source, start_gas, prefix):
+        self.source = source
+        self.start_gas = start_gas
+        # Functions of the collapsed stacks of parent frames
+        self.prefix = prefix
+        # Internal function calls, the last function is the function of the current instruction
+        self.functions = [source.name if source else "<unknown>"]
+        self.location = None
+        self.gas = None
+        self.stack = None
+        self.child_gas = 0
+
+
+class TraceHandler(logging.Handler):
+
+    def __init__(self, profiler):
+        logging.Handler.__init__(self, TRACE)
+        self.profiler = profiler
+
+    def emit(self, record):
+        kwargs = getattr(record, "kwargs", {})
+        if "pc" in kwargs:
+            self.profiler.step(int(kwargs["pc"]), int(kwargs["gas"]))
+
+
+class GasProfiler:
+
+    # Traces EVM execution of the tester opcode by opcode and sums gas of every instruction by line of the original
+    # Solidity files, by function and by collapsed stack of contract calls and internal function calls. Gas of an
+    # instruction excludes gas of contracts called by it. Intrinsic transaction gas and refunds are not included.
+
+    def __init__(self, state, contract_dir="contracts/solidity/"):
+        self.state = state
+        self.contract_dir = contract_dir
+        self.pp = PreProcessor()
+        # Runtime code => ContractSource
+        self.sources = {}
+        self.frames = []
+        self.handler = TraceHandler(self)
+        self.vm_execute = None
+        self.logger_settings = None
+        self.reset()
+
+    def reset(self):
+        # (file path, line number) => gas
+        self.lines = {}
+        # function => gas
+        self.functions = {}
+        # collapsed stack => gas
+        self.stacks = {}
+
+    def add_contract(self, file_name, address, contract_name=None, replace_unknown_addresses=False):
+        # Adds the contract deployed at address from file_name. Contracts with the same code, like outcome tokens
+        # created by the event factory, are profiled as well. Source maps are compiled like the deployed contracts of
+        # the tests.
+        line_origins = []
+        code = self.pp.process(file_name, add_dev_code=True, contract_dir=self.contract_dir,
+                               replace_unknown_addresses=replace_unknown_addresses, line_origins=line_origins)
+        code, sentinels = self.pp.insert_sentinel_addresses(code)
+        runtime_code = self.state.block.get_code(address)
+        contract_name = get_contract_name(code, contract_name)
+        source_map = AbstractTestContract.compilation_cache.source_maps(code)[contract_name]
+        self.sources[runtime_code] = ContractSource(contract_name, code, line_origins, runtime_code, source_map)
+
+    def start(self):
+        self.vm_execute = vm.vm_execute
+        vm.vm_execute = self.execute
+        logger = vm.log_vm_op
+        self.logger_settings = (logger.level, logger.propagate)
+        logger.addHandler(self.handler)
+        logger.setLevel(TRACE)
+        logger.propagate = False
+        return self
+
+    def stop(self):
+        vm.vm_execute = self.vm_execute
+        logger = vm.log_vm_op
+        logger.removeHandler(self.handler)
+        logger.setLevel(self.logger_settings[0])
+        logger.propagate = self.logger_settings[1]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def execute(self, ext, msg, code):
+        prefix = self.frames[-1].prefix + self.frames[-1].functions if self.frames else []
+        self.frames.append(Frame(self.sources.get(code), msg.gas, prefix))
+        gas = 0
+        try:
+            result = self.vm_execute(ext, msg, code)
+            gas = result[1]
+            return result
+        finally:
+            frame = self.frames.pop()
+            if frame.location:
+                self.add_gas(frame, frame.gas - gas - frame.child_gas)
+            if self.frames:
+                self.frames[-1].child_gas += msg.gas - gas
+
+    def step(self, pc, gas):
+        # Gas of the previous instruction is known when the next instruction starts
+        if not self.frames:
+            return
+        frame = self.frames[-1]
+        if frame.location:
+            self.add_gas(frame, frame.gas - gas - frame.child_gas)
+            frame.child_gas = 0
+        location = frame.source.locations.get(pc) if frame.source else None
+        if not location:
+            location = (None, 0, frame.functions[0], "")
+        previous_jump = frame.location[3] if frame.location else ""
+        # Jumps from compiler generated code, like the function dispatcher, don't call internal functions
+        if previous_jump == "i" and "." in frame.functions[-1]:
+            frame.functions.append(location[2])
+        elif previous_jump == "o" and len(frame.functions) > 1:
+            frame.functions.pop()
+        frame.functions[-1] = location[2]
+        frame.location = location
+        frame.gas = gas
+        frame.stack = ";".join(frame.prefix + frame.functions)
+
+    def add_gas(self, frame, gas):
+        path, line, function, jump = frame.location
+        self.lines[(path, line)] = self.lines.get((path, line), 0) + gas
+        self.functions[function] = self.functions.get(function, 0) + gas
+        self.stacks[frame.stack] = self.stacks.get(frame.stack, 0) + gas
+
+    def get_line_report(self):
+        # Returns [(gas, file path, line number, code), ...] sorted by gas
+        rows = []
+        for (path, line), gas in self.lines.iteritems():
+            code = self.pp.read_file(self.contract_dir + path)[0].split("\n")[line - 1].strip() if path else ""
+            rows.append((gas, path or "<generated>", line, code))
+        return sorted(rows, reverse=True)
+
+    def get_function_report(self):
+        return sorted(((gas, function) for function, gas in self.functions.iteritems()), reverse=True)
+
+    def format_report(self, top=20):
+        return "\n\n".join([
+            format_table("Gas by source line", ["gas", "file", "line", "code"],
+                         [[gas, path, line, code[:60]] for gas, path, line, code in self.get_line_report()[:top]]),
+            format_table("Gas by function", ["gas", "function"],
+                         [[gas, function] for gas, function in self.get_function_report()[:top]])
+        ])
+
+    def write_collapsed_stacks(self, path):
+        # Writes one line "caller;callee gas" per stack, the format read by flamegraph tools
+        with open(path, "w") as stacks_file:
+            for stack, gas in sorted(self.stacks.iteritems()):
+                stacks_file.write("{} {}\n".format(stack, gas))
@@ -0,0 +1,71 @@
+from ..abstract_test import AbstractTestContract, keys, accounts
+from contracts.backtest import Backtester, LMSRContractSampler, MarketSimulator
+import random
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.market_factories.test_backtest
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.event_factory_name, self.outcome_token_name, self.outcome_token_library_name,
+                                 self.dao_name, self.math_library_name, self.lmsr_name,
+                                 self.market_factory_name, self.ultimate_oracle_name, self.ether_token_name]
+
+    def approve_ether_tokens(self, user, amount):
+        self.ether_token.buyTokens(value=amount, sender=keys[user])
+        self.ether_token.approve(self.market_factory.address, amount, sender=keys[user])
+
+    def test(self):
+        fee = 5000  # 0.5%
+        event_hash = self.create_event()
+        market_hash = self.create_market(event_hash, fee=fee)
+        market = MarketSimulator(self.MIN_MARKET_BALANCE, 2, fee, self.BASE_FEE)
+        user = 1
+        # Trades in the simulator return the same values as the contract
+        for outcome, share_count in [(0, 10**18), (1, 3 * 10**18)]:
+            total_costs = market.buy_shares(outcome, share_count)
+            self.approve_ether_tokens(user, total_costs)
+            self.assertEqual(self.market_factory.buyShares(market_hash, outcome, share_count, total_costs,
+                                                           sender=keys[user]), total_costs)
+        share_count = 5 * 10**17
+        self.event_token(event_hash, 0, "approve", user, [self.market_factory.address, share_count])
+        self.assertEqual(self.market_factory.sellShares(market_hash, 0, share_count, 0, sender=keys[user]),
+                         market.sell_shares(0, share_count))
+        share_count = 10**18
+        self.approve_ether_tokens(user, share_count + self.calc_base_fee_for_shares(share_count))
+        self.assertEqual(self.market_factory.shortSellShares(market_hash, 1, share_count, 0, sender=keys[user]),
+                         market.short_sell_shares(1, share_count))
+        self.assertEqual(self.market_factory.getShareDistributionWithTimestamp(market_hash)[1:],
+                         market.market_state.share_distribution)
+        self.assertEqual(self.market_factory.getMarket(market_hash)[2], market.collected_fees)
+        # Short selling transfers shares of the other outcomes to the trader
+        self.assertEqual(market.get_holdings(0), [10**18 - 5 * 10**17 + share_count, 3 * 10**18])
+        self.assertEqual(self.event_token(event_hash, 0, "balanceOf", user, [accounts[user]]),
+                         market.get_holdings(0)[0])
+        # Rejected trades don't change the market
+        with self.assertRaises(ValueError):
+            market.buy_shares(0, 10**18, max_spending=1)
+        # Shares not held by the trader can't be sold
+        with self.assertRaises(ValueError):
+            market.sell_shares(0, 10**18, trader=1)
+        self.assertEqual(market.trade_count, 4)
+        # Random trade stream with sampled quotes checked by the contract
+        random.seed(0)
+        trades = ((random.randint(0, 2), random.randint(0, 3), random.choice(["buy", "sell", "short_sell"]),
+                   random.randint(0, 1), random.randint(1, 5 * 10**18)) for _ in range(300))
+        sampler = LMSRContractSampler(self.lmsr, sample_rate=0.1, seed=0)
+        backtester = Backtester(lambda market_id: MarketSimulator(self.MIN_MARKET_BALANCE, 2, fee), sampler)
+        report = backtester.run(trades)
+        self.assertEqual(sorted(report), [0, 1, 2])
+        self.assertGreater(sampler.sample_count, 10)
+        self.assertEqual(sampler.mismatches, [])
+        for market_report in report.values():
+            self.assertGreater(market_report["trades"], 0)
+            self.assertGreater(market_report["rejected_trades"], 0)
+            self.assertGreater(market_report["collected_fees"], 0)
+            self.assertEqual(market_report["investor_profits"],
+                             [shares + market_report["collected_fees"] - self.MIN_MARKET_BALANCE
+                              for shares in market_report["share_distribution"]])
@@ -0,0 +1,122 @@
+from ..abstract_test import AbstractTestContract, keys, t
+from ..benchmark import format_table, write_report, load_baseline, compare_with_baseline, update_baseline
+import os
+import unittest
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.market_factories.test_gas_benchmark
+    """
+
+    BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "gas_baseline.json")
+    CHALLENGE_PERIOD = 43200
+    # Events with many outcomes need more gas than a block allows, gas is measured with a higher transaction gas limit
+    BLOCK_GAS_LIMIT = 4712388
+    BENCHMARK_GAS_LIMIT = 10**8
+    OUTCOME_COUNTS = [2, 4, 8, 16, 32, 64]
+    INITIAL_FUNDINGS = [10 * 10**18, 1000 * 10**18]
+    RANGED_BOUNDS = (0, 100)
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.event_factory_name, self.outcome_token_name, self.outcome_token_library_name,
+                                 self.dao_name, self.math_library_name, self.lmsr_name,
+                                 self.market_factory_name, self.ultimate_oracle_name, self.ether_token_name]
+        self.description_count = 0
+
+    def setUp(self):
+        super(TestContract, self).setUp()
+        t.gas_limit = self.BENCHMARK_GAS_LIMIT
+
+    def tearDown(self):
+        t.gas_limit = self.BLOCK_GAS_LIMIT
+
+    def approve_ether_tokens(self, user, amount, approved_contract):
+        self.ether_token.buyTokens(value=amount, sender=keys[user])
+        self.ether_token.approve(approved_contract.address, amount, sender=keys[user])
+
+    def measure(self, outcome_count, is_ranged, initial_funding):
+        # Returns gas used by all functions of the lifecycle of one event and market
+        gas = {}
+        investor = 0
+        trader = 1
+        buyer = 2
+        self.description_count += 1
+        description_hash = self.i2b(self.description_count)
+        lower_bound, upper_bound = self.RANGED_BOUNDS if is_ranged else (0, 0)
+        profiling = self.create_event(description_hash=description_hash, is_ranged=is_ranged,
+                                      lower_bound=lower_bound, upper_bound=upper_bound, outcome_count=outcome_count,
+                                      profiling=True)
+        gas["createEvent"] = profiling["gas"]
+        event_hash = profiling["output"]
+        profiling = self.create_market(event_hash, initial_funding=initial_funding, user=investor, profiling=True)
+        gas["createMarket"] = profiling["gas"]
+        market_hash = profiling["output"]
+        # Trade a tenth of the initial funding
+        share_count = initial_funding / 10
+        outcome = 1
+        share_distribution = self.market_factory.getShareDistributionWithTimestamp(market_hash)[1:]
+        costs = self.lmsr.calcCostsBuying(market_hash, initial_funding, share_distribution, outcome, share_count)
+        max_spending = costs + self.market_factory.calcMarketFee(market_hash, costs) + \
+            self.calc_base_fee_for_shares(share_count)
+        self.approve_ether_tokens(trader, max_spending, self.market_factory)
+        gas["buyShares"] = self.market_factory.buyShares(market_hash, outcome, share_count, max_spending,
+                                                         sender=keys[trader], profiling=True)["gas"]
+        self.event_token(event_hash, outcome, "approve", trader, [self.market_factory.address, share_count / 2])
+        gas["sellShares"] = self.market_factory.sellShares(market_hash, outcome, share_count / 2, 0,
+                                                           sender=keys[trader], profiling=True)["gas"]
+        self.approve_ether_tokens(trader, share_count + self.calc_base_fee_for_shares(share_count),
+                                  self.market_factory)
+        gas["shortSellShares"] = self.market_factory.shortSellShares(market_hash, 0, share_count, 0,
+                                                                     sender=keys[trader], profiling=True)["gas"]
+        self.approve_ether_tokens(buyer, share_count, self.event_factory)
+        gas["buyAllOutcomes"] = self.event_factory.buyAllOutcomes(event_hash, share_count, sender=keys[buyer],
+                                                                  profiling=True)["gas"]
+        gas["closeMarket"] = self.market_factory.closeMarket(market_hash, sender=keys[investor],
+                                                             profiling=True)["gas"]
+        # Resolve event and redeem winnings of the trader
+        result = (lower_bound + upper_bound) / 2 if is_ranged else outcome
+        v, r, s = self.sign_data(self.get_result_hash(description_hash, result), keys[0])
+        self.s.mine(1)
+        self.ultimate_oracle.setOutcome(self.event_factory.getEvent(event_hash)[7], [self.i2b(result), v, r, s])
+        self.s.block.timestamp += self.CHALLENGE_PERIOD
+        gas["redeemWinnings"] = self.event_factory.redeemWinnings(event_hash, sender=keys[trader],
+                                                                  profiling=True)["gas"]
+        return gas
+
+    @unittest.skipUnless(os.environ.get("GAS_BENCHMARK"), "Gas benchmark runs if GAS_BENCHMARK is set")
+    def test(self):
+        scenarios = [(outcome_count, False, initial_funding) for outcome_count in self.OUTCOME_COUNTS
+                     for initial_funding in self.INITIAL_FUNDINGS]
+        scenarios += [(2, True, initial_funding) for initial_funding in self.INITIAL_FUNDINGS]
+        values = {}
+        for outcome_count, is_ranged, initial_funding in scenarios:
+            # Every scenario starts from the same state
+            snapshot = self.s.snapshot()
+            gas = self.measure(outcome_count, is_ranged, initial_funding)
+            self.s.revert(snapshot)
+            for function_name, function_gas in gas.iteritems():
+                values["{}/{}/{}/{}".format(function_name, outcome_count, "ranged" if is_ranged else "categorical",
+                                            initial_funding / 10**18)] = function_gas
+        # Recording a new baseline with UPDATE_BENCHMARK_BASELINE compares with the recorded values
+        update_baseline(self.BASELINE_PATH, values)
+        baseline = load_baseline(self.BASELINE_PATH)
+        rows = compare_with_baseline(values, baseline["values"], baseline["thresholds"])
+        print
+        print format_table("Gas costs (function/outcomes/event type/initial funding in Ether)",
+                           ["scenario", "baseline", "gas", "change", "regression", "above block limit"],
+                           [[key, "-" if baseline_gas is None else baseline_gas, gas,
+                             "-" if change is None else "{:+.2%}".format(change),
+                             "missing baseline" if baseline_gas is None else "yes" if regression else "",
+                             "yes" if gas > self.BLOCK_GAS_LIMIT else ""]
+                            for key, baseline_gas, gas, change, regression in rows])
+        write_report("gas", {
+            "block_gas_limit": self.BLOCK_GAS_LIMIT,
+            "values": values,
+            "comparison": [dict(zip(["key", "baseline", "gas", "change", "regression"], row)) for row in rows]
+        })
+        if not baseline["values"]:
+            self.skipTest("No gas baseline recorded, record it with UPDATE_BENCHMARK_BASELINE")
+        # Scenarios missing in a recorded baseline fail, they have to be recorded with UPDATE_BENCHMARK_BASELINE
+        self.assertEqual([row[0] for row in rows if row[4]], [])
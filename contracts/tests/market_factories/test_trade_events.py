@@ -0,0 +1,70 @@
+from ..abstract_test import AbstractTestContract, accounts, keys
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.market_factories.test_trade_events
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.event_factory_name, self.outcome_token_name, self.outcome_token_library_name,
+                                 self.dao_name, self.math_library_name, self.lmsr_name,
+                                 self.market_factory_name, self.ultimate_oracle_name, self.ether_token_name]
+
+    def test(self):
+        event_hash = self.create_event()
+        initial_funding = self.MIN_MARKET_BALANCE
+        market_hash = self.create_market(event_hash, initial_funding=initial_funding)
+        logs = []
+        self.s.block.log_listeners.append(
+            lambda log: logs.append(self.market_factory.translator.listen(log, noprint=True)))
+        # Share distribution is replayed from trade events
+        share_distribution = [initial_funding, initial_funding]
+        user = 0
+        outcome = 0
+        number_of_shares = 10**18
+        # Buy shares
+        total_costs = self.buy_shares(market_hash, outcome=outcome, share_count=number_of_shares, user=user)
+        purchases = [log for log in logs if log and log["_event_type"] == "SharesPurchase"]
+        self.assertEqual(len(purchases), 1)
+        self.assertEqual(purchases[0]["buyer"], accounts[user].encode('hex'))
+        self.assertEqual(purchases[0]["marketHash"], market_hash)
+        self.assertEqual(purchases[0]["outcomeIndex"], outcome)
+        self.assertEqual(purchases[0]["shareCount"], number_of_shares)
+        self.assertEqual(purchases[0]["costs"] + purchases[0]["fee"] + self.calc_base_fee_for_shares(number_of_shares),
+                         total_costs)
+        share_distribution = [shares + purchases[0]["costs"] for shares in share_distribution]
+        share_distribution[outcome] -= number_of_shares
+        self.assertEqual(self.market_factory.getShareDistribution(market_hash)[:2], share_distribution)
+        # Sell shares
+        share_count = number_of_shares / 2
+        self.event_token(event_hash, outcome, "approve", user, [self.market_factory.address, share_count])
+        net_earnings = self.market_factory.sellShares(market_hash, outcome, share_count, 0, sender=keys[user])
+        sales = [log for log in logs if log and log["_event_type"] == "SharesSale"]
+        self.assertEqual(len(sales), 1)
+        self.assertEqual(sales[0]["seller"], accounts[user].encode('hex'))
+        self.assertEqual(sales[0]["marketHash"], market_hash)
+        self.assertEqual(sales[0]["outcomeIndex"], outcome)
+        self.assertEqual(sales[0]["shareCount"], share_count)
+        self.assertEqual(sales[0]["earnings"] - sales[0]["fee"], net_earnings)
+        share_distribution[outcome] += share_count
+        share_distribution = [shares - sales[0]["earnings"] for shares in share_distribution]
+        self.assertEqual(self.market_factory.getShareDistribution(market_hash)[:2], share_distribution)
+        # Short sell shares, the market factory sells the shares
+        buy_all_outcomes_value = number_of_shares + self.calc_base_fee_for_shares(number_of_shares)
+        self.buy_ether_tokens(user=user, amount=buy_all_outcomes_value, approved_contract=self.market_factory)
+        total_costs = self.market_factory.shortSellShares(market_hash, outcome, number_of_shares, 0, sender=keys[user])
+        sales = [log for log in logs if log and log["_event_type"] == "SharesSale"]
+        short_sales = [log for log in logs if log and log["_event_type"] == "ShortSale"]
+        self.assertEqual(len(sales), 2)
+        self.assertEqual(sales[1]["seller"], self.market_factory.address.encode('hex'))
+        self.assertEqual(len(short_sales), 1)
+        self.assertEqual(short_sales[0]["buyer"], accounts[user].encode('hex'))
+        self.assertEqual(short_sales[0]["marketHash"], market_hash)
+        self.assertEqual(short_sales[0]["outcomeIndex"], outcome)
+        self.assertEqual(short_sales[0]["shareCount"], number_of_shares)
+        self.assertEqual(short_sales[0]["totalCosts"], total_costs)
+        share_distribution[outcome] += number_of_shares
+        share_distribution = [shares - sales[1]["earnings"] for shares in share_distribution]
+        self.assertEqual(self.market_factory.getShareDistribution(market_hash)[:2], share_distribution)
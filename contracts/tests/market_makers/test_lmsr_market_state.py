@@ -0,0 +1,44 @@
+from ..abstract_test import AbstractTestContract
+from contracts.lmsr import LMSRMarketState
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.market_makers.test_lmsr_market_state
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.lmsr_name, self.math_library_name]
+
+    def test(self):
+        market_hash = "".zfill(64).decode('hex')
+        initial_funding = self.MIN_MARKET_BALANCE
+        outcome_count = 8
+        market_state = LMSRMarketState(initial_funding, [initial_funding] * outcome_count)
+        # Trades change the highest share count or only the shares of one outcome
+        trades = [(True, 0, 10**18), (True, 3, 2 * 10**18), (False, 0, 10**18), (True, 7, 10**17),
+                  (False, 5, 3 * 10**18), (True, 5, 10**18), (False, 3, 10**18)]
+        for buy, outcome, share_count in trades:
+            share_distribution = list(market_state.share_distribution)
+            for quote_outcome in [0, outcome]:
+                self.assertEqual(
+                    market_state.calc_costs_buying(quote_outcome, share_count),
+                    self.lmsr.calcCostsBuying(market_hash, initial_funding, share_distribution, quote_outcome,
+                                              share_count)
+                )
+                self.assertEqual(
+                    market_state.calc_earnings_selling(quote_outcome, share_count),
+                    self.lmsr.calcEarningsSelling(market_hash, initial_funding, share_distribution, quote_outcome,
+                                                  share_count)
+                )
+            if buy:
+                costs = market_state.buy_shares(outcome, share_count)
+                share_distribution = [shares + costs for shares in share_distribution]
+                share_distribution[outcome] -= share_count
+            else:
+                earnings = market_state.sell_shares(outcome, share_count)
+                share_distribution[outcome] += share_count
+                share_distribution = [shares - earnings for shares in share_distribution]
+            self.assertEqual(market_state.share_distribution, share_distribution)
+            self.assertEqual(market_state.share_range, [min(share_distribution), max(share_distribution)])
@@ -0,0 +1,70 @@
+from ..abstract_test import AbstractTestContract
+from contracts.lmsr import LMSRQuoteSolver
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.market_makers.test_lmsr_quote_solver
+    """
+
+    BASE_FEE = 2000  # 0.2%
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.lmsr_name, self.math_library_name]
+
+    def calc_total_costs_buying(self, initial_funding, share_distribution, outcome, share_count, fee):
+        costs = self.lmsr.calcCostsBuying("".zfill(64).decode('hex'), initial_funding, share_distribution, outcome,
+                                          share_count)
+        return costs + costs * fee / 1000000 + self.calc_base_fee_for_shares(share_count)
+
+    def calc_total_costs_short_selling(self, initial_funding, share_distribution, outcome, share_count, fee):
+        earnings = self.lmsr.calcEarningsSelling("".zfill(64).decode('hex'), initial_funding, share_distribution,
+                                                 outcome, share_count)
+        return share_count + self.calc_base_fee_for_shares(share_count) - (earnings - earnings * fee / 1000000)
+
+    def test(self):
+        initial_funding = self.MIN_MARKET_BALANCE
+        divisor = initial_funding / 10000
+        fee = 5000  # 0.5%
+        for share_distribution in [[initial_funding, initial_funding],
+                                   [initial_funding, 3 * initial_funding, initial_funding / 2],
+                                   # Short selling costs of this market drop within the next block of shares
+                                   [37189787544548311765, 15857830510738141919, 28425693964927898916,
+                                    30240300850763945693, 26701852484177408751]]:
+            solver = LMSRQuoteSolver(initial_funding, share_distribution, fee, self.BASE_FEE)
+            # Earnings of short selling change at these share counts in every block of divisor shares
+            steps = sorted(set([0] + [(shares - max(share_distribution)) % divisor for shares in share_distribution]))
+            for outcome in range(len(share_distribution)):
+                for budget in [10**17, 431780896867284144, 3 * 10**18]:
+                    # Buying one more share exceeds the budget
+                    share_count, max_spending = solver.max_shares_buying(outcome, budget)
+                    self.assertLessEqual(max_spending, budget)
+                    self.assertEqual(
+                        self.calc_total_costs_buying(initial_funding, share_distribution, outcome, share_count, fee),
+                        max_spending
+                    )
+                    for higher_share_count in [share_count + 1, share_count + divisor]:
+                        self.assertGreater(
+                            self.calc_total_costs_buying(initial_funding, share_distribution, outcome,
+                                                         higher_share_count, fee),
+                            budget
+                        )
+                    # Short selling more shares exceeds the budget, also where costs drop in the next blocks
+                    share_count, total_costs = solver.max_shares_short_selling(outcome, budget)
+                    self.assertLessEqual(total_costs, budget)
+                    self.assertEqual(
+                        self.calc_total_costs_short_selling(initial_funding, share_distribution, outcome, share_count,
+                                                            fee),
+                        total_costs
+                    )
+                    block = share_count / divisor
+                    higher_share_counts = [share_count + 1, share_count + divisor] + \
+                        [(block + i) * divisor + step for i in range(2) for step in steps
+                         if (block + i) * divisor + step > share_count]
+                    for higher_share_count in higher_share_counts:
+                        self.assertGreater(
+                            self.calc_total_costs_short_selling(initial_funding, share_distribution, outcome,
+                                                                higher_share_count, fee),
+                            budget
+                        )
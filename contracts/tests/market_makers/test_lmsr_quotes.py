@@ -0,0 +1,59 @@
+from ..abstract_test import AbstractTestContract
+from contracts.lmsr import LMSRMarketMaker, MathLibrary
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.market_makers.test_lmsr_quotes
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.lmsr_name, self.math_library_name]
+
+    def test(self):
+        market_hash = "".zfill(64).decode('hex')
+        initial_funding = self.MIN_MARKET_BALANCE
+        share_distribution = [initial_funding, initial_funding]
+        number_of_shares = 10**18
+        # Quotes are identical to quotes in test_calc_costs_and_earnings
+        self.assertEqual(
+            LMSRMarketMaker.calc_costs_buying(initial_funding, share_distribution, 1, number_of_shares),
+            508672777026889653
+        )
+        self.assertEqual(
+            LMSRMarketMaker.calc_earnings_selling(initial_funding, share_distribution, 1, number_of_shares),
+            491327565610525849
+        )
+        # Markets with initial funding below 10000 divide by zero in the contract
+        for initial_funding_below_minimum in [0, 9999]:
+            with self.assertRaises(ValueError):
+                LMSRMarketMaker.calc_costs_buying(initial_funding_below_minimum, share_distribution, 1,
+                                                  number_of_shares)
+            with self.assertRaises(ValueError):
+                LMSRMarketMaker.calc_earnings_selling(initial_funding_below_minimum, share_distribution, 1,
+                                                      number_of_shares)
+        # Math functions return the same values as the contract
+        for x in [0, 1, 2**63, 2**64, 3 * 2**64, 10 * 2**64, 12345678 * 2**64 + 987654321, 2**190, 2**200]:
+            self.assertEqual(MathLibrary.e_exp(x), self.math_library.eExp(x))
+            self.assertEqual(MathLibrary.ln(x), self.math_library.ln(x))
+        # Quotes for different markets and share counts are identical to quotes of the contract
+        quotes = []
+        for share_distribution in [[initial_funding] * 2,
+                                   [initial_funding, 3 * initial_funding],
+                                   [initial_funding * 2, initial_funding / 2, initial_funding * 5],
+                                   [initial_funding + 10**17 * i for i in range(8)]]:
+            for outcome in range(len(share_distribution)):
+                for share_count in [1, 10**15, 10**18, initial_funding]:
+                    quotes.append((initial_funding, share_distribution, outcome, share_count))
+        costs = LMSRMarketMaker.calc_costs_buying_batch(quotes)
+        earnings = LMSRMarketMaker.calc_earnings_selling_batch(quotes)
+        for i, (initial_funding, share_distribution, outcome, share_count) in enumerate(quotes):
+            self.assertEqual(
+                costs[i],
+                self.lmsr.calcCostsBuying(market_hash, initial_funding, share_distribution, outcome, share_count)
+            )
+            self.assertEqual(
+                earnings[i],
+                self.lmsr.calcEarningsSelling(market_hash, initial_funding, share_distribution, outcome, share_count)
+            )
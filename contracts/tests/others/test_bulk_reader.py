@@ -0,0 +1,64 @@
+from ..abstract_test import AbstractTestContract, accounts, keys
+from contracts.bulk_reader import BulkReader, TesterClient, decode_records
+
+
+class LimitedTesterClient(TesterClient):
+
+    def __init__(self, state, sender, max_data_length):
+        # Fails calls with more data like a node failing calls above its gas cap
+        TesterClient.__init__(self, state, sender)
+        self.max_data_length = max_data_length
+        self.call_count = 0
+
+    def call(self, address, data, gas):
+        self.call_count += 1
+        if len(data) > self.max_data_length:
+            return None
+        return TesterClient.call(self, address, data, gas)
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.others.test_bulk_reader
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.event_factory_name, self.outcome_token_name, self.outcome_token_library_name,
+                                 self.dao_name, self.math_library_name, self.lmsr_name,
+                                 self.market_factory_name, self.ultimate_oracle_name, self.ether_token_name]
+
+    def test(self):
+        event_count = 5
+        event_hashes = [self.create_event(description_hash=self.i2b(i + 1)) for i in range(event_count)]
+        market_hashes = [self.create_market(event_hash, user=i) for i, event_hash in enumerate(event_hashes)]
+        event_factory = "0x" + self.event_factory.address.encode('hex')
+        market_factory = "0x" + self.market_factory.address.encode('hex')
+        client = TesterClient(self.s, keys[0])
+        bulk_reader = BulkReader(lambda: client, workers=2)
+        # Chunks of two hashes are read concurrently
+        bulk_reader.gas_limit = bulk_reader.estimate_gas("getEvents", 2)
+        self.assertEqual(bulk_reader.get_chunk_size("getEvents"), 2)
+        events = sorted(bulk_reader.get_events(event_factory, event_hashes), key=lambda event: event["event_hash"])
+        self.assertEqual(events, sorted(decode_records("getEvents", self.event_factory.getEvents(event_hashes, 0, 0)),
+                                        key=lambda event: event["event_hash"]))
+        self.assertEqual(len(events), event_count)
+        self.assertEqual(events[0]["oracle"], "0x" + self.ultimate_oracle.address.encode('hex'))
+        self.assertEqual(len(events[0]["outcome_tokens"]), 2)
+        self.assertFalse(events[0]["is_winning_outcome_set"])
+        # Filter arguments are passed to every chunk
+        markets = list(bulk_reader.get_markets(market_factory, market_hashes, accounts[1]))
+        self.assertEqual(len(markets), 1)
+        self.assertEqual(markets[0]["market_hash"], "0x" + market_hashes[1].encode('hex'))
+        self.assertEqual(markets[0]["event_hash"], "0x" + event_hashes[1].encode('hex'))
+        self.assertEqual(markets[0]["shares"], [self.MIN_MARKET_BALANCE] * 2)
+        shares = list(bulk_reader.get_shares(event_factory, self.market_factory.address, event_hashes))
+        self.assertEqual(len(shares), event_count)
+        self.assertTrue(all(share["shares"] == [self.MIN_MARKET_BALANCE] * 2 for share in shares))
+        # Failing chunks are split until they succeed
+        bulk_reader.gas_limit = 10**9
+        limited_client = LimitedTesterClient(self.s, keys[0], 4 + 32 * 3 + 32 * 2)
+        bulk_reader.create_client = lambda: limited_client
+        events = list(bulk_reader.get_events(event_factory, event_hashes))
+        self.assertEqual(len(events), event_count)
+        self.assertEqual(limited_client.call_count, 2 * event_count - 1)
@@ -0,0 +1,32 @@
+from unittest import TestCase
+from contracts.compilation_cache import CompilationCache
+import os
+import shutil
+import tempfile
+
+
+class TestCompilationCache(TestCase):
+    """
+    run test with python -m unittest contracts.tests.others.test_compilation_cache
+    """
+
+    def test(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            compilation_cache = CompilationCache(cache_dir=cache_dir, max_entries=1)
+            code_1 = 'contract Test { function f() returns (uint) { return 1; } }'
+            code_2 = 'contract Test { function f() returns (uint) { return 2; } }'
+            bytecode, abi = compilation_cache.compile(code_1)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            # Cached artifact is equal to compiled artifact
+            self.assertEqual(compilation_cache.compile(code_1), (bytecode, abi))
+            # Least recently used artifact is evicted
+            self.assertNotEqual(compilation_cache.compile(code_2)[0], bytecode)
+            self.assertEqual(os.listdir(cache_dir), [compilation_cache.get_key(code_2, "solidity", {}) + ".json"])
+            # Runtime source maps are cached like compiled artifacts
+            source_maps = compilation_cache.source_maps(code_2)
+            self.assertEqual(source_maps.keys(), ["Test"])
+            self.assertEqual(compilation_cache.source_maps(code_2), source_maps)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+        finally:
+            shutil.rmtree(cache_dir)
@@ -0,0 +1,35 @@
+from unittest import TestCase
+from contracts.deploy import Deploy
+
+
+class TestDeploySchedule(TestCase):
+    """
+    run test with python -m unittest contracts.tests.others.test_deploy_schedule
+    """
+
+    def test(self):
+        instructions = [
+            {"type": "deployment", "file": "Wallets/MultiSigWallet.sol", "params": [["dceceaf3fc5c0a63d195d69b1a90011b7b19650d"], 1]},
+            {"type": "assertion", "contract": "MultiSigWallet", "name": "required", "return": 1},
+            {"type": "deployment", "file": "DAO/DAO.sol"},
+            {"type": "deployment", "file": "EventFactory/OutcomeTokenLibrary.sol"},
+            {"type": "deployment", "file": "EventFactory/EventFactory.sol",
+             "addresses": {"DAO": "DAO", "OutcomeTokenLibrary": "OutcomeTokenLibrary"}},
+            {"type": "deployment", "file": "MarketFactories/DefaultMarketFactory.sol",
+             "addresses": {"EventFactory": "EventFactory"}},
+            {"type": "transaction", "contract": "DAO", "name": "setup", "params": ["EventFactory", "MultiSigWallet"]},
+            {"type": "assertion", "contract": "DAO", "name": "wallet", "return": "MultiSigWallet"},
+        ]
+        waves = Deploy.schedule(instructions)
+        self.assertEqual(waves, [
+            [instructions[0], instructions[2], instructions[3]],
+            [instructions[1], instructions[4]],
+            [instructions[5], instructions[6]],
+            [instructions[7]],
+        ])
+        # Instructions referencing unknown names are not delayed
+        instructions = [
+            {"type": "deployment", "file": "DAO/DAO.sol"},
+            {"type": "deployment", "file": "DAO/DAOToken.sol", "params": ["DAODutchAuction"]},
+        ]
+        self.assertEqual(Deploy.schedule(instructions), [instructions])
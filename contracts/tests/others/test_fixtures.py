@@ -0,0 +1,31 @@
+from ..abstract_test import AbstractTestContract, accounts, keys
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.others.test_fixtures
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.ether_token_name]
+
+    def buy_tokens_from_snapshot(self):
+        # Every test starts with the same deployed contracts and without state changes of other tests
+        self.assertEqual(self.ether_token.balanceOf(accounts[0]), 0)
+        self.assertEqual(self.s.block.number, self.HOMESTEAD_BLOCK)
+        fixture_key = (self.contract_dir, (self.ether_token_name,))
+        self.assertEqual(len(self.s.blocks), self.fixtures[fixture_key][2])
+        self.assertIs(self.s.blocks[-1], self.s.block)
+        self.ether_token.buyTokens(value=10, sender=keys[0])
+        self.assertEqual(self.ether_token.balanceOf(accounts[0]), 10)
+        self.s.block.number += 100
+        self.s.mine(2)
+        self.assertIs(self.s, self.fixtures[fixture_key][0])
+        self.assertEqual(self.ether_token.address, self.fixtures[fixture_key][3]['ether_token'].address)
+
+    def test_first(self):
+        self.buy_tokens_from_snapshot()
+
+    def test_second(self):
+        self.buy_tokens_from_snapshot()
@@ -0,0 +1,62 @@
+from ..abstract_test import AbstractTestContract
+from ..gas_profiler import GasProfiler, get_scopes, parse_source_map
+import os
+import shutil
+import tempfile
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.others.test_gas_profiler
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.event_factory_name, self.outcome_token_name, self.outcome_token_library_name,
+                                 self.dao_name, self.math_library_name, self.lmsr_name,
+                                 self.market_factory_name, self.ultimate_oracle_name, self.ether_token_name]
+
+    def test_source_map(self):
+        self.assertEqual(parse_source_map("0:10:0:-;;12:5::i;:3:-1:o"),
+                         [(0, 10, 0, "-"), (0, 10, 0, "-"), (12, 5, 0, "i"), (12, 3, -1, "o")])
+        code = 'contract A {\n    // function b() {}\n    function c() { if (true) {} }\n    function d();\n}'
+        self.assertEqual([(contract_name, function_name) for start, end, contract_name, function_name
+                          in get_scopes(code)], [("A", None), ("A", "c")])
+
+    def test(self):
+        event_hash = self.create_event()
+        market_hash = self.create_market(event_hash)
+        profiler = GasProfiler(self.s, self.contract_dir)
+        for file_name, contract in [(self.market_factory_name, self.market_factory),
+                                    (self.event_factory_name, self.event_factory),
+                                    (self.outcome_token_name, self.event_token_c),
+                                    (self.lmsr_name, self.lmsr),
+                                    (self.math_library_name, self.math_library),
+                                    (self.ether_token_name, self.ether_token)]:
+            profiler.add_contract(file_name, contract.address)
+        with profiler:
+            self.buy_shares(market_hash, outcome=1, user=1)
+        # Gas is summed by line of the original files
+        lines = profiler.get_line_report()
+        self.assertIn("MarketMakers/LMSRMarketMaker.sol", [path for gas, path, line, code in lines])
+        self.assertIn("Utils/MathLibrary.sol", [path for gas, path, line, code in lines])
+        functions = dict((function, gas) for gas, function in profiler.get_function_report())
+        self.assertGreater(functions["DefaultMarketFactory.buyShares"], 0)
+        self.assertGreater(functions["LMSRMarketMaker.calcCostsBuying"], 0)
+        self.assertEqual(sum(functions.values()), sum(gas for gas, path, line, code in lines))
+        self.assertIn("Gas by source line", profiler.format_report())
+        stacks_dir = tempfile.mkdtemp()
+        try:
+            stacks_path = os.path.join(stacks_dir, "buy_shares.folded")
+            profiler.write_collapsed_stacks(stacks_path)
+            with open(stacks_path) as stacks_file:
+                stacks = [line.rsplit(" ", 1) for line in stacks_file.read().splitlines()]
+        finally:
+            shutil.rmtree(stacks_dir)
+        self.assertEqual(sum(int(gas) for stack, gas in stacks), sum(functions.values()))
+        self.assertTrue(any("DefaultMarketFactory.buyShares;LMSRMarketMaker.calcCostsBuying" in stack
+                            for stack, gas in stacks))
+        # Transactions after stopping the profiler are not traced
+        profiler.reset()
+        self.buy_shares(market_hash, outcome=1, user=2)
+        self.assertEqual(profiler.functions, {})
@@ -0,0 +1,142 @@
+from ..abstract_test import AbstractTestContract, accounts, keys
+from contracts.indexer import Indexer, TesterLogSource, TRANSFER
+import os
+import shutil
+import tempfile
+
+
+class RecordingLogSource(TesterLogSource):
+
+    def __init__(self, state, sender):
+        TesterLogSource.__init__(self, state, sender)
+        self.filters = []
+
+    def get_logs(self, from_block, to_block, addresses, topics):
+        self.filters.append((addresses, topics))
+        return TesterLogSource.get_logs(self, from_block, to_block, addresses, topics)
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.others.test_indexer
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.event_factory_name, self.outcome_token_name, self.outcome_token_library_name,
+                                 self.dao_name, self.math_library_name, self.lmsr_name,
+                                 self.market_factory_name, self.ultimate_oracle_name, self.ether_token_name,
+                                 self.crowdfunding_name]
+
+    def setUp(self):
+        super(TestContract, self).setUp()
+        self.database_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.database_dir)
+
+    def create_indexer(self, source=None, **kwargs):
+        return Indexer(source or TesterLogSource(self.s, keys[0]), os.path.join(self.database_dir, "index.db"),
+                       ["0x" + self.event_factory.address.encode('hex')],
+                       ["0x" + self.market_factory.address.encode('hex')],
+                       ["0x" + self.crowdfunding.address.encode('hex')], **kwargs)
+
+    def test(self):
+        event_hash = self.create_event()
+        market_hash = self.create_market(event_hash)
+        # Bought shares are transferred from the market factory to the buyer
+        share_count = 10**18
+        self.buy_shares(market_hash, share_count=share_count, user=1)
+        self.s.mine()
+        # Transfers of outcome tokens are loaded with one address filter per token
+        source = RecordingLogSource(self.s, keys[0])
+        indexer = self.create_indexer(source, address_chunk_size=1)
+        self.assertEqual(indexer.sync(), self.s.block.number - 1)
+        self.assertEqual([len(addresses) for addresses, topics in source.filters if topics == [TRANSFER]], [1, 1])
+        event_hash = "0x" + event_hash.encode('hex')
+        market_hash = "0x" + market_hash.encode('hex')
+        # Events
+        events = indexer.get_events(oracle="0x" + self.ultimate_oracle.address.encode('hex'))
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["event_hash"], event_hash)
+        self.assertEqual(events[0]["creator"], "0x" + accounts[0].encode('hex'))
+        self.assertEqual(events[0]["outcome_count"], 2)
+        self.assertEqual(events[0]["token"], "0x" + self.ether_token.address.encode('hex'))
+        self.assertEqual(indexer.get_events(creator="0x" + accounts[1].encode('hex')), [])
+        outcome_tokens = indexer.get_outcome_tokens(event_hash)
+        self.assertEqual([outcome_token["outcome_index"] for outcome_token in outcome_tokens], [0, 1])
+        self.assertEqual(outcome_tokens[0]["address"],
+                         "0x" + self.event_factory.getOutcomeToken(event_hash[2:].decode('hex'), 0))
+        # Markets
+        markets = indexer.get_markets(event_hash=event_hash)
+        self.assertEqual(len(markets), 1)
+        self.assertEqual(markets[0]["market_hash"], market_hash)
+        self.assertEqual(markets[0]["investor"], "0x" + accounts[0].encode('hex'))
+        self.assertEqual(markets[0]["market_maker"], "0x" + self.lmsr.address.encode('hex'))
+        self.assertEqual(int(markets[0]["initial_funding"]), self.MIN_MARKET_BALANCE)
+        self.assertIsNone(markets[0]["closed_at_block"])
+        # Transfers
+        transfers = indexer.get_transfers("0x" + accounts[1].encode('hex'))
+        self.assertEqual(len(transfers), 1)
+        self.assertEqual(transfers[0]["sender"], "0x" + self.market_factory.address.encode('hex'))
+        self.assertEqual(int(transfers[0]["value"]), share_count)
+        self.assertEqual(transfers[0]["outcome_index"], 0)
+        # Syncing again indexes new blocks only
+        self.market_factory.closeMarket(market_hash[2:].decode('hex'))
+        self.s.mine()
+        indexer = self.create_indexer()
+        last_block = indexer.get_checkpoint()
+        self.assertEqual(indexer.sync(), last_block + 1)
+        self.assertEqual(indexer.get_markets(event_hash=event_hash)[0]["closed_at_block"], last_block + 1)
+        self.assertEqual(len(indexer.get_transfers("0x" + accounts[1].encode('hex'))), 1)
+
+    def test_closed_market(self):
+        # Market created and closed before the indexer reaches it is read at the block of its creation
+        event_hash = self.create_event()
+        market_hash = self.create_market(event_hash)
+        self.s.mine()
+        self.market_factory.closeMarket(market_hash)
+        self.s.mine()
+        indexer = self.create_indexer()
+        block_number = self.s.block.number
+        state_roots = [block.state_root for block in self.s.blocks]
+        indexer.sync()
+        # Indexing doesn't change the chain
+        self.assertEqual(self.s.block.number, block_number)
+        self.assertEqual([block.state_root for block in self.s.blocks], state_roots)
+        markets = indexer.get_markets(event_hash="0x" + event_hash.encode('hex'))
+        self.assertEqual(len(markets), 1)
+        self.assertEqual(markets[0]["market_hash"], "0x" + market_hash.encode('hex'))
+        self.assertEqual(markets[0]["market_maker"], "0x" + self.lmsr.address.encode('hex'))
+        self.assertEqual(markets[0]["closed_at_block"], block_number - 1)
+
+    def test_campaigns(self):
+        event_hash = self.create_event()
+        fee = 100000
+        initial_funding = self.MIN_MARKET_BALANCE
+        total_funding = initial_funding + self.calc_base_fee_for_shares(initial_funding)
+        closing_at_timestamp = self.s.block.timestamp + 86400
+        campaign_hash = self.crowdfunding.startCampaign(self.market_factory.address, event_hash, fee, initial_funding,
+                                                        total_funding, self.lmsr.address, closing_at_timestamp, [])
+        user = 1
+        self.ether_token.buyTokens(sender=keys[user], value=total_funding)
+        self.ether_token.approve(self.crowdfunding.address, total_funding, sender=keys[user])
+        self.crowdfunding.fund(campaign_hash, total_funding, sender=keys[user])
+        self.s.mine()
+        indexer = self.create_indexer()
+        indexer.sync()
+        campaigns = indexer.get_campaigns(event_hash="0x" + event_hash.encode('hex'))
+        self.assertEqual(len(campaigns), 1)
+        campaign_hash = "0x" + campaign_hash.encode('hex')
+        self.assertEqual(campaigns[0]["campaign_hash"], campaign_hash)
+        self.assertEqual(campaigns[0]["creator"], "0x" + accounts[0].encode('hex'))
+        self.assertEqual(campaigns[0]["market_factory"], "0x" + self.market_factory.address.encode('hex'))
+        self.assertEqual(campaigns[0]["market_maker"], "0x" + self.lmsr.address.encode('hex'))
+        self.assertEqual(int(campaigns[0]["fee"]), fee)
+        self.assertEqual(int(campaigns[0]["initial_funding"]), initial_funding)
+        self.assertEqual(int(campaigns[0]["total_funding"]), total_funding)
+        self.assertEqual(campaigns[0]["closing_at_timestamp"], closing_at_timestamp)
+        fundings = indexer.get_fundings(campaign_hash)
+        self.assertEqual(len(fundings), 1)
+        self.assertEqual(fundings[0]["investor"], "0x" + accounts[user].encode('hex'))
+        self.assertEqual(int(fundings[0]["investment"]), total_funding)
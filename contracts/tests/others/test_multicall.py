@@ -0,0 +1,56 @@
+from ..abstract_test import AbstractTestContract, accounts, keys
+from contracts.bulk_reader import TesterClient
+from contracts.multicall import Multicall
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.others.test_multicall
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.event_factory_name, self.outcome_token_name, self.outcome_token_library_name,
+                                 self.dao_name, self.math_library_name, self.lmsr_name,
+                                 self.market_factory_name, self.ultimate_oracle_name, self.ether_token_name,
+                                 self.multicall_name]
+
+    def test(self):
+        event_hash = self.create_event()
+        market_hash = self.create_market(event_hash, fee=1000)
+        user = 1
+        self.buy_shares(market_hash, outcome=1, user=user)
+        multicall = Multicall(TesterClient(self.s, keys[0]), "0x" + self.multicall.address.encode('hex'))
+        # Failing calls don't use the gas of following calls
+        failing_index = multicall.add(self.market_factory.translator, self.ether_token.address, "getMarket",
+                                      [market_hash])
+        # Market state and user balances are read with one call
+        share_distribution_index = multicall.add(self.market_factory.translator, self.market_factory.address,
+                                                 "getShareDistributionWithTimestamp", [market_hash], 2 + 3)
+        market_index = multicall.add(self.market_factory.translator, self.market_factory.address, "getMarket",
+                                     [market_hash])
+        fee_index = multicall.add(self.market_factory.translator, self.market_factory.address, "calcMarketFee",
+                                  [market_hash, 10**18])
+        outcome_token_indexes = [multicall.add(self.event_factory.translator, self.event_factory.address,
+                                               "getOutcomeToken", [event_hash, outcome]) for outcome in range(2)]
+        outcome_tokens = [self.event_factory.getOutcomeToken(event_hash, outcome) for outcome in range(2)]
+        balance_indexes = [multicall.add(self.event_token_c.translator, outcome_token, "balanceOf", [accounts[user]])
+                           for outcome_token in outcome_tokens]
+        results = multicall.execute()
+        self.assertEqual(len(results), 9)
+        self.assertEqual(results[share_distribution_index][1:],
+                         self.market_factory.getShareDistributionWithTimestamp(market_hash)[1:])
+        self.assertEqual(results[market_index], self.market_factory.getMarket(market_hash))
+        self.assertEqual(results[fee_index], self.market_factory.calcMarketFee(market_hash, 10**18))
+        self.assertEqual([results[index] for index in outcome_token_indexes], outcome_tokens)
+        self.assertEqual([results[index] for index in balance_indexes], [0, 10**18])
+        self.assertIsNone(results[failing_index])
+        # Calls were executed and removed
+        self.assertEqual(multicall.execute(), [])
+        # Calls get at most the call gas limit
+        multicall.call_gas_limit = 100
+        multicall.add(self.market_factory.translator, self.market_factory.address, "getMarket", [market_hash])
+        self.assertEqual(multicall.execute(), [None])
+        with self.assertRaises(ValueError):
+            multicall.add(self.market_factory.translator, self.market_factory.address,
+                          "getShareDistributionWithTimestamp", [market_hash])
@@ -0,0 +1,42 @@
+from unittest import TestCase
+from contracts.deploy import NonceManager
+
+
+class JsonRpc:
+
+    def __init__(self, transaction_count):
+        self.transaction_count = transaction_count
+        self.requests = 0
+
+    def eth_getTransactionCount(self, address, default_block):
+        self.requests += 1
+        return {"result": hex(self.transaction_count)}
+
+
+class TestNonceManager(TestCase):
+    """
+    run test with python -m unittest contracts.tests.others.test_nonce_manager
+    """
+
+    def test(self):
+        json_rpc = JsonRpc(5)
+        nonce_manager = NonceManager(json_rpc, "0x0")
+        # Nonce is requested once and assigned locally afterwards
+        self.assertEqual([nonce_manager.allocate() for i in range(4)], [5, 6, 7, 8])
+        self.assertEqual(json_rpc.requests, 1)
+        # Rejected transactions leave gaps, which are filled first
+        nonce_manager.release(6)
+        nonce_manager.release(7)
+        self.assertEqual(nonce_manager.allocate(), 6)
+        self.assertEqual(nonce_manager.allocate(), 7)
+        self.assertEqual(nonce_manager.allocate(), 9)
+        # Releasing the highest nonces lowers the next nonce
+        nonce_manager.release(9)
+        nonce_manager.release(8)
+        self.assertEqual(nonce_manager.gaps, [])
+        self.assertEqual(nonce_manager.allocate(), 8)
+        # Nonces used by other transactions are skipped after sync
+        nonce_manager.release(8)
+        json_rpc.transaction_count = 12
+        nonce_manager.sync()
+        self.assertEqual(nonce_manager.allocate(), 12)
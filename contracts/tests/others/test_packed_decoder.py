@@ -0,0 +1,90 @@
+from ..abstract_test import AbstractTestContract, accounts, keys
+from contracts import packed_decoder
+from contracts.packed_decoder import PackedDecoder
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.others.test_packed_decoder
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.event_factory_name, self.outcome_token_name, self.outcome_token_library_name,
+                                 self.dao_name, self.math_library_name, self.lmsr_name,
+                                 self.market_factory_name, self.ultimate_oracle_name, self.ether_token_name,
+                                 self.crowdfunding_name]
+
+    def call(self, contract, function_name, args):
+        # Returns ABI encoded return value
+        return self.s.send(keys[0], contract.address, 0, contract.translator.encode(function_name, args))
+
+    @staticmethod
+    def to_bytes(values):
+        # NumPy columns hold void values
+        return [value if isinstance(value, str) else value.tobytes() for value in values]
+
+    def test(self):
+        # Hashes and addresses ending with zero bytes keep all bytes
+        description_hashes = [self.i2b(1 << 8), self.i2b(2 << 8)]
+        event_hashes = [self.create_event(description_hash=description_hashes[0]),
+                        self.create_event(description_hash=description_hashes[1], outcome_count=3)]
+        market_hash = self.create_market(event_hashes[0])
+        shares_to_buy = [10**18, 2 * 10**18]
+        closing_at_timestamp = self.s.block.timestamp + 86400
+        campaign_hash = self.crowdfunding.startCampaign(self.market_factory.address, event_hashes[1], 1000,
+                                                        self.MIN_MARKET_BALANCE, 2 * self.MIN_MARKET_BALANCE,
+                                                        self.lmsr.address, closing_at_timestamp, shares_to_buy)
+        oracle_outcome = 1
+        timestamp = self.s.block.timestamp
+        v, r, s = self.sign_data(self.get_result_hash(description_hashes[0], oracle_outcome), keys[0])
+        self.ultimate_oracle.setOutcome(self.event_factory.getEvent(event_hashes[0])[7],
+                                        [self.i2b(oracle_outcome), v, r, s])
+        original_numpy = packed_decoder.numpy
+        for numpy in [original_numpy, None]:
+            packed_decoder.numpy = numpy
+            try:
+                events = PackedDecoder.decode("getEvents", self.call(self.event_factory, "getEvents",
+                                                                     [event_hashes, 0, 0]))
+                self.assertEqual(len(events), 2)
+                self.assertEqual(self.to_bytes(events.records["event_hash"]), event_hashes)
+                self.assertEqual(self.to_bytes(events.records["oracle"]), [self.ultimate_oracle.address] * 2)
+                self.assertEqual(list(events.offsets), [0, 2, 5])
+                self.assertEqual(self.to_bytes(events.get_items(1)["outcome_tokens"]),
+                                 [self.event_factory.getOutcomeToken(event_hashes[1], i).decode('hex')
+                                  for i in range(3)])
+                markets = PackedDecoder.decode("getMarkets", self.call(self.market_factory, "getMarkets",
+                                                                       [[market_hash], 0]))
+                self.assertEqual(self.to_bytes(markets.records["investor"]), [accounts[0]])
+                self.assertEqual(list(markets.records["initial_funding"]), [self.MIN_MARKET_BALANCE])
+                self.assertEqual(list(markets.items["shares"]), [self.MIN_MARKET_BALANCE] * 2)
+                shares = PackedDecoder.decode("getShares", self.call(self.event_factory, "getShares",
+                                                                     [self.market_factory.address, event_hashes]))
+                self.assertEqual(len(shares), 1)
+                self.assertEqual(list(shares.items["shares"]), [self.MIN_MARKET_BALANCE] * 2)
+                event_hash_groups = PackedDecoder.decode("getEventHashes", self.call(
+                    self.event_factory, "getEventHashes", [description_hashes, [accounts[0], accounts[1]]]))
+                self.assertEqual(list(event_hash_groups.offsets), [0, 1, 2])
+                self.assertEqual(self.to_bytes(event_hash_groups.items["event_hash"]), event_hashes)
+                market_hash_groups = PackedDecoder.decode("getMarketHashes", self.call(
+                    self.market_factory, "getMarketHashes", [event_hashes, [accounts[0]]]))
+                self.assertEqual(len(market_hash_groups), 1)
+                self.assertEqual(self.to_bytes(market_hash_groups.items["market_hash"]), [market_hash])
+                campaigns = PackedDecoder.decode("getCampaigns", self.call(self.crowdfunding, "getCampaigns",
+                                                                           [[campaign_hash]]))
+                self.assertEqual(self.to_bytes(campaigns.records["campaign_hash"]), [campaign_hash])
+                self.assertEqual(self.to_bytes(campaigns.records["market_maker"]), [self.lmsr.address])
+                self.assertEqual(self.to_bytes(campaigns.records["event_hash"]), [event_hashes[1]])
+                self.assertEqual(list(campaigns.records["total_funding"]), [2 * self.MIN_MARKET_BALANCE])
+                self.assertEqual(list(campaigns.records["closing_at_timestamp"]), [closing_at_timestamp])
+                self.assertEqual(list(campaigns.get_items(0)["initial_shares"]), shares_to_buy)
+                oracle_outcomes = PackedDecoder.decode("getOracleOutcomes", self.call(
+                    self.ultimate_oracle, "getOracleOutcomes", [description_hashes, [accounts[0]]]))
+                self.assertEqual(self.to_bytes(oracle_outcomes.records["description_hash"]), description_hashes[:1])
+                self.assertEqual(list(oracle_outcomes.offsets), [0, 1])
+                self.assertEqual(self.to_bytes(oracle_outcomes.items["oracle"]), [accounts[0]])
+                self.assertEqual(list(oracle_outcomes.items["submission_at_timestamp"]), [timestamp])
+                self.assertEqual(list(oracle_outcomes.items["outcome"]), [oracle_outcome])
+                self.assertEqual(list(oracle_outcomes.items["challenged"]), [False])
+            finally:
+                packed_decoder.numpy = original_numpy
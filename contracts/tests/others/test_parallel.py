@@ -0,0 +1,82 @@
+from unittest import TestCase, TestLoader, TestSuite, FunctionTestCase, SkipTest
+from ..abstract_test import AbstractTestContract
+from ..parallel import ResultCollector, iter_tests, get_group_key, get_tasks, run_task
+
+
+class TestParallel(TestCase):
+    """
+    run test with python -m unittest contracts.tests.others.test_parallel
+    """
+
+    def test_tasks(self):
+        # Stub tests with fixed contracts in three modules, defined here so they are not discovered
+        class MarketTest(AbstractTestContract):
+            __module__ = "stub_market"
+
+            def __init__(self, *args, **kwargs):
+                super(MarketTest, self).__init__(*args, **kwargs)
+                self.deploy_contracts = [self.ether_token_name, self.math_library_name]
+
+            def test_buy(self):
+                pass
+
+            def test_sell(self):
+                pass
+
+        class MarketStateTest(AbstractTestContract):
+            __module__ = "stub_market_state"
+
+            def __init__(self, *args, **kwargs):
+                super(MarketStateTest, self).__init__(*args, **kwargs)
+                self.deploy_contracts = [self.math_library_name, self.ether_token_name]
+
+            def test(self):
+                pass
+
+        class TokenTest(AbstractTestContract):
+            __module__ = "stub_token"
+
+            def __init__(self, *args, **kwargs):
+                super(TokenTest, self).__init__(*args, **kwargs)
+                self.deploy_contracts = [self.ether_token_name]
+
+            def test(self):
+                pass
+
+        class PlainTest(TestCase):
+            __module__ = "stub_plain"
+
+            def test(self):
+                pass
+        tests = list(iter_tests(TestSuite(TestLoader().loadTestsFromTestCase(test_class) for test_class
+                                          in [MarketTest, MarketStateTest, TokenTest, PlainTest])))
+        self.assertEqual(len(tests), 5)
+        # Tests deploying the same contracts are grouped
+        self.assertEqual(get_group_key(tests[0]), get_group_key(tests[2]))
+        self.assertNotEqual(get_group_key(tests[0]), get_group_key(tests[3]))
+        self.assertIsNone(get_group_key(tests[4]))
+        tasks = get_tasks(tests, 1)
+        self.assertEqual([len(test_ids) for key, test_ids in tasks], [3, 1, 1])
+        self.assertEqual(tasks[0][0], get_group_key(tests[0]))
+        # Groups are split by module if there are more workers
+        tasks = get_tasks(tests, 5)
+        self.assertEqual(sorted(len(test_ids) for key, test_ids in tasks), [1, 1, 1, 2])
+        self.assertIn(["stub_market.MarketTest.test_buy", "stub_market.MarketTest.test_sell"],
+                      [test_ids for key, test_ids in tasks])
+        self.assertEqual(sorted(test_id for key, test_ids in tasks for test_id in test_ids),
+                         sorted(test.id() for test in tests))
+
+    def test_results(self):
+        def fail():
+            raise AssertionError("failed")
+
+        def skip():
+            raise SkipTest("skipped")
+        result = ResultCollector()
+        for function in [lambda: None, fail, skip]:
+            FunctionTestCase(function).run(result)
+        self.assertEqual([record["outcome"] for record in result.records], ["ok", "fail", "skip"])
+        self.assertIn("failed", result.records[1]["details"])
+        report = run_task((None, ["contracts.tests.others.test_compilation_cache.TestCompilationCache.test",
+                                  "contracts.tests.others.test_missing.TestMissing.test"]))
+        self.assertEqual([record["outcome"] for record in report["tests"]], ["ok", "error"])
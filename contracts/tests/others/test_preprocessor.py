@@ -1,6 +1,11 @@
 from unittest import TestCase
 from ethereum import tester as t
+from ethereum.abi import ContractTranslator
 from contracts.preprocessor import PreProcessor
+from contracts.compilation_cache import CompilationCache
+import shutil
+import tempfile
+import time
 
 
 class TestPreProcessor(TestCase):
@@ -40,3 +45,80 @@ class TestPreProcessor(TestCase):
         c = s.abi_contract(code, language='solidity')
         self.assertEqual(c.t1(0, 10), 10)
         self.assertEqual(c.t2(0, 4), -4)
+
+    def test_link_addresses(self):
+        s = t.state()
+        code = '''
+        contract Test {
+
+            address constant a = {{A}};
+            address b = {{B}};
+
+            function t1() returns (address) {
+                return a;
+            }
+
+            function t2() returns (address) {
+                return b;
+            }
+
+        }
+        '''
+        pp = PreProcessor()
+        code, sentinels = pp.insert_sentinel_addresses(code)
+        self.assertEqual(sorted(sentinels.keys()), ['A', 'B'])
+        c = s.abi_contract(code, language='solidity')
+        self.assertEqual(c.t1(), sentinels['A'])
+        # Link addresses in compiled code
+        cache_dir = tempfile.mkdtemp()
+        bytecode, abi = CompilationCache(cache_dir=cache_dir).compile(code)
+        shutil.rmtree(cache_dir)
+        bytecode = CompilationCache.link_addresses(bytecode, sentinels, {'A': '0x' + '1' * 40, 'B': '2' * 40})
+        c = t.ABIContract(s, ContractTranslator(abi), s.evm(bytecode.decode('hex')))
+        self.assertEqual(c.t1(), '1' * 40)
+        self.assertEqual(c.t2(), '2' * 40)
+
+    def test_resolve_imports(self):
+        contract_dir = tempfile.mkdtemp()
+        files = {
+            'Main.sol': 'import "Wrapper.sol";\nimport "Library.sol";\ncontract Main {}\n',
+            'Token.sol': 'import "Library.sol";\nimport "AbstractToken.sol";\ncontract Token {}\n',
+            'AbstractToken.sol': 'contract Token {}\n',
+            'Library.sol': 'library Library {}\n',
+            'Wrapper.sol': 'import "Token.sol";\nimport "AbstractToken.sol";\ncontract Wrapper {}\n',
+        }
+        for file_name, code in files.items():
+            with open(contract_dir + '/' + file_name, 'w') as f:
+                f.write(code)
+        pp = PreProcessor()
+        # Imports are inlined once in depth first order, abstract contracts of included contracts are skipped
+        self.assertEqual(pp.process('Wrapper.sol', contract_dir=contract_dir + '/'),
+                         'library Library {}\n\n\ncontract Token {}\n\n\ncontract Wrapper {}\n')
+        # Cyclic imports are resolved
+        with open(contract_dir + '/Library.sol', 'w') as f:
+            f.write('import "Main.sol";\nlibrary Library {}\n')
+        self.assertEqual(pp.process('Main.sol', contract_dir=contract_dir + '/'),
+                         '\nlibrary Library {}\n\n\ncontract Token {}\n\n\ncontract Wrapper {}\n\n\ncontract Main {}\n')
+        shutil.rmtree(contract_dir)
+
+    def test_resolve_macros_benchmark(self):
+        macro_count = 5000
+        function = '''
+            function f{0}(uint a) returns (uint) {{
+                macro: $value{0} = values[a].x;
+                if (a > 0) {{
+                    $value{0} += a;
+                }}
+                return $value{0};
+            }}
+        '''
+        code = 'contract Test {\n' + ''.join([function.format(i) for i in range(macro_count)]) + '}\n'
+        pp = PreProcessor()
+        start = time.time()
+        expanded_code = pp.resolve_macros(code)
+        duration = time.time() - start
+        print "Expanding {} macros in {} bytes took {:.3f}s".format(macro_count, len(code), duration)
+        self.assertNotIn('macro:', expanded_code)
+        self.assertNotIn('$value', expanded_code)
+        self.assertEqual(expanded_code.count('values[a].x'), 2 * macro_count)
+        self.assertLess(duration, 5)
@@ -0,0 +1,36 @@
+from unittest import TestCase
+from contracts.deploy import ReceiptTracker
+
+
+class BatchJsonRpc:
+
+    def __init__(self, blocks):
+        # Transaction hashes mined per block
+        self.blocks = blocks
+        self.block_number = 0
+        self.batches = []
+
+    def batch(self, calls):
+        self.batches.append(calls)
+        if calls == [("eth_blockNumber", [])]:
+            self.block_number = min(self.block_number + 1, len(self.blocks) - 1)
+            return [{"result": hex(self.block_number)}]
+        mined = sum(self.blocks[:self.block_number + 1], [])
+        return [{"result": {"transactionHash": params[0]} if params[0] in mined else None} for method, params in calls]
+
+
+class TestReceiptTracker(TestCase):
+    """
+    run test with python -m unittest contracts.tests.others.test_receipt_tracker
+    """
+
+    def test(self):
+        batch_json_rpc = BatchJsonRpc([[], ["0x2"], [], ["0x1", "0x3"]])
+        receipt_tracker = ReceiptTracker(batch_json_rpc, min_interval=0, max_interval=0)
+        completed = [transaction_hash for transaction_hash, receipt
+                     in receipt_tracker.as_completed(["0x1", "0x2", "0x3"])]
+        self.assertEqual(completed[0], "0x2")
+        self.assertEqual(sorted(completed[1:]), ["0x1", "0x3"])
+        # Receipts are requested in one batch per new block
+        receipt_batches = [calls for calls in batch_json_rpc.batches if calls != [("eth_blockNumber", [])]]
+        self.assertEqual([len(calls) for calls in receipt_batches], [3, 2, 2])
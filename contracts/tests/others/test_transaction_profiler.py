@@ -0,0 +1,52 @@
+from ..abstract_test import AbstractTestContract, keys, t, TransactionFailed
+from ..transaction_profiler import TransactionProfiler, get_contract_name
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.others.test_transaction_profiler
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.ether_token_name]
+
+    def test(self):
+        self.assertEqual(get_contract_name(self.pp.process(self.ether_token_name, add_dev_code=True,
+                                                           contract_dir=self.contract_dir)), "EtherToken")
+        self.assertEqual(get_contract_name("contract A {}", "B"), "B")
+        profiler = TransactionProfiler()
+        # Shared fixture contracts are not changed
+        ether_token = profiler.instrument(self.s, t.ABIContract(self.s, self.ether_token.translator,
+                                                                self.ether_token.address), "EtherToken")
+        user = 1
+        amount = 10**18
+        ether_token.buyTokens(value=amount, sender=keys[user])
+        ether_token.buyTokens(value=amount, sender=keys[user])
+        # Results are returned like without profiling
+        self.assertEqual(ether_token.balanceOf(t.accounts[user]), 2 * amount)
+        profiling = ether_token.sellTokens(amount, sender=keys[user], profiling=True)
+        self.assertIsNone(profiling["output"])
+        self.assertGreater(profiling["gas"], 0)
+        # Failed transactions record the gas charged by the block
+        gas_used = self.s.block.gas_used
+        self.assertRaises(TransactionFailed, ether_token.sellTokens, 3 * amount, sender=keys[user])
+        failed_gas = self.s.block.gas_used - gas_used
+        self.assertGreater(failed_gas, 0)
+        functions = profiler.aggregate()
+        self.assertEqual(sorted(functions), [("EtherToken", "balanceOf"), ("EtherToken", "buyTokens"),
+                                             ("EtherToken", "sellTokens")])
+        self.assertEqual(functions[("EtherToken", "buyTokens")]["count"], 2)
+        self.assertFalse(functions[("EtherToken", "buyTokens")]["constant"])
+        self.assertTrue(functions[("EtherToken", "balanceOf")]["constant"])
+        self.assertEqual(functions[("EtherToken", "sellTokens")]["failed"], 1)
+        self.assertEqual(functions[("EtherToken", "sellTokens")]["gas"], profiling["gas"] + failed_gas)
+        self.assertEqual([function_name for (contract_name, function_name), function
+                          in profiler.get_hot_paths("gas", top=2)], ["sellTokens", "buyTokens"])
+        profiler.add_deployment("EtherToken", 0.5, 0.1, 300000)
+        profiler.add_deployment("EtherToken", 0., 0.1, 300000)
+        self.assertEqual(profiler.aggregate_deployments()["EtherToken"]["gas"], 600000)
+        report = profiler.format_report()
+        self.assertIn("Top functions by total gas", report)
+        self.assertIn("Deployments", report)
+        self.assertEqual(len(profiler.get_report()["functions"]), 3)
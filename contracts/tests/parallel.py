@@ -0,0 +1,208 @@
+from contracts.preprocessor import PreProcessor
+from contracts.tests.abstract_test import AbstractTestContract
+from contracts.tests.benchmark import format_table, write_report
+import click
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+import unittest
+logging.basicConfig(level=logging.INFO)
+
+
+class ResultCollector(unittest.TestResult):
+
+    # Records outcome and duration of every test in a picklable form. Output of tests is only kept for failed tests.
+
+    def __init__(self):
+        super(ResultCollector, self).__init__()
+        self.buffer = True
+        self.records = []
+        self.started_at = None
+
+    def startTest(self, test):
+        super(ResultCollector, self).startTest(test)
+        self.started_at = time.time()
+
+    def add_record(self, test, outcome, details=""):
+        self.records.append({
+            "test": test.id(),
+            "outcome": outcome,
+            "time": time.time() - self.started_at if self.started_at else 0.,
+            "details": details
+        })
+
+    def addSuccess(self, test):
+        super(ResultCollector, self).addSuccess(test)
+        self.add_record(test, "ok")
+
+    def addFailure(self, test, err):
+        super(ResultCollector, self).addFailure(test, err)
+        self.add_record(test, "fail", self.failures[-1][1])
+
+    def addError(self, test, err):
+        super(ResultCollector, self).addError(test, err)
+        self.add_record(test, "error", self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super(ResultCollector, self).addSkip(test, reason)
+        self.add_record(test, "skip", reason)
+
+    def addExpectedFailure(self, test, err):
+        super(ResultCollector, self).addExpectedFailure(test, err)
+        self.add_record(test, "expected failure")
+
+    def addUnexpectedSuccess(self, test):
+        super(ResultCollector, self).addUnexpectedSuccess(test)
+        self.add_record(test, "unexpected success")
+
+
+def iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for nested_test in iter_tests(test):
+                yield nested_test
+        else:
+            yield test
+
+
+def get_group_key(test):
+    # Tests deploying the same contracts share one deployment in a worker, like in AbstractTestContract.setUp
+    if isinstance(test, AbstractTestContract):
+        return test.contract_dir, tuple(sorted(test.deploy_contracts))
+    return None
+
+
+def get_tasks(tests, workers):
+    # Returns tasks (group key, test ids) with tests grouped by deployed contracts. Groups with more tests than an
+    # equal share of a worker are split by module, so all workers get work. Largest tasks come first.
+    groups = {}
+    for test in tests:
+        groups.setdefault(get_group_key(test), {}).setdefault(test.__class__.__module__, []).append(test.id())
+    share = max(1, (len(tests) + workers - 1) // workers)
+    tasks = []
+    for key, modules in groups.iteritems():
+        test_ids = []
+        for module_name in sorted(modules):
+            if test_ids and len(test_ids) + len(modules[module_name]) > share:
+                tasks.append((key, test_ids))
+                test_ids = []
+            test_ids += modules[module_name]
+        tasks.append((key, test_ids))
+    return sorted(tasks, key=lambda (key, test_ids): len(test_ids), reverse=True)
+
+
+def compile_contract(source):
+    # Fills the compilation cache shared by all workers, compilation errors are reported by the tests
+    contract_dir, file_name = source
+    start = time.time()
+    pp = PreProcessor()
+    try:
+        code, sentinels = pp.insert_sentinel_addresses(pp.process(file_name, add_dev_code=True,
+                                                                  contract_dir=contract_dir))
+        AbstractTestContract.compilation_cache.compile(code)
+    except Exception:
+        pass
+    return file_name, time.time() - start
+
+
+def run_task(task):
+    # Runs tests in a worker. Every worker has its own chain state and fixtures of AbstractTestContract.
+    key, test_ids = task
+    start = time.time()
+    result = ResultCollector()
+    for test_id in test_ids:
+        try:
+            test = unittest.TestLoader().loadTestsFromName(test_id)
+        except Exception:
+            result.records.append({"test": test_id, "outcome": "error", "time": 0., "details": traceback.format_exc()})
+            continue
+        test.run(result)
+    report = {"group": key, "worker": os.getpid(), "time": time.time() - start, "tests": result.records}
+    profiler = AbstractTestContract.transaction_profiler
+    if profiler:
+        report["transactions"], profiler.transactions = profiler.transactions, []
+        report["deployments"], profiler.deployments = profiler.deployments, []
+    return report
+
+
+def format_modules(records):
+    modules = sorted(set(record["test"].rsplit(".", 2)[0].rsplit(".", 1)[-1] for record in records))
+    return modules[0] + (" +{}".format(len(modules) - 1) if len(modules) > 1 else "")
+
+
+def run(start_dir, pattern, workers, top):
+    # Returns True if all tests passed
+    started_at = time.time()
+    tests = list(iter_tests(unittest.TestLoader().discover(start_dir, pattern=pattern, top_level_dir=".")))
+    tasks = get_tasks(tests, workers)
+    sources = sorted(set((key[0], file_name) for key, test_ids in tasks if key for file_name in key[1]))
+    logging.info('Running {} tests in {} tasks with {} workers.'.format(len(tests), len(tasks), workers))
+    pool = multiprocessing.Pool(workers)
+    try:
+        compile_times = pool.map(compile_contract, sources)
+        compiled_at = time.time()
+        reports = []
+        for report in pool.imap_unordered(run_task, tasks):
+            reports.append(report)
+            logging.info('Finished {} of {} tasks: {} tests in {:.1f}s.'.format(
+                len(reports), len(tasks), len(report["tests"]), report["time"]))
+    finally:
+        pool.close()
+        pool.join()
+    records = sorted((record for report in reports for record in report["tests"]), key=lambda record: record["test"])
+    for record in records:
+        if record["outcome"] in ["fail", "error"]:
+            print "=" * 70
+            print "{}: {}".format(record["outcome"].upper(), record["test"])
+            print "-" * 70
+            print record["details"]
+    print format_table("Slowest tests", ["test", "outcome", "seconds"],
+                       [[record["test"], record["outcome"], "{:.2f}".format(record["time"])]
+                        for record in sorted(records, key=lambda record: record["time"], reverse=True)[:top]])
+    print
+    print format_table("Tasks", ["modules", "contracts", "tests", "worker", "seconds"],
+                       [[format_modules(report["tests"]),
+                         len(report["group"][1]) if report["group"] else 0, len(report["tests"]), report["worker"],
+                         "{:.2f}".format(report["time"])]
+                        for report in sorted(reports, key=lambda report: report["time"], reverse=True)])
+    outcomes = {}
+    for record in records:
+        outcomes[record["outcome"]] = outcomes.get(record["outcome"], 0) + 1
+    total_time = time.time() - started_at
+    test_time = sum(report["time"] for report in reports)
+    print
+    print "Ran {} tests in {:.1f}s, compiled in {:.1f}s, {:.1f}s test time on {} workers ({:.1f}x)".format(
+        len(records), total_time, compiled_at - started_at, test_time, workers, test_time / total_time)
+    passed = not outcomes.get("fail") and not outcomes.get("error")
+    print "OK" if passed else "FAILED ({})".format(", ".join("{}={}".format(outcome, count)
+                                                             for outcome, count in sorted(outcomes.iteritems())))
+    write_report("tests", {
+        "workers": workers,
+        "time": total_time,
+        "compile_times": dict(compile_times),
+        "tasks": [{"group": report["group"], "worker": report["worker"], "time": report["time"],
+                   "tests": [record["test"] for record in report["tests"]]} for report in reports],
+        "tests": records
+    })
+    profiler = AbstractTestContract.transaction_profiler
+    if profiler:
+        # The merged profile is printed when the runner exits
+        for report in reports:
+            profiler.transactions += report["transactions"]
+            profiler.deployments += report["deployments"]
+    return passed
+
+
+@click.command()
+@click.option('-start', default='contracts', help='Directory to discover tests in')
+@click.option('-pattern', default='test*.py', help='File name pattern of test modules')
+@click.option('-workers', default=multiprocessing.cpu_count(), help='Number of worker processes')
+@click.option('-top', default=10, help='Number of slowest tests in the report')
+def setup(start, pattern, workers, top):
+    sys.exit(0 if run(start, pattern, workers, top) else 1)
+
+if __name__ == '__main__':
+    setup()
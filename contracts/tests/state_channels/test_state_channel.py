@@ -45,12 +45,12 @@ class TestContract(AbstractTestContract):
             [accounts[user], accounts[market_maker]], self.ether_token.address, self.SECURITY_VALUE,
             self.CHALLENGE_PERIOD
         )
-        state_channel = self.s.abi_contract(
+        state_channel = self.create_contract(
             self.pp.process('StateChannels/StateChannel.sol', add_dev_code=True, contract_dir=self.contract_dir),
             language='solidity',
             constructor_parameters=constructor_parameters
         )
-        state_channel_proxy = self.s.abi_contract(
+        state_channel_proxy = self.create_contract(
             self.pp.process('StateChannels/StateChannel.sol', add_dev_code=True, contract_dir=self.contract_dir),
             language='solidity',
             contract_name='StateChannelProxy'
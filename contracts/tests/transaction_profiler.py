@@ -0,0 +1,121 @@
+from ethereum.tester import TransactionFailed
+from .benchmark import format_table, write_report
+import atexit
+import os
+import re
+import time
+
+CONTRACT_PATTERN = re.compile(r'^\s*(?:contract|library)\s+(\w+)', re.MULTILINE)
+
+
+def get_contract_name(code, contract_name=None):
+    # Compiled contract is the named contract or the last contract in code
+    names = CONTRACT_PATTERN.findall(code)
+    return contract_name or (names[-1] if names else "unknown")
+
+
+class TransactionProfiler:
+
+    def __init__(self):
+        # (contract name, function name, constant, gas, seconds, failed) for every transaction
+        self.transactions = []
+        # (contract name, compile seconds, deploy seconds, deploy gas) for every deployment
+        self.deployments = []
+
+    @classmethod
+    def from_environment(cls):
+        # Profiling is enabled with PROFILE_TRANSACTIONS, the report is printed when the test run ends
+        if not os.environ.get("PROFILE_TRANSACTIONS"):
+            return None
+        profiler = cls()
+        atexit.register(profiler.print_report)
+        return profiler
+
+    def add_deployment(self, contract_name, compile_time, deploy_time, gas):
+        self.deployments.append((contract_name, compile_time, deploy_time, gas))
+
+    def instrument(self, state, contract, contract_name):
+        # Replaces all functions of a tester ABIContract with functions recording gas and wall time
+        for function_name, function_data in contract.translator.function_data.iteritems():
+            vars(contract)[function_name] = self.profile(state, contract_name, function_name,
+                                                         function_data.get("is_constant", False),
+                                                         vars(contract)[function_name])
+        return contract
+
+    def profile(self, state, contract_name, function_name, is_constant, function):
+        def profiled_function(*args, **kwargs):
+            profiling = kwargs.pop("profiling", False)
+            start = time.time()
+            gas_used = state.block.gas_used
+            try:
+                result = function(*args, profiling=True, **kwargs)
+            except TransactionFailed:
+                # Failed transactions record the gas charged by the block, which is all gas provided on throw
+                self.transactions.append((contract_name, function_name, is_constant, state.block.gas_used - gas_used,
+                                          time.time() - start, True))
+                raise
+            self.transactions.append((contract_name, function_name, is_constant, result["gas"],
+                                      time.time() - start, False))
+            return result if profiling else result["output"]
+        return profiled_function
+
+    def aggregate(self):
+        # Returns {(contract name, function name): {"count", "failed", "gas", "time", "constant"}}
+        functions = {}
+        for contract_name, function_name, is_constant, gas, seconds, failed in self.transactions:
+            function = functions.setdefault((contract_name, function_name),
+                                            {"count": 0, "failed": 0, "gas": 0, "time": 0., "constant": is_constant})
+            function["count"] += 1
+            function["failed"] += failed
+            function["gas"] += gas
+            function["time"] += seconds
+        return functions
+
+    def aggregate_deployments(self):
+        # Returns {contract name: {"count", "compile_time", "deploy_time", "gas"}}
+        contracts = {}
+        for contract_name, compile_time, deploy_time, gas in self.deployments:
+            contract = contracts.setdefault(contract_name,
+                                            {"count": 0, "compile_time": 0., "deploy_time": 0., "gas": 0})
+            contract["count"] += 1
+            contract["compile_time"] += compile_time
+            contract["deploy_time"] += deploy_time
+            contract["gas"] += gas
+        return contracts
+
+    def get_hot_paths(self, key, top=20):
+        # Returns top functions sorted by total gas or wall time
+        functions = self.aggregate()
+        return sorted(functions.iteritems(), key=lambda (name, function): function[key], reverse=True)[:top]
+
+    def format_report(self, top=20):
+        columns = ["contract", "function", "type", "count", "failed", "total gas", "average gas", "total ms",
+                   "average ms"]
+        tables = []
+        for key, title in [("gas", "Top functions by total gas"), ("time", "Top functions by wall time")]:
+            tables.append(format_table(title, columns, [
+                [contract_name, function_name, "call" if function["constant"] else "transaction", function["count"],
+                 function["failed"], function["gas"], function["gas"] // function["count"],
+                 "{:.1f}".format(function["time"] * 1000), "{:.2f}".format(function["time"] * 1000 / function["count"])]
+                for (contract_name, function_name), function in self.get_hot_paths(key, top)]))
+        deployments = self.aggregate_deployments()
+        tables.append(format_table("Deployments", ["contract", "count", "compile ms", "deploy ms", "gas"], [
+            [contract_name, contract["count"], "{:.1f}".format(contract["compile_time"] * 1000),
+             "{:.1f}".format(contract["deploy_time"] * 1000), contract["gas"]]
+            for contract_name, contract in sorted(deployments.iteritems(),
+                                                  key=lambda (name, contract): contract["compile_time"] +
+                                                  contract["deploy_time"], reverse=True)]))
+        return "\n\n".join(tables)
+
+    def get_report(self):
+        return {
+            "functions": [dict(function, contract=contract_name, function=function_name)
+                          for (contract_name, function_name), function in sorted(self.aggregate().iteritems())],
+            "deployments": [dict(contract, contract=contract_name)
+                            for contract_name, contract in sorted(self.aggregate_deployments().iteritems())]
+        }
+
+    def print_report(self):
+        print
+        print self.format_report()
+        write_report("transactions", self.get_report())
@@ -0,0 +1,43 @@
+from ..abstract_test import AbstractTestContract
+from ..benchmark import format_table
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.utils.test_low_gas_math_library
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.math_library_name, self.low_gas_math_library_name, self.lmsr_name]
+
+    def test(self):
+        # LMSRMarketMaker selects the low gas library by linking its address as MathLibrary
+        low_gas_lmsr = self.create_contract(
+            self.pp.process(self.lmsr_name, add_dev_code=True, contract_dir=self.contract_dir),
+            language='solidity',
+            libraries={
+                'MathLibrary': self.low_gas_math_library.address.encode('hex')
+            })
+        rows = []
+        for function_name in ['eExp', 'ln']:
+            for x in [2**63, 2 * 2**64, 10 * 2**64, 12345678 * 2**64 + 987654321, 2**200]:
+                profiling = getattr(self.math_library, function_name)(x, profiling=True)
+                low_gas_profiling = getattr(self.low_gas_math_library, function_name)(x, profiling=True)
+                self.assertEqual(low_gas_profiling["output"], profiling["output"])
+                self.assertLessEqual(low_gas_profiling["gas"], profiling["gas"])
+                rows.append([function_name, "{:.4g}".format(float(x) / 2**64), profiling["gas"],
+                             low_gas_profiling["gas"]])
+        initial_funding = self.MIN_MARKET_BALANCE
+        for outcome_count in [2, 8, 32]:
+            share_distribution = [initial_funding + 10**17 * i for i in range(outcome_count)]
+            arguments = ["".zfill(64).decode('hex'), initial_funding, share_distribution, 0, 10**18]
+            profiling = self.lmsr.calcCostsBuying(*arguments, profiling=True)
+            low_gas_profiling = low_gas_lmsr.calcCostsBuying(*arguments, profiling=True)
+            self.assertEqual(low_gas_profiling["output"], profiling["output"])
+            self.assertLess(low_gas_profiling["gas"], profiling["gas"])
+            rows.append(["calcCostsBuying", "{} outcomes".format(outcome_count), profiling["gas"],
+                         low_gas_profiling["gas"]])
+        print
+        print format_table("Gas of MathLibrary and LowGasMathLibrary", ["function", "x", "MathLibrary",
+                                                                          "LowGasMathLibrary"], rows)
@@ -0,0 +1,34 @@
+from ..abstract_test import AbstractTestContract
+from contracts import lmsr
+from contracts.lmsr import MathLibrary
+import random
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.utils.test_math_batch
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.math_library_name]
+
+    def test(self):
+        random.seed(0)
+        xs = [0, 1, 2**63, 2**64 - 1, 2**64, 10 * 2**64, 200 * 2**64, 2**200, 2**256 - 1]
+        xs += [random.getrandbits(random.randint(1, 80)) for _ in range(5000)]
+        # Batch results are identical to single results, with and without NumPy
+        e_exps = [MathLibrary.e_exp(x) for x in xs]
+        logs = [MathLibrary.ln(x) for x in xs]
+        self.assertEqual(MathLibrary.e_exp_batch(xs, batch_size=1000), e_exps)
+        self.assertEqual(MathLibrary.ln_batch(xs, batch_size=1000), logs)
+        numpy = lmsr.numpy
+        lmsr.numpy = None
+        try:
+            self.assertEqual(MathLibrary.e_exp_batch(xs, batch_size=1000), e_exps)
+        finally:
+            lmsr.numpy = numpy
+        # Single results are identical to results of the contract
+        for i in range(0, len(xs), 500):
+            self.assertEqual(e_exps[i], self.math_library.eExp(xs[i]))
+            self.assertEqual(logs[i], self.math_library.ln(xs[i]))
@@ -0,0 +1,98 @@
+from ..abstract_test import AbstractTestContract
+from ..benchmark import format_table, format_histogram, write_report
+from contracts.lmsr import MathLibrary
+from decimal import Decimal, getcontext
+import random
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest contracts.tests.utils.test_math_precision
+    """
+
+    ONE = MathLibrary.ONE
+    SAMPLE_COUNT = 500
+    GAS_SAMPLE_COUNT = 10
+    # eExp inputs of LMSRMarketMaker are the share difference to the highest outcome mapped with invB, ln inputs are
+    # sums of eExp results and at least ONE * outcome count. ln(ONE) is slightly negative and underflows.
+    # Ranges are (lowest, highest, max error, mean error). Errors are relative for eExp and absolute for ln. They were
+    # measured with random seed 0 and rounded up to three digits, inputs are the same in every run so higher errors
+    # are a regression.
+    E_EXP_RANGES = [(0, 1, 1.08e-5, 9.78e-7), (1, 5, 1.08e-5, 1.55e-6), (5, 10, 1.08e-5, 1.39e-6),
+                    (10, 20, 1.08e-5, 1.49e-6), (20, 40, 1.09e-5, 1.53e-6)]
+    LN_RANGES = [(2, 16, 3.70e-12, 1.98e-13), (16, 2**10, 3.70e-12, 2.21e-13), (2**10, 2**30, 3.69e-12, 2.44e-13),
+                 (2**30, 2**60, 3.70e-12, 2.21e-13)]
+    # Max execution gas per call of the current implementation
+    E_EXP_MAX_GAS = 3000
+    LN_MAX_GAS = 8000
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+        self.deploy_contracts = [self.math_library_name]
+
+    def samples(self, lowest, highest, count):
+        # Evenly spaced and random inputs in [lowest * ONE, highest * ONE)
+        lowest *= self.ONE
+        highest *= self.ONE
+        return [lowest + (highest - lowest) * i // count for i in range(count)] + \
+               [random.randint(lowest, highest - 1) for _ in range(count)]
+
+    @staticmethod
+    def e_exp_error(x, result):
+        exact = (Decimal(x) / MathLibrary.ONE).exp()
+        return float(abs(Decimal(result) / MathLibrary.ONE - exact) / exact)
+
+    @staticmethod
+    def ln_error(x, result):
+        return float(abs(Decimal(result) / MathLibrary.ONE - (Decimal(x) / MathLibrary.ONE).ln()))
+
+    def call(self, function_name, x):
+        # Returns result and gas used by the call without the intrinsic gas of the transaction
+        profiling = getattr(self.math_library, function_name)(x, profiling=True)
+        data = self.math_library.translator.encode(function_name, [x])
+        return profiling["output"], profiling["gas"] - 21000 - sum(4 if byte == "\x00" else 68 for byte in data)
+
+    def benchmark(self, function_name, calc, calc_error, ranges):
+        rows = []
+        report = []
+        all_gas = []
+        for lowest, highest, max_error, mean_error in ranges:
+            xs = self.samples(lowest, highest, self.SAMPLE_COUNT)
+            results = calc(xs)
+            errors = [calc_error(x, result) for x, result in zip(xs, results)]
+            # Python results of the sampled inputs are identical to the contract
+            gas = []
+            for i in range(0, len(xs), len(xs) // self.GAS_SAMPLE_COUNT):
+                output, call_gas = self.call(function_name, xs[i])
+                self.assertEqual(output, results[i])
+                gas.append(call_gas)
+            all_gas += gas
+            report.append({
+                "range": [lowest, highest],
+                "max_error_threshold": max_error,
+                "mean_error_threshold": mean_error,
+                "max_error": max(errors),
+                "mean_error": sum(errors) / len(errors),
+                "max_gas": max(gas),
+                "mean_gas": sum(gas) / len(gas)
+            })
+            rows.append(["[{}, {})".format(lowest, highest), "{:.3e}".format(max(errors)),
+                         "{:.3e}".format(sum(errors) / len(errors)), max(gas), sum(gas) / len(gas)])
+        print
+        print format_table("MathLibrary.{} errors and execution gas".format(function_name),
+                           ["x / ONE", "max error", "mean error", "max gas", "mean gas"], rows)
+        print format_histogram("MathLibrary.{} execution gas".format(function_name), all_gas, 50)
+        return report
+
+    def test(self):
+        getcontext().prec = 80
+        random.seed(0)
+        # Errors are calculated with the Python version, the contract is called for a sample of inputs
+        e_exp_report = self.benchmark("eExp", MathLibrary.e_exp_batch, self.e_exp_error, self.E_EXP_RANGES)
+        ln_report = self.benchmark("ln", MathLibrary.ln_batch, self.ln_error, self.LN_RANGES)
+        write_report("math_library", {"eExp": e_exp_report, "ln": ln_report})
+        for report, max_gas in [(e_exp_report, self.E_EXP_MAX_GAS), (ln_report, self.LN_MAX_GAS)]:
+            for row in report:
+                self.assertLessEqual(row["max_error"], row["max_error_threshold"])
+                self.assertLessEqual(row["mean_error"], row["mean_error_threshold"])
+                self.assertLessEqual(row["max_gas"], max_gas)
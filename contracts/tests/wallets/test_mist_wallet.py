@@ -25,7 +25,7 @@ class TestContract(AbstractTestContract):
             required_accounts,
             daily_limit
         )
-        self.mist_wallet = self.s.abi_contract(
+        self.mist_wallet = self.create_contract(
             self.pp.process('Wallets/MistWallet.sol', add_dev_code=True, contract_dir=self.contract_dir),
             language='solidity',
             constructor_parameters=constructor_parameters
@@ -24,7 +24,7 @@ class TestContract(AbstractTestContract):
             [accounts[wa_1], accounts[wa_2], accounts[wa_3]],
             required_accounts
         )
-        self.multisig_wallet = self.s.abi_contract(
+        self.multisig_wallet = self.create_contract(
             self.pp.process('Wallets/MultiSigWallet.sol', add_dev_code=True, contract_dir=self.contract_dir),
             language='solidity',
             constructor_parameters=constructor_parameters